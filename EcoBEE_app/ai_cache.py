@@ -0,0 +1,134 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+
+def normalize_prompt(prompt):
+    return re.sub(r"\s+", " ", prompt).strip()
+
+def prompt_key(prompt):
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+def bucket_value(value, bucket_size):
+    if value is None or not bucket_size:
+        return value
+    return math.floor(float(value) / bucket_size) * bucket_size
+
+def explanation_cache_key(prompt_data, env, bucket_sizes=None):
+    """
+    Key cache dari data yang menentukan isi prompt: induk, pola nama spesies baru
+    (angka diganti '#'), gen termutasi, dan nilai lingkungan (opsional di-bucket,
+    mis. {"temperature": 2, "humidity": 5, "flowers": 50}).
+    """
+    bucket_sizes = bucket_sizes or {}
+    evolved_name = prompt_data.get("evolved_species_name") or ""
+    key_data = {
+        "parent_species": (prompt_data.get("parent_species") or "").lower(),
+        "evolved_name_pattern": re.sub(r"\d+", "#", evolved_name),
+        "mutated_genes": sorted(prompt_data.get("mutated_genes") or []),
+        "environment": {k: bucket_value(env.get(k), bucket_sizes.get(k)) for k in sorted(env)},
+    }
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """
+    Cache penjelasan AI di SQLite: key -> teks, dengan eviction LRU berdasarkan
+    jumlah entry dan umur, serta counter hit/miss (per proses dan total di file).
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Dipakai dari thread GUI dan thread event loop AI, akses dijaga _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON explanations(last_access)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _count(self, name):
+        self._conn.execute(
+            "INSERT INTO stats(name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT text, created_at FROM explanations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.max_age_seconds and now - row[1] > self.max_age_seconds:
+                self._conn.execute("DELETE FROM explanations WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                self._count("misses")
+                return None
+            self._conn.execute("UPDATE explanations SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self._count("hits")
+            return row[0]
+
+    def put(self, key, text):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO explanations(key, text, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        if self.max_age_seconds:
+            self._conn.execute("DELETE FROM explanations WHERE created_at < ?", (now - self.max_age_seconds,))
+        if self.max_entries:
+            self._conn.execute(
+                "DELETE FROM explanations WHERE key IN ("
+                " SELECT key FROM explanations ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            totals = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+        }
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM explanations")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import urllib.request
+
+try:
+    from .ai_cache import prompt_key
+except ImportError:
+    from ai_cache import prompt_key
+
+
+DEFAULT_MODEL_NAME = 'gemini-2.5-flash-preview-05-20'
+BACKEND_URL_ENV = "ECOBEE_AI_BACKEND_URL"  # Jika di-set, pakai HTTPBackend (mis. stub server lokal)
+
+
+#Backends: objek dengan `async def generate(prompt) -> str`
+class GeminiBackend:
+    def __init__(self, api_key, model_name=DEFAULT_MODEL_NAME):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+
+    def _get_model(self):
+        # Model dibuat sekali dan dipakai ulang; genai baru diimpor saat request pertama
+        if self._model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt):
+        model = self._get_model()
+        response = await model.generate_content_async(prompt)
+        return response.text
+
+
+class HTTPBackend:
+    """POST {"prompt": ...} ke url, balasan JSON {"text": ...}."""
+
+    def __init__(self, url, timeout=60.0):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, prompt):
+        request = urllib.request.Request(
+            self.url, data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode("utf-8"))["text"]
+
+    async def generate(self, prompt):
+        return await asyncio.to_thread(self._post, prompt)
+
+
+class CallableBackend:
+    """Bungkus fungsi biasa atau coroutine function(prompt) -> str."""
+
+    def __init__(self, func):
+        self.func = func
+
+    async def generate(self, prompt):
+        if asyncio.iscoroutinefunction(self.func):
+            return await self.func(prompt)
+        return await asyncio.to_thread(self.func, prompt)
+
+
+class ExplanationService:
+    """
+    Client penjelasan AI berbasis asyncio yang berjalan di event loop thread sendiri:
+    backend dipakai ulang, timeout + retry, prompt identik yang sedang berjalan
+    digabung, dan request lama pada channel yang sama dibatalkan saat ada yang baru.
+    """
+
+    def __init__(self, backend, timeout=30.0, retries=2, retry_delay=1.0, cache=None):
+        self.backend = backend
+        self.cache = cache  # ExplanationCache opsional (lihat ai_cache.py)
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._inflight = {}  # prompt -> [task, jumlah waiter]
+        self._latest = {}  # channel -> future request terbaru
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="ai-explanation", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _call_backend(self, prompt):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                return await asyncio.wait_for(self.backend.generate(prompt), self.timeout)
+            except asyncio.TimeoutError:
+                last_error = TimeoutError(f"no response within {self.timeout}s")
+            except Exception as e:
+                last_error = e
+            if attempt < self.retries:
+                await asyncio.sleep(self.retry_delay * (2 ** attempt))
+        raise last_error
+
+    async def explain(self, prompt):
+        entry = self._inflight.get(prompt)
+        # Task yang sudah selesai atau sedang dibatalkan tidak bisa ditunggu lagi: mulai yang baru
+        if entry is None or entry[0].done() or entry[0].cancelling():
+            task = asyncio.ensure_future(self._call_backend(prompt))
+            entry = self._inflight[prompt] = [task, 0]
+            task.add_done_callback(lambda t, p=prompt: self._inflight.pop(p, None) if self._inflight.get(p, [None])[0] is t else None)
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            # Tidak ada lagi yang menunggu prompt ini: hentikan request ke backend
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+                if self._inflight.get(prompt) is entry:
+                    del self._inflight[prompt]
+
+    async def _explain_text(self, prompt, cache_key=None):
+        if self.cache is not None:
+            cache_key = cache_key or prompt_key(prompt)
+            cached_text = self.cache.get(cache_key)
+            if cached_text is not None:
+                return cached_text
+        try:
+            text = await self.explain(prompt)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return f"Error getting explanation from AI: {e}"
+        if self.cache is not None:
+            self.cache.put(cache_key, text)
+        return text
+
+    def submit(self, prompt, callback=None, channel="default", cache_key=None):
+        """
+        Kirim request dari thread mana pun, return concurrent.futures.Future berisi teks.
+        Request sebelumnya di `channel` yang sama dibatalkan, dan callback(text) hanya
+        dipanggil jika request ini masih yang terbaru. channel=None: tidak pernah dibatalkan.
+        cache_key: key cache khusus (mis. ai_cache.explanation_cache_key), default hash prompt.
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._explain_text(prompt, cache_key), loop)
+
+        previous = None
+        if channel is not None:
+            with self._lock:
+                previous = self._latest.get(channel)
+                self._latest[channel] = future
+        if previous is not None and not previous.done():
+            previous.cancel()
+
+        if callback is not None:
+            def _on_done(f):
+                if f.cancelled():
+                    return
+                if channel is not None:
+                    with self._lock:
+                        if self._latest.get(channel) is not f:
+                            return
+                callback(f.result())
+            future.add_done_callback(_on_done)
+        return future
+
+    def cancel(self, channel="default"):
+        with self._lock:
+            previous = self._latest.pop(channel, None)
+        if previous is not None and not previous.done():
+            previous.cancel()
+
+    def explain_blocking(self, prompt):
+        return self.submit(prompt, channel=None).result()
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+def create_default_service(api_key=None, **service_options):
+    """Pilih backend dari environment: ECOBEE_AI_BACKEND_URL, lalu Gemini jika ada API key."""
+    backend_url = os.environ.get(BACKEND_URL_ENV)
+    if backend_url:
+        return ExplanationService(HTTPBackend(backend_url), **service_options)
+    if api_key:
+        return ExplanationService(GeminiBackend(api_key), **service_options)
+    return None
+
+
+def run_stub_server(host="127.0.0.1", port=8765, delay=0.0):
+    """
+    Server pengganti Gemini untuk pengujian offline:
+        python ai_service.py 8765
+        ECOBEE_AI_BACKEND_URL=http://127.0.0.1:8765 python ../main.py
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(delay)
+            prompt = body.get("prompt", "")
+            reply = json.dumps({"text": f"[stub] Penjelasan untuk prompt {len(prompt)} karakter."}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    import sys
+    run_stub_server(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
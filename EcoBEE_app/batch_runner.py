@@ -0,0 +1,189 @@
+"""
+Headless batch/sweep runner: jalankan run_evolution_simulation untuk banyak titik
+lingkungan (grid atau CSV) di process pool dan tulis hasil ke CSV / JSON Lines
+secara streaming. Tidak mengimpor Tk, customtkinter, maupun matplotlib.
+
+    python batch_runner.py --grid temperature=10:50:5 humidity=20:90:10 flowers=100,500,1000 --out hasil.jsonl
+    python batch_runner.py --csv titik.csv --out hasil.csv --processes 8 --seed 42
+"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+try:
+    from . import simulation
+except ImportError:
+    import simulation
+
+
+ENV_PARAMETERS = ["temperature", "humidity", "flowers"]
+RESULT_FIELDS = ENV_PARAMETERS + [
+    "index", "seed", "status", "matching_species", "parent_of_evolution",
+    "new_species_name", "mutated_genes_list", "message",
+]
+
+
+def parse_axis(spec):
+    """'10:50:5' -> 10, 15, ..., 50 (inklusif); '1,2,3' -> 1, 2, 3; '25' -> 25."""
+    if ":" in spec:
+        start, stop, step = (float(v) for v in spec.split(":"))
+        return [float(v) for v in np.arange(start, stop + step / 2, step)]
+    return [float(v) for v in spec.split(",") if v.strip()]
+
+def grid_points(axes):
+    """axes: {parameter: [nilai, ...]} -> iterator dict lingkungan (cartesian product)."""
+    for values in itertools.product(*(axes[p] for p in ENV_PARAMETERS)):
+        yield dict(zip(ENV_PARAMETERS, values))
+
+def read_points_csv(path):
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield {p: float(row[p]) for p in ENV_PARAMETERS}
+
+
+_worker_genes = None
+_worker_tree_path = None
+
+def _init_worker(tree_path):
+    # Data gen & pohon dimuat sekali per worker, bukan dikirim per task
+    global _worker_genes, _worker_tree_path
+    _worker_genes = simulation.load_genes()
+    _worker_tree_path = tree_path
+
+def summarize_result(index, env, seed, results):
+    summary = dict(env)
+    summary.update({
+        "index": index,
+        "seed": seed,
+        "status": results.get("status"),
+        "matching_species": results.get("matching_species"),
+        "parent_of_evolution": results.get("parent_of_evolution"),
+        "new_species_name": results.get("new_species_name"),
+        "mutated_genes_list": results.get("mutated_genes_list", []),
+        "message": results.get("message"),
+    })
+    return summary
+
+def run_chunk(chunk):
+    """chunk: list (index, env, seed) -> list ringkasan hasil."""
+    rows = []
+    for index, env, seed in chunk:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = simulation.run_evolution_simulation(env, _worker_tree_path, _worker_genes, seed=seed)
+        rows.append(summarize_result(index, env, seed, results))
+    return rows
+
+
+def _chunked(points, chunk_size, seed):
+    chunk = []
+    for index, env in enumerate(points):
+        # Seed per titik diturunkan dari (seed, index) agar hasil tidak bergantung urutan worker
+        point_seed = int(np.random.SeedSequence([seed, index]).generate_state(1)[0]) if seed is not None else None
+        chunk.append((index, env, point_seed))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _ResultWriter:
+    def __init__(self, f, fmt):
+        self.f = f
+        self.fmt = fmt
+        if fmt == "csv":
+            self.writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == "csv":
+            row = dict(row, mutated_genes_list=";".join(row["mutated_genes_list"]))
+            self.writer.writerow(row)
+        else:
+            self.f.write(json.dumps(row) + "\n")
+
+
+def run_batch(points, output, fmt=None, processes=None, chunk_size=64, seed=None, tree_path=None):
+    """
+    Jalankan semua titik dan tulis hasil ke `output` (path atau file object) begitu
+    setiap chunk selesai (urutan baris = urutan selesai, lihat kolom index).
+    Return jumlah titik yang diproses.
+    """
+    tree_path = tree_path or simulation.TREE_FILE
+    if fmt is None:
+        fmt = "csv" if isinstance(output, str) and output.endswith(".csv") else "jsonl"
+    processes = processes or os.cpu_count() or 1
+    max_in_flight = processes * 2
+
+    own_file = isinstance(output, str)
+    f = open(output, "w", newline="") if own_file else output
+    writer = _ResultWriter(f, fmt)
+    n_done = 0
+    try:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(tree_path,)) as executor:
+            pending = set()
+            for chunk in _chunked(points, chunk_size, seed):
+                # Batasi chunk yang sedang berjalan agar grid besar tidak dimuat sekaligus
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for row in future.result():
+                            writer.write(row)
+                            n_done += 1
+                    f.flush()
+                pending.add(executor.submit(run_chunk, chunk))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for row in future.result():
+                        writer.write(row)
+                        n_done += 1
+                f.flush()
+    finally:
+        if own_file:
+            f.close()
+    return n_done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoBEE headless simulation sweep")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--grid", nargs="+", metavar="PARAM=SPEC",
+                        help="mis. temperature=10:50:5 humidity=20,50,80 flowers=500")
+    source.add_argument("--csv", help="CSV dengan kolom temperature,humidity,flowers")
+    parser.add_argument("--out", required=True, help="File output (.csv atau .jsonl), '-' untuk stdout")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--tree", help="File Newick pohon dasar")
+    args = parser.parse_args(argv)
+
+    if args.grid:
+        axes = {}
+        for item in args.grid:
+            name, _, spec = item.partition("=")
+            axes[name] = parse_axis(spec)
+        missing = [p for p in ENV_PARAMETERS if p not in axes]
+        if missing:
+            parser.error(f"Parameter grid belum lengkap: {', '.join(missing)}")
+        points = grid_points(axes)
+    else:
+        points = read_points_csv(args.csv)
+
+    output = sys.stdout if args.out == "-" else args.out
+    n_done = run_batch(points, output, fmt=args.format, processes=args.processes,
+                       chunk_size=args.chunk_size, seed=args.seed, tree_path=args.tree)
+    print(f"[batch_runner] {n_done} titik selesai.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
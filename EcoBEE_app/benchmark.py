@@ -0,0 +1,208 @@
+"""
+Benchmark hot path simulasi dan filogeni pada beberapa skala data, headless
+(matplotlib Agg, AI di-stub). Hasil bisa disimpan sebagai baseline JSON dan
+dibandingkan dengan run berikutnya; exit code 1 jika ada regresi di atas toleransi.
+
+    python benchmark.py                                   # skala shipped + small
+    python benchmark.py --scales shipped species_1k locus_50kb tree_10k --out hasil.json
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+try:
+    from . import simulation
+    from .ai_service import CallableBackend, ExplanationService
+    from .consensus import clear_profile_cache
+    from .distance import DistanceMatrix, clear_distance_cache
+    from .fitness import compute_fitness
+    from .gen_loader import load_gene_store
+    from .mutation import mutate_sequence
+    from .phylogenetic import add_new_branch, clear_tree_cache, clone_tree, draw_tree_on_axes, get_cached_tree, load_tree
+    from .synthetic_data import generate_dataset
+except ImportError:
+    import simulation
+    from ai_service import CallableBackend, ExplanationService
+    from consensus import clear_profile_cache
+    from distance import DistanceMatrix, clear_distance_cache
+    from fitness import compute_fitness
+    from gen_loader import load_gene_store
+    from mutation import mutate_sequence
+    from phylogenetic import add_new_branch, clear_tree_cache, clone_tree, draw_tree_on_axes, get_cached_tree, load_tree
+    from synthetic_data import generate_dataset
+
+
+# n_species: spesies dengan FASTA, locus_length: panjang tiap gen, n_tips: terminal pohon
+SCALES = {
+    "shipped": None,  # Data di data/ apa adanya
+    "small": {"n_species": 50, "locus_length": 3000, "n_tips": 100},
+    "species_1k": {"n_species": 1000, "locus_length": 3000, "n_tips": 1000},
+    "locus_50kb": {"n_species": 50, "locus_length": 50000, "n_tips": 50},
+    "tree_10k": {"n_species": 100, "locus_length": 2000, "n_tips": 10000},
+}
+DEFAULT_SCALES = ["shipped", "small"]
+DEFAULT_TOLERANCE = 0.25  # Regresi jika median > baseline * (1 + toleransi)
+# Di luar semua rentang threshold.json: selalu lewat jalur mutasi + fitness
+BENCH_ENV = {"temperature": 60.0, "humidity": 5.0, "flowers": 1.0}
+
+
+def write_synthetic_dataset(root, n_species, locus_length, n_tips, seed=0, gene_types=None):
+    """
+    Dataset sintetis (lihat synthetic_data.py) dengan n_tips daun, n_species di antaranya
+    punya FASTA. Return (folder gen_fasta, path pohon).
+    """
+    summary = generate_dataset(root, max(n_tips, n_species), n_fasta=n_species, locus_length=locus_length,
+                               seed=seed, gene_types=gene_types or simulation.GENE_TYPES)
+    return summary["fasta_dir"], summary["tree_path"]
+
+
+def time_case(func, repeat, setup=None):
+    """Jalankan func `repeat` kali (setup() sebelum tiap run, tidak ikut diukur)."""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        if setup is not None:
+            func(state)
+        else:
+            func()
+        times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times), "repeat": repeat}
+
+
+def run_scale(scale_name, repeat=5, seed=0):
+    params = SCALES[scale_name]
+    workdir = tempfile.mkdtemp(prefix=f"ecobee_bench_{scale_name}_")
+    try:
+        if params is None:
+            fasta_dir, tree_path = simulation.FASTA_DIR, simulation.TREE_FILE
+        else:
+            fasta_dir, tree_path = write_synthetic_dataset(workdir, seed=seed, **params)
+        cache_dir = os.path.join(workdir, "gene_cache")
+        results = {}
+
+        results["load_tree"] = time_case(lambda: load_tree(tree_path), repeat)
+
+        clear_tree_cache()
+        base_tree = get_cached_tree(tree_path)
+        tip_name = base_tree.get_terminals()[-1].name
+        results["add_new_branch"] = time_case(
+            lambda: add_new_branch(clone_tree(base_tree), tip_name, "Bench_new", branch_length=0.1), repeat)
+
+        figure = Figure(figsize=(6, 8), dpi=100)
+        canvas = FigureCanvasAgg(figure)
+        ax = figure.add_subplot(111)
+        def draw():
+            draw_tree_on_axes(base_tree, ax, highlight_species_name=tip_name)
+            canvas.draw()
+        results["draw_tree_on_axes"] = time_case(draw, repeat)
+
+        results["load_genes_cold"] = time_case(
+            lambda _: load_gene_store(fasta_dir, simulation.GENE_TYPES, cache_dir), repeat,
+            setup=lambda: shutil.rmtree(cache_dir, ignore_errors=True))
+        results["load_genes_warm"] = time_case(
+            lambda: load_gene_store(fasta_dir, simulation.GENE_TYPES, cache_dir), repeat)
+        genes = load_gene_store(fasta_dir, simulation.GENE_TYPES, cache_dir)
+
+        gene_type = genes.gene_types[0]
+        results["get_average_sequence"] = time_case(
+            lambda _: simulation.get_average_sequence(genes, gene_type), repeat, setup=clear_profile_cache)
+        consensus = simulation.get_average_sequence(genes, gene_type)
+        results["mutate_sequence"] = time_case(lambda: mutate_sequence(consensus, seed=seed), repeat)
+        mutant = mutate_sequence(consensus, seed=seed)
+        results["compute_fitness"] = time_case(lambda: compute_fitness(mutant, genes), repeat)
+
+        results["distance_matrix"] = time_case(lambda: DistanceMatrix.from_gene_store(genes), repeat)
+        distances = DistanceMatrix.from_gene_store(genes)
+        results["neighbor_joining"] = time_case(lambda: distances.to_tree("nj"), repeat)
+        results["distance_add_species"] = time_case(
+            lambda matrix: matrix.add("Bench_new", {gene_type: mutant}), repeat, setup=lambda: distances.copy(reserve=1))
+
+        def end_to_end(_):
+            with contextlib.redirect_stdout(io.StringIO()):
+                return simulation.run_evolution_simulation(BENCH_ENV, tree_path, genes, seed=seed)
+        results["run_evolution_simulation"] = time_case(end_to_end, repeat, setup=clear_profile_cache)
+
+        # AI di-stub: hanya overhead prompt + ExplanationService, tanpa jaringan
+        service = ExplanationService(CallableBackend(lambda prompt: "stub"), timeout=5, retries=0)
+        evolution = end_to_end(None)
+        prompt_data = {"parent_species": evolution.get("parent_of_evolution"),
+                       "evolved_species_name": evolution.get("new_species_name"),
+                       "mutated_genes": evolution.get("mutated_genes_list")}
+        results["ai_explanation_stub"] = time_case(
+            lambda: service.explain_blocking(simulation.generate_ai_prompt(prompt_data, BENCH_ENV)), repeat)
+        service.close()
+        return results
+    finally:
+        clear_tree_cache()
+        clear_profile_cache()
+        clear_distance_cache()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_benchmarks(scales=None, repeat=5, seed=0):
+    report = {"python": sys.version.split()[0], "repeat": repeat, "scales": {}}
+    for scale_name in scales or DEFAULT_SCALES:
+        print(f"[benchmark] {scale_name}...", file=sys.stderr)
+        report["scales"][scale_name] = run_scale(scale_name, repeat, seed)
+    return report
+
+def compare_to_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """List (skala, case, baseline_s, sekarang_s) yang lebih lambat dari baseline * (1 + tolerance)."""
+    regressions = []
+    for scale_name, cases in report["scales"].items():
+        for case, result in cases.items():
+            reference = baseline.get("scales", {}).get(scale_name, {}).get(case)
+            if reference and result["median_s"] > reference["median_s"] * (1 + tolerance):
+                regressions.append((scale_name, case, reference["median_s"], result["median_s"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoBEE performance benchmarks")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=DEFAULT_SCALES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Tulis hasil ke file JSON")
+    parser.add_argument("--save-baseline", help="Simpan hasil sebagai baseline JSON")
+    parser.add_argument("--baseline", help="Bandingkan dengan baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.scales, args.repeat, args.seed)
+    for scale_name, cases in report["scales"].items():
+        for case, result in cases.items():
+            print(f"{scale_name:>12} {case:<26} median {result['median_s'] * 1000:10.2f} ms"
+                  f"   min {result['min_s'] * 1000:10.2f} ms")
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for scale_name, case, before, after in regressions:
+            print(f"[benchmark] REGRESSION {scale_name}/{case}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import numpy as np
+
+try:
+    from .gene_store import GeneStore, decode_sequence
+except ImportError:
+    from gene_store import GeneStore, decode_sequence
+
+
+MAX_CACHED_PROFILES = 64
+
+_profile_cache = {}  # (gene_type, fingerprint) -> GeneProfile
+
+
+class GeneProfile:
+    """
+    Position frequency matrix satu gene type: counts[a, i] = jumlah sequence
+    dengan simbol alphabet[a] di posisi i (sequence dipotong ke panjang terpendek).
+    """
+
+    def __init__(self, gene_type, fingerprint, alphabet, counts, consensus_codes, n_sequences):
+        self.gene_type = gene_type
+        self.fingerprint = fingerprint
+        self.alphabet = alphabet
+        self.counts = counts
+        self.consensus_codes = consensus_codes
+        self.n_sequences = n_sequences
+
+    @property
+    def length(self):
+        return self.counts.shape[1]
+
+    @property
+    def frequencies(self):
+        if self.n_sequences == 0:
+            return self.counts.astype(np.float64)
+        return self.counts / float(self.n_sequences)
+
+    def consensus_sequence(self):
+        return decode_sequence(self.consensus_codes)
+
+
+def compute_profile(gene_matrix):
+    codes = gene_matrix.codes()
+    n_sequences = len(gene_matrix)
+    min_len = int(gene_matrix.lengths.min()) if n_sequences else 0
+    codes = codes[:, :min_len]
+
+    alphabet = np.unique(codes) if min_len else np.zeros(0, dtype=np.uint8)
+    counts = np.empty((len(alphabet), min_len), dtype=np.int64)
+    first_row = np.empty((len(alphabet), min_len), dtype=np.int64)
+    for a, symbol in enumerate(alphabet):
+        is_symbol = codes == symbol
+        counts[a] = is_symbol.sum(axis=0)
+        first_row[a] = np.where(counts[a] > 0, is_symbol.argmax(axis=0), n_sequences)
+
+    # Sama seperti Counter.most_common: jika seri, pilih basa yang muncul pertama
+    if min_len:
+        is_max = counts == counts.max(axis=0)
+        winner = np.where(is_max, first_row, n_sequences + 1).argmin(axis=0)
+        consensus_codes = alphabet[winner]
+    else:
+        consensus_codes = np.zeros(0, dtype=np.uint8)
+
+    return GeneProfile(gene_matrix.gene_type, gene_matrix.fingerprint, alphabet, counts,
+                       consensus_codes, n_sequences)
+
+
+def get_gene_profile(species_genes_data, gene_type):
+    """
+    Profile (PFM + consensus) untuk gene_type, dihitung sekali per isi sequence
+    dan dipakai ulang antar run simulasi. None jika tidak ada sequence.
+    """
+    if not species_genes_data:
+        return None
+    # Dict biasa: hanya gen ini yang di-encode, bukan semua gen
+    store = GeneStore.from_records(species_genes_data, gene_types=[gene_type])
+    gene_matrix = store.matrix(gene_type)
+    if gene_matrix is None or len(gene_matrix) == 0:
+        return None
+
+    key = (gene_type, gene_matrix.fingerprint)
+    profile = _profile_cache.get(key)
+    if profile is None:
+        profile = compute_profile(gene_matrix)
+        if len(_profile_cache) >= MAX_CACHED_PROFILES:
+            _profile_cache.pop(next(iter(_profile_cache)))
+        _profile_cache[key] = profile
+    return profile
+
+
+def clear_profile_cache():
+    _profile_cache.clear()
@@ -0,0 +1,423 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from Bio.Phylo.Newick import Clade, Tree
+
+try:
+    from .gene_store import PAD_CODE, GeneStore, encode_sequence
+except ImportError:
+    from gene_store import PAD_CODE, GeneStore, encode_sequence
+
+
+DISTANCE_MODELS = ("p", "jc69")
+JC_MAX_P = 0.7499  # p-distance >= 0.75 tidak terdefinisi di Jukes-Cantor: dijenuhkan di sini
+# Perbandingan posisi demi posisi hanya bermakna untuk locus yang sudah sejajar (aligned).
+# Pasangan yang panjangnya jauh berbeda atau p-distance-nya mendekati jenuh (sequence
+# acak: 0.75) dianggap tidak sejajar; p-distance-nya diperkirakan tanpa alignment dari
+# k-mer bersama (seperti Mash): containment C = |A & B| / min(|A|, |B|), p = 1 - C^(1/k).
+MAX_ALIGNED_P = 0.5
+MAX_LENGTH_DIFFERENCE = 0.1  # Selisih panjang relatif terhadap sequence terpanjang
+KMER_SIZE = 12
+KMER_MIN_SIGNAL = 10.0  # k-mer bersama harus >= 10x jumlah yang diharapkan dari kebetulan
+MAX_CACHED_MATRICES = 8
+
+_matrix_cache = {}  # (fingerprint per gen, model) -> DistanceMatrix
+
+
+def _as_codes(sequence):
+    if isinstance(sequence, np.ndarray):
+        return sequence
+    return encode_sequence(getattr(sequence, "seq", sequence))
+
+def correct_distances(p, model):
+    """p-distance -> jarak model (NaN tetap NaN)."""
+    if model == "p":
+        return p
+    if model == "jc69":
+        return -0.75 * np.log(1.0 - (4.0 / 3.0) * np.minimum(p, JC_MAX_P))
+    raise ValueError(f"Unknown distance model {model!r}, expected one of {DISTANCE_MODELS}.")
+
+
+def kmer_set(codes, k=KMER_SIZE):
+    """k-mer unik (int64) dari kode gene_store; jendela yang memuat PAD/N dilewati."""
+    codes = np.asarray(codes)
+    if len(codes) < k:
+        return np.zeros(0, dtype=np.int64)
+    invalid = np.concatenate(([0], np.cumsum(codes >= 4)))
+    valid = (invalid[k:] - invalid[:-k]) == 0
+    values = sliding_window_view(codes.astype(np.int64) & 3, k) @ (4 ** np.arange(k - 1, -1, -1, dtype=np.int64))
+    return np.unique(values[valid])
+
+def kmer_p_distance(set_a, set_b, k=KMER_SIZE):
+    """
+    Perkiraan p-distance tanpa alignment dari dua kmer_set. NaN jika k-mer bersama tidak
+    jelas di atas kebetulan (KMER_MIN_SIGNAL) atau p > MAX_ALIGNED_P, sama seperti jalur sejajar.
+    """
+    smaller = min(len(set_a), len(set_b))
+    if smaller == 0:
+        return np.nan
+    containment = np.intersect1d(set_a, set_b, assume_unique=True).size / smaller
+    chance = max(len(set_a), len(set_b)) / 4.0 ** k  # Containment sequence acak
+    if containment < KMER_MIN_SIGNAL * chance:
+        return np.nan
+    p = 1.0 - containment ** (1.0 / k)
+    return p if p <= MAX_ALIGNED_P else np.nan
+
+def _unaligned(p, length_a, length_b):
+    """True untuk pasangan yang kemungkinan tidak sejajar (lihat MAX_ALIGNED_P)."""
+    longer = np.maximum(length_a, length_b)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        difference = np.abs(length_a - length_b) / longer
+    return ((p > MAX_ALIGNED_P) | (difference > MAX_LENGTH_DIFFERENCE)) & (length_a > 0) & (length_b > 0)
+
+def pairwise_distances(codes, model="jc69"):
+    """
+    Jarak all-pairs (N x N) untuk matriks kode (N x L) gene_store. Hanya posisi yang
+    ACGT di kedua sequence yang dibandingkan (PAD/N dilewati); NaN jika tidak ada.
+    Dihitung sebagai perkalian matriks indikator per basa (BLAS), bukan loop pasangan;
+    pasangan yang tidak sejajar memakai perkiraan k-mer (kmer_p_distance).
+    """
+    valid = (codes < 4).astype(np.float32)
+    compared = valid @ valid.T
+    matches = np.zeros_like(compared)
+    for base in range(4):
+        is_base = (codes == base).astype(np.float32)
+        matches += is_base @ is_base.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = 1.0 - matches.astype(np.float64) / compared
+    p[compared == 0] = np.nan
+    lengths = (codes != PAD_CODE).sum(axis=1)
+    unaligned = np.triu(_unaligned(p, lengths[:, None], lengths[None, :]), 1)
+    sets = {}
+    for i, j in zip(*np.nonzero(unaligned)):
+        for row in (i, j):
+            if row not in sets:
+                sets[row] = kmer_set(codes[row, :lengths[row]])
+        p[i, j] = p[j, i] = kmer_p_distance(sets[i], sets[j])
+    distances = correct_distances(p, model)
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+def row_distances(codes, sequence_codes, model="jc69"):
+    """Jarak satu sequence ke setiap baris codes (N x L), O(N * L); baris tidak sejajar seperti pairwise_distances."""
+    width = min(codes.shape[1], len(sequence_codes))
+    existing = codes[:, :width]
+    new = sequence_codes[:width]
+    both_valid = (existing < 4) & (new < 4)
+    compared = both_valid.sum(axis=1)
+    mismatches = ((existing != new) & both_valid).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = mismatches / compared
+    p[compared == 0] = np.nan
+    lengths = (codes != PAD_CODE).sum(axis=1)
+    unaligned = np.flatnonzero(_unaligned(p, lengths, np.count_nonzero(sequence_codes != PAD_CODE)))
+    if len(unaligned):
+        sequence_kmers = kmer_set(sequence_codes)
+        for i in unaligned:
+            p[i] = kmer_p_distance(kmer_set(codes[i, :lengths[i]]), sequence_kmers)
+    return correct_distances(p, model)
+
+
+def combine_distances(per_gene):
+    """Rata-rata jarak antar gen (gen yang NaN untuk pasangan itu dilewati)."""
+    stacked = np.stack(per_gene)
+    present = ~np.isnan(stacked)
+    counts = present.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        combined = np.where(present, stacked, 0.0).sum(axis=0) / counts
+    combined[counts == 0] = np.nan
+    return combined
+
+
+class DistanceMatrix:
+    """
+    Jarak all-pairs per gen dan gabungan (rata-rata antar gen) untuk semua spesies.
+    Spesies baru (mis. hasil evolusi) ditambah dengan add(): hanya satu baris baru
+    yang dihitung, O(N * L), bukan seluruh matriks. Kapasitas tumbuh dua kali lipat,
+    jadi array tidak dialokasikan ulang setiap kali add.
+    """
+
+    def __init__(self, gene_types, model="jc69"):
+        if model not in DISTANCE_MODELS:
+            raise ValueError(f"Unknown distance model {model!r}, expected one of {DISTANCE_MODELS}.")
+        self.model = model
+        self.gene_types = list(gene_types)
+        self.species = []
+        self.index = {}
+        self._codes = {gene_type: np.full((0, 0), PAD_CODE, dtype=np.uint8) for gene_type in self.gene_types}
+        self._distances = {gene_type: np.full((0, 0), np.nan) for gene_type in self.gene_types}
+        self._combined = None
+
+    @classmethod
+    def from_gene_store(cls, species_genes_data, model="jc69"):
+        store = GeneStore.from_records(species_genes_data)
+        matrix = cls(store.gene_types, model)
+        matrix.species = list(store)
+        matrix.index = {name: i for i, name in enumerate(matrix.species)}
+        n_species = len(matrix.species)
+        for gene_type in store.gene_types:
+            gene_matrix = store.matrix(gene_type)
+            codes = np.full((n_species, gene_matrix.width), PAD_CODE, dtype=np.uint8)
+            rows = [matrix.index[name] for name in gene_matrix.species]
+            codes[rows] = gene_matrix.codes()  # Spesies tanpa gen ini: baris PAD, jaraknya NaN
+            matrix._codes[gene_type] = codes
+            matrix._distances[gene_type] = pairwise_distances(codes, model)
+        return matrix
+
+    def __len__(self):
+        return len(self.species)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def copy(self, reserve=0):
+        """Salinan independen; reserve = tempat untuk spesies tambahan tanpa alokasi ulang."""
+        other = DistanceMatrix(self.gene_types, self.model)
+        other.species = list(self.species)
+        other.index = dict(self.index)
+        n_species = len(self.species)
+        for gene_type in self.gene_types:
+            codes = self._codes[gene_type]
+            other._codes[gene_type] = np.full((n_species + reserve, codes.shape[1]), PAD_CODE, dtype=np.uint8)
+            other._codes[gene_type][:n_species] = codes[:n_species]
+            other._distances[gene_type] = np.full((n_species + reserve, n_species + reserve), np.nan)
+            other._distances[gene_type][:n_species, :n_species] = self.distances(gene_type)
+        return other
+
+    def distances(self, gene_type=None):
+        """Matriks N x N untuk satu gen, atau gabungan semua gen jika gene_type None."""
+        n_species = len(self.species)
+        if gene_type is not None:
+            return self._distances[gene_type][:n_species, :n_species]
+        if self._combined is None:
+            self._combined = combine_distances([self.distances(g) for g in self.gene_types])
+        return self._combined
+
+    def is_complete(self):
+        """True jika setiap pasangan spesies punya jarak gabungan (tidak ada NaN)."""
+        return not np.isnan(self.distances()).any()
+
+    def distance(self, species_a, species_b, gene_type=None):
+        return float(self.distances(gene_type)[self.index[species_a], self.index[species_b]])
+
+    def distances_to(self, sequences):
+        """
+        Jarak gabungan dari sequence {gen: sequence} ke semua spesies, tanpa menambahkannya.
+        Gen yang tidak ada di sequences dilewati.
+        """
+        return combine_distances(list(self._rows(sequences).values()))
+
+    def _rows(self, sequences):
+        rows = {}
+        n_species = len(self.species)
+        for gene_type, sequence in sequences.items():
+            if gene_type not in self._codes:
+                continue
+            rows[gene_type] = row_distances(self._codes[gene_type][:n_species], _as_codes(sequence), self.model)
+        if not rows:
+            rows[None] = np.full(n_species, np.nan)
+        return rows
+
+    def _reserve(self, gene_type, n_rows, width):
+        codes = self._codes[gene_type]
+        distances = self._distances[gene_type]
+        capacity = codes.shape[0]
+        if n_rows > capacity or width > codes.shape[1]:
+            new_capacity = max(n_rows, 2 * capacity) if n_rows > capacity else capacity
+            grown = np.full((new_capacity, max(width, codes.shape[1])), PAD_CODE, dtype=np.uint8)
+            grown[:capacity, :codes.shape[1]] = codes
+            self._codes[gene_type] = grown
+        if n_rows > distances.shape[0]:
+            new_capacity = self._codes[gene_type].shape[0]
+            grown = np.full((new_capacity, new_capacity), np.nan)
+            grown[:distances.shape[0], :distances.shape[1]] = distances
+            self._distances[gene_type] = grown
+
+    def add(self, name, sequences):
+        """Tambah satu spesies {gen: sequence}; gen yang tidak diberikan dianggap tidak ada (NaN)."""
+        if name in self.index:
+            raise ValueError(f"Species '{name}' already in the distance matrix.")
+        position = len(self.species)
+        rows = self._rows(sequences)  # Sebelum gen baru didaftarkan: spesies lain belum punya gen itu
+        for gene_type in sequences:
+            if gene_type not in self._codes:
+                self.gene_types.append(gene_type)
+                self._codes[gene_type] = np.full((0, 0), PAD_CODE, dtype=np.uint8)
+                self._distances[gene_type] = np.full((0, 0), np.nan)
+
+        for gene_type in self.gene_types:
+            sequence_codes = _as_codes(sequences[gene_type]) if gene_type in sequences else None
+            width = len(sequence_codes) if sequence_codes is not None else 0
+            self._reserve(gene_type, position + 1, width)
+            codes = self._codes[gene_type]
+            distances = self._distances[gene_type]
+            codes[position] = PAD_CODE
+            if sequence_codes is None:
+                distances[position, :position + 1] = np.nan
+                distances[:position + 1, position] = np.nan
+                continue
+            codes[position, :width] = sequence_codes
+            row = rows.get(gene_type, np.nan)
+            distances[position, :position] = row
+            distances[:position, position] = row
+            distances[position, position] = 0.0
+
+        self.species.append(name)
+        self.index[name] = position
+        self._combined = None
+
+    def to_tree(self, method="nj", names=None):
+        """Rekonstruksi pohon dari jarak gabungan: "nj" (neighbor-joining) atau "upgma"."""
+        return build_tree(self.distances(), names or self.species, method)
+
+
+def _prepare(distances):
+    d = np.array(distances, dtype=np.float64)
+    finite = np.isfinite(d)
+    # Pasangan tanpa gen yang bisa dibandingkan: anggap sejauh pasangan terjauh
+    fill = d[finite].max() if finite.any() else 1.0
+    d[~finite] = fill
+    d = (d + d.T) / 2.0
+    np.fill_diagonal(d, 0.0)
+    return d
+
+def _clade(name=None, branch_length=None, clades=None):
+    if branch_length is not None:
+        branch_length = max(0.0, float(branch_length))  # NJ bisa menghasilkan panjang negatif
+    return Clade(name=name, branch_length=branch_length, clades=clades or [])
+
+def _move_last(d, nodes, j, m, extra=None):
+    # Hapus baris/kolom j dengan memindahkan baris terakhir ke posisinya (O(m), tanpa salin matriks)
+    last = m - 1
+    if j != last:
+        d[j, :m] = d[last, :m]
+        d[:m, j] = d[:m, last]
+        d[j, j] = d[last, last]
+        nodes[j] = nodes[last]
+        if extra is not None:
+            for array in extra:
+                array[j] = array[last]
+    nodes.pop()
+
+
+def neighbor_joining(distances, names):
+    """Pohon neighbor-joining (tidak berakar, root = join terakhir tiga node). O(N^3) tervektorisasi."""
+    d = _prepare(distances)
+    nodes = [_clade(name) for name in names]
+    m = len(nodes)
+    if m < 3:
+        return upgma(distances, names)
+
+    row_sums = d.sum(axis=1)
+    scratch = np.empty(m * m)
+    while m > 3:
+        view = d[:m, :m]
+        q = scratch[:m * m].reshape(m, m)  # Buffer Q dipakai ulang, tanpa alokasi per langkah
+        np.multiply(view, m - 2, out=q)
+        q -= row_sums[:m, None]
+        q -= row_sums[None, :m]
+        q.flat[::m + 1] = np.inf
+        i, j = divmod(int(np.argmin(q)), m)
+        if i > j:
+            i, j = j, i
+        d_ij = view[i, j]
+        length_i = 0.5 * d_ij + (row_sums[i] - row_sums[j]) / (2.0 * (m - 2))
+        nodes[i].branch_length = max(0.0, float(length_i))
+        nodes[j].branch_length = max(0.0, float(d_ij - length_i))
+        new_row = 0.5 * (view[i] + view[j] - d_ij)
+        new_row[i] = 0.0
+
+        # Update row_sums secara inkremental: kolom i diganti, kolom j dihapus
+        row_sums[:m] += new_row - view[:, i] - view[:, j]
+        d[i, :m] = new_row
+        d[:m, i] = new_row
+        row_sums[i] = new_row.sum() - new_row[j]
+        nodes[i] = _clade(clades=[nodes[i], nodes[j]])
+        _move_last(d, nodes, j, m, extra=(row_sums,))
+        m -= 1
+
+    a, b, c = nodes
+    d_ab, d_ac, d_bc = d[0, 1], d[0, 2], d[1, 2]
+    a.branch_length = max(0.0, float(d_ab + d_ac - d_bc) / 2.0)
+    b.branch_length = max(0.0, float(d_ab + d_bc - d_ac) / 2.0)
+    c.branch_length = max(0.0, float(d_ac + d_bc - d_ab) / 2.0)
+    return Tree(root=_clade(branch_length=0.0, clades=[a, b, c]), rooted=False)
+
+def upgma(distances, names):
+    """Pohon UPGMA (berakar, ultrametrik). O(N^2) per langkah gabung."""
+    d = _prepare(distances)
+    nodes = [_clade(name) for name in names]
+    m = len(nodes)
+    if m == 0:
+        raise ValueError("Cannot build a tree from an empty distance matrix.")
+    sizes = np.ones(m)
+    heights = np.zeros(m)
+    np.fill_diagonal(d, np.inf)
+    while m > 1:
+        view = d[:m, :m]
+        i, j = divmod(int(np.argmin(view)), m)
+        if i > j:
+            i, j = j, i
+        height = view[i, j] / 2.0
+        nodes[i].branch_length = max(0.0, float(height - heights[i]))
+        nodes[j].branch_length = max(0.0, float(height - heights[j]))
+        new_row = (view[i] * sizes[i] + view[j] * sizes[j]) / (sizes[i] + sizes[j])
+        new_row[i] = np.inf
+        d[i, :m] = new_row
+        d[:m, i] = new_row
+        nodes[i] = _clade(clades=[nodes[i], nodes[j]])
+        sizes[i] += sizes[j]
+        heights[i] = height
+        _move_last(d, nodes, j, m, extra=(sizes, heights))
+        m -= 1
+    nodes[0].branch_length = 0.0
+    return Tree(root=nodes[0], rooted=True)
+
+TREE_METHODS = {"nj": neighbor_joining, "upgma": upgma}
+
+def build_tree(distances, names, method="nj"):
+    if method not in TREE_METHODS:
+        raise ValueError(f"Unknown tree method {method!r}, expected one of {list(TREE_METHODS)}.")
+    if len(names) != len(distances):
+        raise ValueError("Number of names does not match the distance matrix.")
+    return TREE_METHODS[method](distances, list(names))
+
+
+def get_distance_matrix(species_genes_data, model="jc69"):
+    """
+    DistanceMatrix untuk semua spesies, dihitung sekali per isi sequence (fingerprint
+    GeneMatrix) dan dipakai ulang. Jangan add() ke hasil ini: pakai copy() dulu.
+    """
+    store = GeneStore.from_records(species_genes_data)
+    key = (tuple((g, store.matrix(g).fingerprint) for g in store.gene_types), model)
+    matrix = _matrix_cache.get(key)
+    if matrix is None:
+        matrix = DistanceMatrix.from_gene_store(store, model)
+        if len(_matrix_cache) >= MAX_CACHED_MATRICES:
+            _matrix_cache.pop(next(iter(_matrix_cache)))
+        _matrix_cache[key] = matrix
+    return matrix
+
+def distances_to_store(species_genes_data, sequences, model="jc69"):
+    """
+    {spesies: jarak gabungan} dari sequence {gen: sequence} ke setiap spesies di data gen,
+    O(N * L) langsung dari GeneStore (tanpa membangun matriks N x N).
+    """
+    store = GeneStore.from_records(species_genes_data)
+    per_gene = []
+    species = list(store)
+    index = {name: i for i, name in enumerate(species)}
+    for gene_type, sequence in sequences.items():
+        gene_matrix = store.matrix(gene_type)
+        if gene_matrix is None:
+            continue
+        row = np.full(len(species), np.nan)
+        rows = [index[name] for name in gene_matrix.species]
+        row[rows] = row_distances(gene_matrix.codes(), _as_codes(sequence), model)
+        per_gene.append(row)
+    if not per_gene:
+        return {}
+    combined = combine_distances(per_gene)
+    return {name: float(combined[i]) for i, name in enumerate(species) if not np.isnan(combined[i])}
+
+def clear_distance_cache():
+    _matrix_cache.clear()
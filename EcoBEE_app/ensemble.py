@@ -0,0 +1,269 @@
+"""
+Ensemble evolusi: terapkan satu event evolusi (induk, nama spesies baru, panjang
+cabang) ke semua pohon alternatif di file Newick, atau sampel sebagian, secara
+paralel. Hasilnya placement support (seberapa sering cabang baru jatuh di bawah
+tiap clade induk) dan pohon konsensus majority-rule dengan nilai support.
+Pohon dibaca per chunk dari file (index byte-offset), jadi memori tidak
+bergantung pada ukuran ensemble.
+
+    python ensemble.py --env temperature=45 humidity=10 flowers=5 --seed 1 --out konsensus.nwk
+    python ensemble.py --parent Apis_laboriosa --name Evolved_X --sample 200 --burnin 100
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from Bio.Phylo.Newick import Clade, Tree
+
+try:
+    from . import simulation
+    from .phylogenetic import count_trees, iter_trees, load_tree, save_tree
+    from .replicates import parse_env
+    from .tree_utils import IndexedTree
+except ImportError:
+    import simulation
+    from phylogenetic import count_trees, iter_trees, load_tree, save_tree
+    from replicates import parse_env
+    from tree_utils import IndexedTree
+
+
+DEFAULT_CHUNK_SIZE = 50
+MAJORITY_THRESHOLD = 0.5
+
+
+def evolution_event(env, all_species_genes_data, tree_path, seed=None):
+    """Jalankan satu simulasi dan ambil event-nya: {"parent", "name", "branch_length"}, atau None."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = simulation.run_evolution_simulation(env, tree_path, all_species_genes_data, seed=seed)
+    if results.get("status") != "evolution_simulated":
+        return None
+    return {
+        "parent": results["parent_of_evolution"],
+        "name": results["new_species_name"],
+        "branch_length": results.get("branch_length", simulation.NEW_BRANCH_LENGTH),
+    }
+
+
+def select_trees(n_trees, sample=None, burnin=0, seed=None):
+    """Index pohon yang dipakai: semua setelah burn-in, atau `sample` index acak (terurut)."""
+    indices = np.arange(min(burnin, n_trees), n_trees)
+    if sample is not None and sample < len(indices):
+        indices = np.sort(np.random.default_rng(seed).choice(indices, size=sample, replace=False))
+    return [int(i) for i in indices]
+
+def _read_trees(tree_path, indices):
+    # Index berurutan dibaca sebagai satu rentang; sampel acak dibaca per record
+    if indices and indices[-1] - indices[0] == len(indices) - 1:
+        yield from zip(indices, iter_trees(tree_path, indices[0], indices[-1] + 1))
+    else:
+        for index in indices:
+            yield index, load_tree(tree_path, index)
+
+
+def _clade_masks(root, taxon_bits):
+    """{id(clade): bitmask terminal di bawahnya}, postorder iteratif."""
+    masks = {}
+    stack = [(root, False)]
+    while stack:
+        clade, expanded = stack.pop()
+        if clade.clades and not expanded:
+            stack.append((clade, True))
+            stack.extend((child, False) for child in clade.clades)
+            continue
+        if clade.clades:
+            mask = 0
+            for child in clade.clades:
+                mask |= masks[id(child)]
+        else:
+            if clade.name not in taxon_bits:
+                raise ValueError(f"Taxon {clade.name} is not in the first tree of the ensemble.")
+            mask = taxon_bits[clade.name]
+        masks[id(clade)] = mask
+    return masks
+
+def graft_and_count(tree, event, taxon_bits):
+    """
+    Tempel event ke pohon (di tempat) lalu return (clade -> branch_length untuk setiap
+    clade non-root, bitmask clade induk tempat cabang baru menempel).
+    """
+    indexed = IndexedTree(tree, copy=False, read_only=False)  # Pohon baru di-parse, boleh diubah
+    new_clade = indexed.add_branch(event["parent"], event["name"], branch_length=event["branch_length"])
+    masks = _clade_masks(indexed.tree.root, taxon_bits)
+
+    attach = indexed.parent_of(new_clade)  # Posisi induk (daun induk yang menjadi node internal)
+    above = indexed.parent_of(attach) if not attach.name else attach
+    placement = masks[id(above if above is not None else attach)] & ~taxon_bits[event["name"]]
+
+    clades = {}
+    stack = list(indexed.tree.root.clades)
+    while stack:
+        clade = stack.pop()
+        clades[masks[id(clade)]] = clade.branch_length or 0.0
+        stack.extend(clade.clades)
+    return clades, placement
+
+def run_tree_chunk(tree_path, indices, event, taxa):
+    """Worker: baca pohon di indices, tempel event, return hitungan clade/placement chunk ini."""
+    taxon_bits = {name: 1 << i for i, name in enumerate(taxa)}
+    clade_counts, length_sums, placements = Counter(), Counter(), Counter()
+    skipped = []
+    for index, tree in _read_trees(tree_path, indices):
+        try:
+            clades, placement = graft_and_count(tree, event, taxon_bits)
+        except ValueError as e:
+            skipped.append((index, str(e)))
+            continue
+        for mask, branch_length in clades.items():
+            clade_counts[mask] += 1
+            length_sums[mask] += branch_length
+        placements[placement] += 1
+    return len(indices) - len(skipped), clade_counts, length_sums, placements, skipped
+
+
+def _taxa_names(mask, taxa):
+    return [name for i, name in enumerate(taxa) if mask >> i & 1]
+
+def majority_rule_consensus(clade_counts, length_sums, taxa, n_trees, threshold=MAJORITY_THRESHOLD):
+    """
+    Pohon konsensus dari clade dengan frekuensi > threshold (>= 0.5 selalu saling kompatibel).
+    confidence = frekuensi clade, branch_length = rata-rata di pohon yang memuat clade itu.
+    """
+    full = (1 << len(taxa)) - 1
+    root = Clade(branch_length=0.0)
+    root_mask = {id(root): full}
+
+    def insert(mask, clade):
+        # Turun dari root ke clade terkecil yang sudah ada dan memuat mask
+        parent = root
+        while True:
+            child = next((c for c in parent.clades if root_mask[id(c)] & mask == mask
+                          and root_mask[id(c)] != mask), None)
+            if child is None:
+                break
+            parent = child
+        moved = [c for c in parent.clades if root_mask[id(c)] & mask == root_mask[id(c)]]
+        parent.clades = [c for c in parent.clades if root_mask[id(c)] & mask != root_mask[id(c)]] + [clade]
+        clade.clades = moved
+        root_mask[id(clade)] = mask
+
+    majority = [mask for mask, count in clade_counts.items()
+                if count / n_trees > threshold and mask != full and mask & (mask - 1)]
+    for mask in sorted(majority, key=lambda m: -m.bit_count()):
+        insert(mask, Clade(branch_length=length_sums[mask] / clade_counts[mask],
+                           confidence=round(clade_counts[mask] / n_trees, 4)))
+    for i, name in enumerate(taxa):
+        mask = 1 << i
+        count = clade_counts.get(mask, 0)
+        insert(mask, Clade(name=name, branch_length=length_sums[mask] / count if count else 0.0))
+    return Tree(root=root, rooted=True)
+
+
+def run_ensemble(event, tree_path=None, sample=None, burnin=0, seed=None, processes=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, threshold=MAJORITY_THRESHOLD, progress=None):
+    """
+    Terapkan event ke pohon ensemble. Return dict: n_trees, placement_support
+    (list {"clade": [taxa], "count", "support"} terurut), consensus_tree, skipped.
+    progress(n_done, n_total) dipanggil setiap chunk selesai.
+    """
+    tree_path = tree_path or simulation.TREE_FILE
+    indices = select_trees(count_trees(tree_path), sample, burnin, seed)
+    if not indices:
+        raise ValueError(f"No trees selected from {tree_path}.")
+    # Urutan taxon tetap dari pohon pertama + spesies baru (bit clade di semua worker sama)
+    first_tree = load_tree(tree_path, indices[0])
+    taxa = sorted(c.name for c in first_tree.get_terminals()) + [event["name"]]
+    chunks = [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)]
+    processes = processes or os.cpu_count() or 1
+
+    totals = [0, Counter(), Counter(), Counter(), []]
+    def merge(result):
+        n_done, clade_counts, length_sums, placements, skipped = result
+        totals[0] += n_done
+        totals[1].update(clade_counts)
+        totals[2].update(length_sums)
+        totals[3].update(placements)
+        totals[4].extend(skipped)
+        if progress is not None:
+            progress(totals[0] + len(totals[4]), len(indices))
+
+    if processes <= 1 or len(chunks) == 1:
+        for chunk in chunks:
+            merge(run_tree_chunk(tree_path, chunk, event, taxa))
+    else:
+        # Worker membaca pohon sendiri dari file; task hanya berisi index + event
+        with ProcessPoolExecutor(processes) as executor:
+            pending = set()
+            for chunk in chunks:
+                if len(pending) >= processes * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        merge(future.result())
+                pending.add(executor.submit(run_tree_chunk, tree_path, chunk, event, taxa))
+            for future in pending:
+                merge(future.result())
+
+    n_trees, clade_counts, length_sums, placements, skipped = totals
+    if n_trees == 0:
+        raise ValueError(f"Event could not be applied to any tree: {skipped[0][1] if skipped else 'no trees'}")
+    placement_support = [
+        {"clade": _taxa_names(mask, taxa), "count": count, "support": count / n_trees}
+        for mask, count in placements.most_common()
+    ]
+    return {
+        "event": event,
+        "n_trees": n_trees,
+        "placement_support": placement_support,
+        "consensus_tree": majority_rule_consensus(clade_counts, length_sums, taxa, n_trees, threshold),
+        "skipped": skipped,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoBEE ensemble evolution over all trees in a Newick file")
+    event_source = parser.add_mutually_exclusive_group(required=True)
+    event_source.add_argument("--env", nargs="+", help="temperature=.. humidity=.. flowers=.. (simulasi menentukan event)")
+    event_source.add_argument("--parent", help="Nama induk di pohon (event manual, bersama --name)")
+    parser.add_argument("--name", help="Nama spesies baru untuk --parent")
+    parser.add_argument("--branch-length", type=float, default=simulation.NEW_BRANCH_LENGTH)
+    parser.add_argument("--tree", default=simulation.TREE_FILE)
+    parser.add_argument("--sample", type=int, help="Jumlah pohon acak (default semua)")
+    parser.add_argument("--burnin", type=int, default=0, help="Lewati N pohon pertama")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--threshold", type=float, default=MAJORITY_THRESHOLD)
+    parser.add_argument("--out", help="Tulis pohon konsensus (Newick) ke file ini")
+    args = parser.parse_args(argv)
+
+    if args.env:
+        try:
+            env = parse_env(args.env)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        event = evolution_event(env, simulation.load_genes(), args.tree, seed=args.seed)
+        if event is None:
+            print("[ensemble] No evolution event for this environment (species match or no targets).", file=sys.stderr)
+            return 1
+    else:
+        if not args.name:
+            parser.error("--parent requires --name")
+        event = {"parent": args.parent, "name": args.name, "branch_length": args.branch_length}
+
+    result = run_ensemble(event, args.tree, sample=args.sample, burnin=args.burnin, seed=args.seed,
+                          processes=args.processes, chunk_size=args.chunk_size, threshold=args.threshold,
+                          progress=lambda done, total: print(f"[ensemble] {done}/{total} trees", file=sys.stderr))
+    if args.out:
+        save_tree(result["consensus_tree"], args.out)
+    summary = {k: v for k, v in result.items() if k != "consensus_tree"}
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import bisect
+import gzip
+import json
+import os
+
+
+FASTA_INDEX_SUFFIX = ".fai.json"
+INDEX_MIN_BYTES = 1 << 20  # File lebih kecil cukup di-index di memori (tanpa file sidecar)
+_GZIP_MAGIC = b"\x1f\x8b"
+
+_fasta_index_memo = {}  # abs path -> (fingerprint, FastaIndex)
+
+
+def _file_fingerprint(file_path):
+    st = os.stat(file_path)
+    return [st.st_mtime_ns, st.st_size]
+
+def compression_of(file_path):
+    """None (teks biasa), "gzip", atau "bgzf" (gzip per blok, bisa diakses acak)."""
+    with open(file_path, "rb") as f:
+        header = f.read(18)
+    if not header.startswith(_GZIP_MAGIC):
+        return None
+    # BGZF: flag FEXTRA dengan subfield "BC" (lihat spesifikasi SAM/BAM)
+    if len(header) >= 14 and header[3] & 4 and header[12:14] == b"BC":
+        return "bgzf"
+    return "gzip"
+
+def open_fasta(file_path, compression=None):
+    """File FASTA (teks biasa atau gzip/bgzf) sebagai stream biner."""
+    if compression is None:
+        compression = compression_of(file_path)
+    if compression:
+        return gzip.open(file_path, "rb")
+    return open(file_path, "rb")
+
+
+def iter_fasta(file_path):
+    """
+    Record (id, description, sequence) satu per satu dari FASTA multi-record
+    (teks biasa atau gzip), tanpa memuat seluruh file.
+    """
+    with open_fasta(file_path) as f:
+        header, chunks = None, []
+        for line in f:
+            if line.startswith(b">"):
+                if header is not None:
+                    yield header.split(None, 1)[0] if header else "", header, b"".join(chunks).decode("ascii")
+                header, chunks = line[1:].strip().decode("utf-8", "replace"), []
+            elif header is not None:
+                chunks.append(line.strip())
+        if header is not None:
+            yield header.split(None, 1)[0] if header else "", header, b"".join(chunks).decode("ascii")
+
+
+class FastaIndex:
+    """
+    Index gaya samtools faidx: per record (nama, deskripsi, panjang, offset byte awal
+    sequence, basa per baris, byte per baris), offset dalam data tidak terkompresi.
+    Untuk BGZF juga tabel blok (offset terkompresi, offset tidak terkompresi) seperti .gzi.
+    """
+
+    def __init__(self, records, compression=None, blocks=None):
+        self.records = records
+        self.compression = compression
+        self.blocks = blocks or []
+        self.by_name = {}
+        for i, record in enumerate(records):
+            self.by_name.setdefault(record[0], i)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    @property
+    def names(self):
+        return [record[0] for record in self.records]
+
+    def entry(self, name):
+        if name not in self.by_name:
+            raise KeyError(name)
+        return self.records[self.by_name[name]]
+
+    def byte_range(self, name, start=0, end=None):
+        """(byte awal, byte akhir) untuk basa [start, end) dari record name (0-based)."""
+        _, _, length, offset, line_bases, line_bytes = self.entry(name)
+        end = length if end is None else min(end, length)
+        start = max(0, min(start, end))
+        if line_bases == 0:
+            return offset, offset
+        def position(i):
+            return offset + (i // line_bases) * line_bytes + i % line_bases
+        return position(start), position(end)
+
+    def virtual_offset(self, position):
+        # Offset tidak terkompresi -> virtual offset BGZF (blok terkompresi << 16 | offset di blok)
+        i = bisect.bisect_right([u for _, u in self.blocks], position) - 1
+        block_start, block_uncompressed = self.blocks[max(i, 0)]
+        return (block_start << 16) | (position - block_uncompressed)
+
+
+def _scan_records(f, source):
+    records = []
+    current = None
+    short_line = False
+    position = 0
+    for line in f:
+        if line.startswith(b">"):
+            header = line[1:].strip().decode("utf-8", "replace")
+            current = [header.split(None, 1)[0] if header else "", header, 0, position + len(line), 0, 0]
+            records.append(current)
+            short_line = False
+        else:
+            bases = len(line.rstrip(b"\r\n"))
+            if current is None:
+                if bases:
+                    raise ValueError(f"Sequence data before the first header in {source}")
+            elif bases:
+                if current[4] == 0:
+                    current[4], current[5] = bases, len(line)
+                elif short_line or bases > current[4] or (bases == current[4] and len(line) != current[5]):
+                    raise ValueError(f"Inconsistent line length in record {current[0]} of {source}")
+                short_line = bases < current[4]
+                current[2] += bases
+            else:
+                short_line = True  # Baris kosong hanya boleh di akhir record
+        position += len(line)
+    return records
+
+def _bgzf_blocks(file_path):
+    from Bio import bgzf
+
+    blocks = []
+    uncompressed = 0
+    with open(file_path, "rb") as handle:
+        for block_start, _, _, data_length in bgzf.BgzfBlocks(handle):
+            blocks.append([block_start, uncompressed])
+            uncompressed += data_length
+    return blocks
+
+def build_fasta_index(file_path):
+    """
+    Scan FASTA sekali (streaming) dan bangun FastaIndex. File besar menyimpan
+    index di file_path + FASTA_INDEX_SUFFIX; index lama diabaikan jika mtime/size berubah.
+    """
+    fingerprint = _file_fingerprint(file_path)
+    compression = compression_of(file_path)
+    with open_fasta(file_path, compression) as f:
+        records = _scan_records(f, file_path)
+    blocks = _bgzf_blocks(file_path) if compression == "bgzf" else []
+    index = FastaIndex(records, compression, blocks)
+
+    if fingerprint[1] >= INDEX_MIN_BYTES:
+        try:
+            with open(file_path + FASTA_INDEX_SUFFIX, "w") as f:
+                json.dump({"fingerprint": fingerprint, "compression": compression,
+                           "records": records, "blocks": blocks}, f)
+        except OSError:
+            pass  # Folder read-only: index cukup disimpan di memori
+
+    _fasta_index_memo[os.path.abspath(file_path)] = (fingerprint, index)
+    return index
+
+def get_fasta_index(file_path):
+    key = os.path.abspath(file_path)
+    fingerprint = _file_fingerprint(file_path)
+
+    memo = _fasta_index_memo.get(key)
+    if memo and memo[0] == fingerprint:
+        return memo[1]
+
+    try:
+        with open(file_path + FASTA_INDEX_SUFFIX, "r") as f:
+            stored = json.load(f)
+        if stored.get("fingerprint") == fingerprint:
+            index = FastaIndex(stored["records"], stored.get("compression"), stored.get("blocks"))
+            _fasta_index_memo[key] = (fingerprint, index)
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+
+    return build_fasta_index(file_path)
+
+
+def parse_region(region):
+    """'chr1:1,001-2,000' -> ("chr1", 1000, 2000) (0-based, end eksklusif); 'chr1' -> ("chr1", 0, None)."""
+    name, _, span = region.rpartition(":")
+    if not name or not span:
+        return region, 0, None
+    span = span.replace(",", "")
+    start, _, end = span.partition("-")
+    try:
+        start = int(start) - 1 if start else 0
+        end = int(end) if end else None
+    except ValueError:
+        return region, 0, None  # ":" bagian dari nama record, bukan region
+    if start < 0 or (end is not None and end < start):
+        raise ValueError(f"Invalid region '{region}'")
+    return name, start, end
+
+
+class FastaFile:
+    """
+    Akses acak ke FASTA besar lewat index: hanya byte locus yang diminta yang dibaca.
+    Teks biasa dan BGZF langsung seek ke locus; gzip biasa harus didekompresi dari
+    awal, jadi fetch_many membaca semua locus dalam satu lintasan maju.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.index = get_fasta_index(file_path)
+        self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    @property
+    def names(self):
+        return self.index.names
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def length(self, name):
+        return self.index.entry(name)[2]
+
+    def description(self, name):
+        return self.index.entry(name)[1]
+
+    def _read(self, byte_start, byte_end):
+        if self.index.compression == "bgzf":
+            from Bio import bgzf
+
+            if self._handle is None:
+                self._handle = bgzf.BgzfReader(self.file_path, "rb")
+            self._handle.seek(self.index.virtual_offset(byte_start))
+        else:
+            if self._handle is None:
+                self._handle = open_fasta(self.file_path, self.index.compression)
+            self._handle.seek(byte_start)  # gzip: maju dengan dekompresi, mundur = mulai ulang
+        return self._handle.read(byte_end - byte_start)
+
+    def fetch(self, name, start=0, end=None):
+        """Sequence record name, basa [start, end) 0-based."""
+        byte_start, byte_end = self.index.byte_range(name, start, end)
+        return self._read(byte_start, byte_end).replace(b"\n", b"").replace(b"\r", b"").decode("ascii")
+
+    def resolve(self, region):
+        # Nama record utuh didahulukan (nama NCBI bisa mengandung ':' dan '-')
+        if region in self.index:
+            return region, 0, None
+        name, start, end = parse_region(region)
+        if name not in self.index:
+            raise KeyError(f"Record '{name}' not found in {self.file_path}")
+        return name, start, end
+
+    def fetch_region(self, region):
+        return self.fetch(*self.resolve(region))
+
+    def fetch_many(self, regions):
+        """{region: sequence}, dibaca menurut urutan offset di file (satu lintasan untuk gzip)."""
+        resolved = {region: self.resolve(region) for region in regions}
+        order = sorted(resolved, key=lambda r: self.index.byte_range(*resolved[r])[0])
+        return {region: self.fetch(*resolved[region]) for region in order}
@@ -0,0 +1,113 @@
+import numpy as np
+
+try:
+    from .gene_store import GeneStore, encode_sequence
+except ImportError:
+    from gene_store import GeneStore, encode_sequence
+
+
+MAX_COMPARE_CELLS = 1 << 24  # Batas elemen per blok perbandingan mutant x spesies x posisi
+
+
+class FitnessMatrix:
+    """
+    Hasil scoring M mutant terhadap N spesies untuk satu gene type.
+    scores[m, n] = 1 - hamming / panjang, NaN jika panjang sequence berbeda.
+    """
+
+    def __init__(self, gene_type, species, scores, mutant_length, length_mismatches):
+        self.gene_type = gene_type
+        self.species = species
+        self.scores = scores
+        self.mutant_length = mutant_length
+        self.length_mismatches = length_mismatches  # {species: panjang sequence spesies}
+
+    @property
+    def shape(self):
+        return self.scores.shape
+
+    def as_dict(self, mutant_row=0):
+        # Format lama compute_fitness: hanya spesies yang bisa dibandingkan
+        row = self.scores[mutant_row]
+        return {species: float(row[j]) for j, species in enumerate(self.species) if not np.isnan(row[j])}
+
+    def best_species(self, mutant_row=0):
+        row = self.scores[mutant_row]
+        if np.all(np.isnan(row)):
+            return None
+        return self.species[int(np.nanargmax(row))]
+
+
+def _as_codes(sequence):
+    if isinstance(sequence, np.ndarray):
+        return sequence
+    return encode_sequence(getattr(sequence, "seq", sequence))
+
+
+def hamming_distance(seq1, seq2):
+    a, b = _as_codes(seq1), _as_codes(seq2)
+    if len(a) != len(b):
+        raise ValueError("Sequences panjang harus sama untuk Hamming distance.")
+    return int(np.count_nonzero(a != b))
+
+
+def hamming_matrix(mutant_codes, species_codes):
+    """Jarak Hamming (M x N) untuk mutant (M x L) dan spesies (N x L) yang panjangnya sama."""
+    n_mutants, length = mutant_codes.shape
+    n_species = species_codes.shape[0]
+    distances = np.empty((n_mutants, n_species), dtype=np.int64)
+    if n_mutants == 0 or n_species == 0:
+        return distances
+
+    # Bagi per blok mutant agar array boolean sementara tidak terlalu besar
+    block = max(1, MAX_COMPARE_CELLS // max(1, n_species * length))
+    for start in range(0, n_mutants, block):
+        chunk = mutant_codes[start:start + block]
+        distances[start:start + block] = (chunk[:, None, :] != species_codes[None, :, :]).sum(axis=2)
+    return distances
+
+
+def fitness_matrix(mutants, species_genes, gene_type):
+    """
+    Score semua mutant terhadap semua spesies yang punya gene_type sekaligus.
+    mutants: array (M x L) / (L,) kode gene_store, atau list sequence/SeqRecord dengan panjang sama.
+    Spesies dengan panjang berbeda dilaporkan di length_mismatches, bukan dibuang diam-diam.
+    """
+    if isinstance(mutants, np.ndarray):
+        mutant_codes = np.atleast_2d(mutants)
+    else:
+        rows = [_as_codes(m) for m in mutants]
+        if len({len(r) for r in rows}) > 1:
+            raise ValueError("Semua mutant dalam satu batch harus sama panjang.")
+        mutant_codes = np.array(rows, dtype=np.uint8).reshape(len(rows), -1) if rows else np.empty((0, 0), dtype=np.uint8)
+    n_mutants, length = mutant_codes.shape
+
+    gene_matrix = GeneStore.from_records(species_genes, [gene_type]).matrix(gene_type) if species_genes else None
+    if gene_matrix is None:
+        return FitnessMatrix(gene_type, [], np.empty((n_mutants, 0)), length, {})
+
+    species = gene_matrix.species
+    scores = np.full((n_mutants, len(species)), np.nan)
+    if n_mutants == 0:
+        return FitnessMatrix(gene_type, species, scores, length, {})  # Batch kosong: (0, N)
+    same_length = gene_matrix.lengths == length
+    length_mismatches = {
+        species[j]: int(gene_matrix.lengths[j]) for j in np.flatnonzero(~same_length)
+    }
+
+    if length > 0 and same_length.any():
+        columns = np.flatnonzero(same_length)
+        species_codes = gene_matrix.codes(columns, length)
+        distances = hamming_matrix(mutant_codes, species_codes)
+        scores[:, columns] = 1 - distances / length
+
+    return FitnessMatrix(gene_type, species, scores, length, length_mismatches)
+
+
+def compute_fitness(mutated_seq_record, species_genes):
+    """
+    {species: fitness} untuk satu mutant. Gene type diambil dari id record
+    (mis. "Hsp90_consensus_mutated").
+    """
+    gene_type = mutated_seq_record.id.split('_')[0]
+    return fitness_matrix([mutated_seq_record], species_genes, gene_type).as_dict()
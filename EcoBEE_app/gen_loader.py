@@ -0,0 +1,333 @@
+import gzip
+import json
+import os
+import zipfile
+
+import numpy as np
+
+try:
+    from .fasta_index import FastaFile, get_fasta_index
+    from .gene_store import GeneMatrix, GeneStore
+except ImportError:
+    from fasta_index import FastaFile, get_fasta_index
+    from gene_store import GeneMatrix, GeneStore
+
+
+FASTA_EXTENSIONS = (".fasta", ".fna", ".fa")
+COMPRESSED_SUFFIX = ".gz"
+DATASET_ZIP_SUFFIX = "_datasets.zip"  # Arsip NCBI Datasets: <Spesies>_<gen>_datasets.zip
+CACHE_MANIFEST = "manifest.json"
+CACHE_VERSION = 1
+GENE_MANIFEST = "gene_manifest.json"
+_MATRIX_ARRAYS = ("packed", "lengths", "exc_rows", "exc_cols", "exc_codes")
+
+
+def parse_fasta_record(text, source=""):
+    """(id, description, sequence) dari teks FASTA berisi tepat satu record, seperti SeqIO.read."""
+    header, sequence_lines = None, []
+    for line in text.splitlines():
+        if line.startswith(">"):
+            if header is not None:
+                raise ValueError(f"More than one record found in {source}")
+            header = line[1:].strip()
+        elif header is not None:
+            sequence_lines.append(line.strip())
+    if header is None:
+        raise ValueError(f"No records found in {source}")
+    record_id = header.split(None, 1)[0] if header else ""
+    return record_id, header, "".join(sequence_lines)
+
+def _zip_fasta_member(archive):
+    members = [name for name in archive.namelist() if name.endswith(FASTA_EXTENSIONS)]
+    if not members:
+        return None
+    # NCBI Datasets: ncbi_dataset/data/gene.fna
+    return min(members, key=lambda name: (not name.endswith("/gene.fna"), name))
+
+def fasta_stem(file_name):
+    """'Apis_mellifera.fna.gz' -> 'Apis_mellifera'; None jika bukan file FASTA."""
+    if file_name.endswith(COMPRESSED_SUFFIX):
+        file_name = file_name[:-len(COMPRESSED_SUFFIX)]
+    for extension in FASTA_EXTENSIONS:
+        if file_name.endswith(extension):
+            return file_name[:-len(extension)]
+    return None
+
+def organism_of(description):
+    """
+    Nama spesies dari tag NCBI '[organism=Apis cerana]' dengan konvensi nama file di
+    gen_fasta/ (genus dibuang, epitet spesies dikapitalisasi): 'Cerana'. None jika tidak ada tag.
+    """
+    start = description.find("[organism=")
+    if start < 0:
+        return None
+    end = description.find("]", start)
+    parts = description[start + len("[organism="):end if end >= 0 else None].replace("_", " ").split()
+    if not parts:
+        return None
+    return parts[1].capitalize() if len(parts) > 1 else parts[0]
+
+
+def read_gene_manifest(manifest_path):
+    """
+    Katalog gen opsional (JSON), mis. data/gene_manifest.json:
+
+        {"genes": {"Hsp90": {"parameter": "temperature"}, ...},
+         "genomes": [{"species": "Cerana", "path": "genomes/cerana.fna.gz",
+                      "loci": {"Hsp90": "NC_083866.1:100-2000"}}]}
+
+    Path genome relatif terhadap folder manifest; nama spesies mengikuti nama file di
+    gen_fasta/ agar satu spesies menjadi satu baris. Return {} jika file tidak ada.
+    """
+    if not manifest_path or not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    for genome in manifest.get("genomes", []):
+        genome["path"] = os.path.join(base_dir, genome["path"])
+    return manifest
+
+def gene_parameters(manifest, default=None):
+    """{gene_type: parameter lingkungan} dari manifest, atau default jika manifest tidak punya katalog gen."""
+    genes = manifest.get("genes")
+    if not genes:
+        return dict(default or {})
+    return {gene_type: meta["parameter"] for gene_type, meta in genes.items() if meta.get("parameter")}
+
+def discover_gene_types(fasta_dir, manifest=None, known=()):
+    """
+    Gen yang tersedia: urutan gen di manifest (atau known) lebih dulu, lalu subfolder
+    fasta_dir lain yang berisi FASTA/arsip zip, terurut menurut nama.
+    """
+    manifest = manifest or {}
+    available = set()
+    if os.path.isdir(fasta_dir):
+        for folder in os.listdir(fasta_dir):
+            path = os.path.join(fasta_dir, folder)
+            if os.path.isdir(path) and any(fasta_stem(name) or name.endswith(DATASET_ZIP_SUFFIX)
+                                           for name in os.listdir(path)):
+                available.add(folder)
+    for genome in manifest.get("genomes", []):
+        available.update(genome.get("loci", {}))
+    ordered = list(dict.fromkeys(list(manifest.get("genes", {})) + list(known)))
+    return [g for g in ordered if g in available] + sorted(available.difference(ordered))
+
+
+def _loose_records(path, file_name):
+    # File satu record: spesies dari nama file (Apis_mellifera.fasta). File multi-record:
+    # satu sumber per spesies, nama dari tag [organism=...] atau id record
+    index = get_fasta_index(path)
+    if len(index) <= 1:
+        return [[fasta_stem(file_name), None]]
+    records = {}
+    for name, description, *_ in index.records:
+        species_name = organism_of(description) or name
+        records.setdefault(species_name, [species_name, name])
+    return list(records.values())
+
+def _loose_sources(gene_type, folder, file_name, previous, loose_files):
+    # Isi file (satu/multi-record) hanya dibaca jika mtime/size berubah sejak scan
+    # sebelumnya (disimpan di manifest cache), jadi warm start cukup os.stat
+    path = os.path.join(folder, file_name)
+    key = f"{gene_type}/{file_name}"
+    st = os.stat(path)
+    known = previous.get(key)
+    if not known or known[:2] != [st.st_mtime_ns, st.st_size]:
+        known = [st.st_mtime_ns, st.st_size, _loose_records(path, file_name)]
+    loose_files[key] = known
+    return [(gene_type, species_name, path, member) for species_name, member in known[2]]
+
+def discover_sources(fasta_dir, gene_types, manifest=None, loose_files=None):
+    """
+    List sumber (gene_type, species, path, member) per gen. File FASTA yang sudah
+    diekstrak (.fna/.fasta/.fa, boleh .gz, satu atau banyak record) dipakai lebih dulu;
+    arsip *_datasets.zip dibaca langsung (tanpa ekstrak) untuk spesies yang belum punya
+    file FASTA; terakhir locus dari genome di manifest. member: nama file di zip, atau
+    record/region ("chr:start-end") di FASTA ber-index.
+    loose_files: {"gen/file": [mtime_ns, size, [[spesies, member], ...]]} dari scan
+    sebelumnya; dipakai ulang lalu diganti isinya dengan hasil scan ini.
+    """
+    loose_files = {} if loose_files is None else loose_files
+    previous = dict(loose_files)
+    loose_files.clear()
+    genomes = (manifest or {}).get("genomes", [])
+    sources = []
+    for gene_type in gene_types:
+        folder = os.path.join(fasta_dir, gene_type)
+        file_names = os.listdir(folder) if os.path.isdir(folder) else []
+        loose = {}
+        for file_name in file_names:
+            if fasta_stem(file_name):
+                for source in _loose_sources(gene_type, folder, file_name, previous, loose_files):
+                    loose.setdefault(source[1], source)
+        sources.extend(loose.values())
+        for file_name in file_names:
+            if not file_name.endswith(DATASET_ZIP_SUFFIX):
+                continue
+            species_name = file_name.split("_", 1)[0]
+            if species_name in loose:
+                continue
+            path = os.path.join(folder, file_name)
+            try:
+                with zipfile.ZipFile(path) as archive:
+                    member = _zip_fasta_member(archive)
+            except (OSError, zipfile.BadZipFile) as e:
+                print(f"[gen_loader] Skipping unreadable archive {path}: {e}")
+                continue
+            if member is not None:
+                sources.append((gene_type, species_name, path, member))
+        found = {source[1] for source in sources if source[0] == gene_type}
+        for genome in genomes:
+            region = genome.get("loci", {}).get(gene_type)
+            if not region or genome["species"] in found:
+                continue
+            if not os.path.exists(genome["path"]):
+                print(f"[gen_loader] Skipping missing genome {genome['path']}")
+                continue
+            sources.append((gene_type, genome["species"], genome["path"], region))
+            found.add(genome["species"])
+    return sources
+
+def read_source(path, member=None):
+    if member is None:
+        with open_text(path) as f:
+            return parse_fasta_record(f.read(), path)
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            return parse_fasta_record(archive.read(member).decode("ascii"), f"{path}:{member}")
+    with FastaFile(path) as fasta:
+        return _region_record(fasta, member, fasta.fetch_region(member))
+
+def open_text(path):
+    if path.endswith(COMPRESSED_SUFFIX):
+        return gzip.open(path, "rt")
+    return open(path, "r")
+
+def _region_record(fasta, region, sequence):
+    name = fasta.resolve(region)[0]
+    return region, fasta.description(name), sequence
+
+def _source_key(sources, fasta_dir):
+    # Key cache: daftar sumber + mtime/size masing-masing
+    key = []
+    for gene_type, species_name, path, member in sources:
+        st = os.stat(path)
+        key.append([gene_type, species_name, os.path.relpath(path, fasta_dir), member, st.st_mtime_ns, st.st_size])
+    return key
+
+def _fetch_regions(sources):
+    # Semua locus dari satu file FASTA ber-index diambil dengan satu handle, urut offset
+    # (gzip biasa cukup didekompresi sekali), bukan membuka file per locus
+    regions = {}
+    for _, _, path, member in sources:
+        if member is not None and not path.endswith(".zip"):
+            regions.setdefault(path, []).append(member)
+    records = {}
+    for path, members in regions.items():
+        with FastaFile(path) as fasta:
+            for region, sequence in fasta.fetch_many(members).items():
+                records[path, region] = _region_record(fasta, region, sequence)
+    return records
+
+def build_gene_store(sources):
+    columns = {}  # gene_type -> (species, sequences, ids, descriptions)
+    fetched = _fetch_regions(sources)
+    for gene_type, species_name, path, member in sources:
+        record = fetched.get((path, member))
+        record_id, description, sequence = record if record is not None else read_source(path, member)
+        species, sequences, ids, descriptions = columns.setdefault(gene_type, ([], [], [], []))
+        species.append(species_name)
+        sequences.append(sequence)
+        ids.append(record_id)
+        descriptions.append(description)
+    return GeneStore({
+        gene_type: GeneMatrix.from_sequences(gene_type, *column)
+        for gene_type, column in columns.items()
+    })
+
+
+def _array_path(cache_dir, gene_type, name):
+    return os.path.join(cache_dir, f"{gene_type}.{name}.npy")
+
+def write_cache(store, cache_dir, source_key, loose_files=None):
+    os.makedirs(cache_dir, exist_ok=True)
+    genes = {}
+    for gene_type, matrix in store.gene_matrices.items():
+        arrays = {
+            "packed": matrix.packed, "lengths": matrix.lengths,
+            "exc_rows": matrix.exc_rows, "exc_cols": matrix.exc_cols, "exc_codes": matrix.exc_codes,
+        }
+        for name, array in arrays.items():
+            path = _array_path(cache_dir, gene_type, name)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(path + ".tmp", path)
+        genes[gene_type] = {"species": matrix.species, "ids": matrix.ids, "descriptions": matrix.descriptions}
+
+    manifest = {"version": CACHE_VERSION, "sources": source_key, "genes": genes, "loose_files": loose_files or {}}
+    # Manifest ditulis terakhir: cache baru dianggap valid setelah semua array selesai
+    manifest_path = os.path.join(cache_dir, CACHE_MANIFEST)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+def read_cache_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, CACHE_MANIFEST), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def read_cache(cache_dir, source_key=None, manifest=None):
+    """
+    GeneStore dengan array di-memory-map dari cache, atau None jika cache tidak ada/basi.
+    manifest: isi manifest cache yang sudah dibaca (read_cache_manifest), agar tidak dibaca dua kali.
+    """
+    manifest = manifest if manifest is not None else read_cache_manifest(cache_dir)
+    if manifest is None or manifest.get("version") != CACHE_VERSION:
+        return None
+    if source_key is not None and manifest.get("sources") != source_key:
+        return None
+
+    matrices = {}
+    try:
+        for gene_type, meta in manifest["genes"].items():
+            arrays = {name: np.load(_array_path(cache_dir, gene_type, name), mmap_mode="r")
+                      for name in _MATRIX_ARRAYS}
+            matrices[gene_type] = GeneMatrix(
+                gene_type, meta["species"], arrays["packed"], arrays["lengths"],
+                (arrays["exc_rows"], arrays["exc_cols"], arrays["exc_codes"]),
+                meta["ids"], meta["descriptions"],
+            )
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[gen_loader] Gene cache unreadable, rebuilding: {e}")
+        return None
+    return GeneStore(matrices)
+
+def load_gene_store(fasta_dir, gene_types=None, cache_dir=None, manifest_path=None):
+    """
+    Muat semua gen (FASTA lepas, langsung dari arsip zip, atau locus dari genome di
+    manifest) sebagai GeneStore. gene_types None: semua gen yang ditemukan (lihat
+    discover_gene_types). Dengan cache_dir: hasilnya disimpan sebagai .npy + manifest
+    JSON, dan selama mtime/size sumber tidak berubah, start berikutnya hanya memetakan file cache.
+    """
+    manifest = read_gene_manifest(manifest_path)
+    if gene_types is None:
+        gene_types = discover_gene_types(fasta_dir, manifest)
+    if cache_dir is None:
+        return build_gene_store(discover_sources(fasta_dir, gene_types, manifest))
+
+    cache_manifest = read_cache_manifest(cache_dir)
+    loose_files = dict((cache_manifest or {}).get("loose_files", {}))
+    sources = discover_sources(fasta_dir, gene_types, manifest, loose_files)
+    source_key = _source_key(sources, fasta_dir)
+    store = read_cache(cache_dir, source_key, cache_manifest)
+    if store is not None:
+        return store
+    store = build_gene_store(sources)
+    try:
+        write_cache(store, cache_dir, source_key, loose_files)
+    except OSError as e:
+        print(f"[gen_loader] Could not write gene cache to {cache_dir}: {e}")
+    return store
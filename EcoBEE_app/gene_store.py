@@ -0,0 +1,215 @@
+import hashlib
+from collections.abc import Mapping
+
+import numpy as np
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+
+BASES = b"ACGT"
+PAD_CODE = 255  # Posisi di luar panjang sequence (matriks di-padding ke panjang terpanjang)
+
+# A/C/G/T -> 0..3, karakter lain (N, huruf kecil, IUPAC) tetap memakai kode ASCII-nya
+_ENCODE = np.arange(256, dtype=np.uint8)
+_ENCODE[np.frombuffer(BASES, dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+_DECODE = np.arange(256, dtype=np.uint8)
+_DECODE[:4] = np.frombuffer(BASES, dtype=np.uint8)
+
+
+def encode_sequence(seq_str):
+    return _ENCODE[np.frombuffer(str(seq_str).encode("ascii"), dtype=np.uint8)]
+
+def decode_sequence(codes):
+    return _DECODE[np.asarray(codes, dtype=np.uint8)].tobytes().decode("ascii")
+
+def pack_2bit(codes):
+    """
+    Pack kode 0..3 menjadi 4 basa per byte (baris terakhir di-padding).
+    Kode >= 4 dipack sebagai 0, simpan terpisah sebagai exception.
+    """
+    codes = np.atleast_2d(codes)
+    n_rows, n_cols = codes.shape
+    n_padded = -(-n_cols // 4) * 4
+    values = np.zeros((n_rows, n_padded), dtype=np.uint8)
+    values[:, :n_cols] = np.where(codes < 4, codes, 0)
+    values = values.reshape(n_rows, -1, 4)
+    return (values[..., 0] << 6) | (values[..., 1] << 4) | (values[..., 2] << 2) | values[..., 3]
+
+def unpack_2bit(packed, n_cols):
+    packed = np.atleast_2d(packed)
+    values = np.empty(packed.shape + (4,), dtype=np.uint8)
+    values[..., 0] = packed >> 6
+    values[..., 1] = (packed >> 4) & 3
+    values[..., 2] = (packed >> 2) & 3
+    values[..., 3] = packed & 3
+    return values.reshape(packed.shape[0], -1)[:, :n_cols]
+
+
+class GeneMatrix:
+    """
+    Semua sequence satu gene type dalam satu matriks 2-bit kontigu
+    (satu baris per spesies), ditambah daftar posisi non-ACGT.
+    """
+
+    def __init__(self, gene_type, species, packed, lengths, exceptions, ids=None, descriptions=None):
+        self.gene_type = gene_type
+        self.species = list(species)
+        self.species_index = {name: i for i, name in enumerate(self.species)}
+        self.packed = packed
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.exc_rows, self.exc_cols, self.exc_codes = exceptions
+        self.ids = list(ids) if ids is not None else list(self.species)
+        self.descriptions = list(descriptions) if descriptions is not None else [""] * len(self.species)
+        self._fingerprint = None
+
+    @classmethod
+    def from_sequences(cls, gene_type, species, sequences, ids=None, descriptions=None):
+        encoded = [encode_sequence(s) for s in sequences]
+        lengths = np.array([len(e) for e in encoded], dtype=np.int64)
+        width = int(lengths.max()) if len(encoded) else 0
+        codes = np.full((len(encoded), width), PAD_CODE, dtype=np.uint8)
+        for i, e in enumerate(encoded):
+            codes[i, :len(e)] = e
+
+        in_range = np.arange(width)[None, :] < lengths[:, None]
+        exc_rows, exc_cols = np.nonzero((codes >= 4) & in_range)
+        exceptions = (exc_rows.astype(np.int64), exc_cols.astype(np.int64), codes[exc_rows, exc_cols])
+
+        return cls(gene_type, species, pack_2bit(codes), lengths, exceptions, ids, descriptions)
+
+    def __len__(self):
+        return len(self.species)
+
+    @property
+    def width(self):
+        return int(self.lengths.max()) if len(self.lengths) else 0
+
+    @property
+    def nbytes(self):
+        return self.packed.nbytes + self.lengths.nbytes + self.exc_rows.nbytes + self.exc_cols.nbytes + self.exc_codes.nbytes
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(self.gene_type.encode())
+            for part in (self.lengths, self.packed, self.exc_rows, self.exc_cols, self.exc_codes):
+                h.update(np.ascontiguousarray(part).tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def codes(self, rows=None, width=None):
+        """
+        Matriks uint8 (n_species x width) hasil unpack, PAD_CODE di luar panjang sequence.
+        Tidak di-cache (1 byte/basa); rows/width membatasi unpack ke baris/kolom yang dipakai.
+        """
+        width = self.width if width is None else min(width, self.width)
+        row_index = np.arange(len(self.species)) if rows is None else np.asarray(rows, dtype=np.int64).reshape(-1)
+        codes = unpack_2bit(self.packed[row_index, :-(-width // 4)], width)
+        if len(self.exc_rows):
+            # Exception milik baris/kolom yang diminta, dipetakan ke posisi di hasil
+            position = np.full(len(self.species), -1, dtype=np.int64)
+            position[row_index] = np.arange(len(row_index))
+            keep = (position[self.exc_rows] >= 0) & (self.exc_cols < width)
+            codes[position[self.exc_rows[keep]], self.exc_cols[keep]] = self.exc_codes[keep]
+        codes[np.arange(width)[None, :] >= self.lengths[row_index][:, None]] = PAD_CODE
+        return codes
+
+    def row(self, species_name):
+        i = self.species_index[species_name]
+        return self.codes([i], int(self.lengths[i]))[0]
+
+    def sequence(self, species_name):
+        return decode_sequence(self.row(species_name))
+
+    def record(self, species_name):
+        i = self.species_index[species_name]
+        return SeqRecord(Seq(self.sequence(species_name)), id=self.ids[i], name=self.ids[i],
+                         description=self.descriptions[i])
+
+
+class _SpeciesGenes(Mapping):
+    # View {gene_type: SeqRecord} untuk satu spesies, SeqRecord dibuat saat diakses
+
+    def __init__(self, store, species_name):
+        self._store = store
+        self._species_name = species_name
+
+    def __getitem__(self, gene_type):
+        matrix = self._store.gene_matrices.get(gene_type)
+        if matrix is None or self._species_name not in matrix.species_index:
+            raise KeyError(gene_type)
+        return matrix.record(self._species_name)
+
+    def __iter__(self):
+        for gene_type, matrix in self._store.gene_matrices.items():
+            if self._species_name in matrix.species_index:
+                yield gene_type
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class GeneStore(Mapping):
+    """
+    Pengganti dict {species: {gene_type: SeqRecord}} dari load_genes.
+    Akses dict lama tetap berjalan, sedangkan hot path memakai matrix(gene_type).
+    """
+
+    def __init__(self, gene_matrices):
+        self.gene_matrices = dict(gene_matrices)
+        species = {}
+        for matrix in self.gene_matrices.values():
+            for name in matrix.species:
+                species.setdefault(name, None)
+        self._species = list(species)
+        self._species_set = set(self._species)
+
+    @classmethod
+    def from_records(cls, species_genes, gene_types=None):
+        if isinstance(species_genes, GeneStore):
+            return species_genes
+        if gene_types is None:
+            gene_types = []
+            for genes_dict in species_genes.values():
+                for gene_type in genes_dict:
+                    if gene_type not in gene_types:
+                        gene_types.append(gene_type)
+
+        matrices = {}
+        for gene_type in gene_types:
+            species, sequences, ids, descriptions = [], [], [], []
+            for species_name, genes_dict in species_genes.items():
+                record = genes_dict.get(gene_type)
+                if record is None:
+                    continue
+                seq = getattr(record, "seq", record)
+                species.append(species_name)
+                sequences.append(str(seq))
+                ids.append(getattr(record, "id", species_name))
+                descriptions.append(getattr(record, "description", ""))
+            if species:
+                matrices[gene_type] = GeneMatrix.from_sequences(gene_type, species, sequences, ids, descriptions)
+        return cls(matrices)
+
+    def __getitem__(self, species_name):
+        if species_name not in self._species_set:
+            raise KeyError(species_name)
+        return _SpeciesGenes(self, species_name)
+
+    def __iter__(self):
+        return iter(self._species)
+
+    def __len__(self):
+        return len(self._species)
+
+    @property
+    def gene_types(self):
+        return list(self.gene_matrices)
+
+    def matrix(self, gene_type):
+        return self.gene_matrices.get(gene_type)
+
+    @property
+    def nbytes(self):
+        return sum(m.nbytes for m in self.gene_matrices.values())
@@ -0,0 +1,243 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from . import simulation
+    from .consensus import get_gene_profile
+    from .fitness import hamming_matrix
+    from .gene_store import GeneStore, decode_sequence
+    from .mutation import make_rng, mutate_batch, point_mutation
+    from .tree_utils import IndexedTree
+except ImportError:
+    import simulation
+    from consensus import get_gene_profile
+    from fitness import hamming_matrix
+    from gene_store import GeneStore, decode_sequence
+    from mutation import make_rng, mutate_batch, point_mutation
+    from tree_utils import IndexedTree
+
+
+#Operator seleksi: return index parent (n,) dari fitness populasi
+def tournament_selection(rng, fitness, n, tournament_size=3):
+    contenders = rng.integers(0, len(fitness), size=(n, tournament_size))
+    return contenders[np.arange(n), fitness[contenders].argmax(axis=1)]
+
+def roulette_selection(rng, fitness, n):
+    weights = fitness - fitness.min() + 1e-12
+    return rng.choice(len(fitness), size=n, p=weights / weights.sum())
+
+#Operator crossover: parents_a/parents_b (n x L) -> anak (n x L)
+def uniform_crossover(rng, parents_a, parents_b):
+    take_b = rng.random(parents_a.shape) < 0.5
+    return np.where(take_b, parents_b, parents_a)
+
+def single_point_crossover(rng, parents_a, parents_b):
+    n, length = parents_a.shape
+    points = rng.integers(0, length + 1, size=(n, 1))
+    return np.where(np.arange(length)[None, :] < points, parents_a, parents_b)
+
+
+def threshold_key(species_name):
+    # "Cerana" / "apis_cerana" -> "Apis_cerana" (format key threshold.json)
+    name = species_name.lower()
+    if name.startswith("apis_"):
+        name = name.split('_', 1)[1]
+    return f"Apis_{name}"
+
+def environment_weights(input_env, species_names, gene_type, thresholds=None):
+    """
+    Bobot tiap spesies untuk gene_type: 1 jika parameter lingkungan gen tersebut
+    berada dalam rentang threshold spesies, makin kecil makin jauh di luar rentang.
+    """
+    thresholds = simulation.thresholds if thresholds is None else thresholds
+    parameter = simulation.GENE_PARAMETERS.get(gene_type)
+    if parameter is None:
+        return np.full(len(species_names), 1.0 / len(species_names))  # Gen tanpa parameter lingkungan
+    value = input_env[parameter]
+    weights = np.zeros(len(species_names))
+    for i, species_name in enumerate(species_names):
+        thr = thresholds.get(threshold_key(species_name))
+        if not thr:
+            continue
+        low, high = thr[parameter]
+        outside = max(low - value, 0) + max(value - high, 0)
+        weights[i] = 1.0 / (1.0 + outside / max(high - low, 1))
+    if not weights.any():
+        weights[:] = 1.0
+    return weights / weights.sum()
+
+def build_references(input_env, all_species_genes_data, gene_types=None):
+    """
+    {gene_type: (consensus_codes, species, species_codes [N x L], weights [N])}
+    untuk semua gen yang punya consensus.
+    """
+    store = GeneStore.from_records(all_species_genes_data)
+    references = {}
+    for gene_type in gene_types or simulation.GENE_TYPES:
+        profile = get_gene_profile(store, gene_type)
+        if profile is None or profile.length == 0:
+            continue
+        gene_matrix = store.matrix(gene_type)
+        species_codes = gene_matrix.codes(width=profile.length)
+        weights = environment_weights(input_env, gene_matrix.species, gene_type)
+        references[gene_type] = (profile.consensus_codes, gene_matrix.species, species_codes, weights)
+    return references
+
+def evaluate_population(population, references):
+    """Fitness (P,) = rata-rata antar gen dari kemiripan berbobot lingkungan ke tiap spesies."""
+    total = None
+    for gene_type, (_, _, species_codes, weights) in references.items():
+        genomes = population[gene_type]
+        similarity = 1 - hamming_matrix(genomes, species_codes) / genomes.shape[1]
+        score = similarity @ weights
+        total = score if total is None else total + score
+    return total / len(references)
+
+
+_worker_references = None
+
+def _init_worker(references):
+    global _worker_references
+    _worker_references = references
+
+def _evaluate_chunk(population_chunk):
+    return evaluate_population(population_chunk, _worker_references)
+
+
+def _evaluate(population, references, executor, n_chunks):
+    if executor is None:
+        return evaluate_population(population, references)
+    size = len(next(iter(population.values())))
+    bounds = np.linspace(0, size, n_chunks + 1, dtype=int)
+    chunks = [{g: pop[a:b] for g, pop in population.items()} for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    return np.concatenate(list(executor.map(_evaluate_chunk, chunks)))
+
+
+def run_genetic_algorithm(input_env, all_species_genes_data, population_size=50, generations=100,
+                          selection=tournament_selection, crossover=uniform_crossover,
+                          crossover_rate=0.7, mutation_rate=0.001, initial_mutation_rate=0.05,
+                          elite_size=2, patience=15, min_improvement=1e-4, target_fitness=None,
+                          processes=None, seed=None):
+    """
+    GA multi-generasi: populasi genome (satu sequence per gen di GENE_TYPES)
+    diturunkan dari consensus, fitness dari kemiripan ke spesies yang cocok
+    dengan threshold lingkungan. Berhenti setelah `generations` atau jika tidak
+    ada perbaikan selama `patience` generasi.
+    """
+    if not all_species_genes_data:
+        return {"status": "error", "message": "Species gene data not provided or is empty."}
+
+    rng = make_rng(seed)
+    references = build_references(input_env, all_species_genes_data)
+    if not references:
+        return {"status": "error", "message": "No consensus sequences available for the GA."}
+    elite_size = min(elite_size, population_size)
+
+    population = {}
+    for gene_type, (consensus_codes, _, _, _) in references.items():
+        population[gene_type], _ = mutate_batch(consensus_codes, population_size, initial_mutation_rate, rng)
+
+    executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(references,)) if processes and processes > 1 else None
+    n_chunks = processes or 1
+
+    # parent_ids[g][i] = index parent (di generasi g-1) dari individu i generasi g
+    parent_ids = [np.full(population_size, -1)]
+    fitness_history = []
+    history = []
+    best_fitness = -np.inf
+    stale_generations = 0
+    stopped_early = False
+
+    try:
+        fitness = _evaluate(population, references, executor, n_chunks)
+        for generation in range(1, generations + 1):
+            fitness_history.append(fitness)
+            history.append({"generation": generation - 1, "best": float(fitness.max()), "mean": float(fitness.mean())})
+
+            if fitness.max() > best_fitness + min_improvement:
+                best_fitness = fitness.max()
+                stale_generations = 0
+            else:
+                stale_generations += 1
+            if stale_generations >= patience or (target_fitness is not None and best_fitness >= target_fitness):
+                stopped_early = True
+                break
+
+            n_children = population_size - elite_size
+            elite = np.argsort(fitness)[::-1][:elite_size]
+            parents_a = selection(rng, fitness, n_children)
+            parents_b = selection(rng, fitness, n_children)
+            do_crossover = rng.random(n_children) < crossover_rate
+
+            next_population = {}
+            for gene_type, genomes in population.items():
+                children = genomes[parents_a].copy()
+                if do_crossover.any():
+                    children[do_crossover] = crossover(rng, genomes[parents_a[do_crossover]], genomes[parents_b[do_crossover]])
+                point_mutation(rng, children, mutation_rate)
+                next_population[gene_type] = np.concatenate([genomes[elite], children])
+
+            # Lineage mengikuti parent pertama (sumber utama genome anak)
+            parent_ids.append(np.concatenate([elite, parents_a]))
+            population = next_population
+            fitness = _evaluate(population, references, executor, n_chunks)
+        else:
+            fitness_history.append(fitness)
+            history.append({"generation": generations, "best": float(fitness.max()), "mean": float(fitness.mean())})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    winner = int(fitness.argmax())
+    lineage = []
+    individual = winner
+    for generation in range(len(fitness_history) - 1, -1, -1):
+        lineage.append({"generation": generation, "individual": individual,
+                        "fitness": float(fitness_history[generation][individual])})
+        individual = int(parent_ids[generation][individual])
+    lineage.reverse()
+
+    # Induk: spesies yang paling mirip dengan genome pemenang (rata-rata antar gen)
+    species_similarity = {}
+    for gene_type, (_, species, species_codes, _) in references.items():
+        genome = population[gene_type][winner:winner + 1]
+        similarity = 1 - hamming_matrix(genome, species_codes)[0] / genome.shape[1]
+        for species_name, value in zip(species, similarity):
+            species_similarity.setdefault(species_name, []).append(value)
+    parent_species = max(species_similarity, key=lambda s: np.mean(species_similarity[s]))
+
+    return {
+        "status": "ga_completed",
+        "parent_of_evolution": threshold_key(parent_species),
+        "best_fitness": float(fitness[winner]),
+        "best_genome": {gene_type: decode_sequence(population[gene_type][winner]) for gene_type in population},
+        "generations_run": len(history) - 1,
+        "stopped_early": stopped_early,
+        "history": history,
+        "lineage": lineage,
+    }
+
+
+def graft_lineage(tree, parent_species_name, lineage, name_prefix, branch_length_per_generation=0.01,
+                  min_improvement=1e-4):
+    """
+    Tempel lineage pemenang ke pohon sebagai rantai cabang di bawah parent_species_name.
+    Hanya generasi yang fitness-nya naik yang menjadi node; panjang cabang sebanding
+    dengan jumlah generasi sejak node sebelumnya. Return (tree, nama node yang ditambahkan).
+    """
+    indexed = IndexedTree(tree)  # Salinan ber-index: tiap cabang O(1), pohon asal tidak berubah
+    added = []
+    current_parent = parent_species_name
+    last_generation, last_fitness = 0, -np.inf
+    milestones = [step for step in lineage if step["generation"] > 0]
+    for i, step in enumerate(milestones):
+        is_last = i == len(milestones) - 1
+        if step["fitness"] <= last_fitness + min_improvement and not is_last:
+            continue
+        new_name = f"{name_prefix}_G{step['generation']}"
+        branch_length = branch_length_per_generation * (step["generation"] - last_generation)
+        indexed.add_branch(current_parent, new_name, branch_length=branch_length)
+        added.append(new_name)
+        current_parent = new_name
+        last_generation, last_fitness = step["generation"], step["fitness"]
+    return indexed.tree, added
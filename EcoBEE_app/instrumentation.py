@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+PERF_ENV = "ECOBEE_PERF"  # "1": catat timing, "memory": timing + puncak tracemalloc
+PERF_SINK_ENV = "ECOBEE_PERF_JSONL"  # File JSON Lines untuk run headless
+
+
+class _NullSpan:
+    # Dipakai saat profiler mati: tidak ada clock atau alokasi sama sekali
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def mark(self, name):
+        pass
+
+    def close(self):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, timings, name, trace_memory):
+        self.timings = timings
+        self.name = name
+        self.trace_memory = trace_memory
+        self._wall = self._cpu = None
+
+    def __enter__(self):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        entry = {
+            "wall_s": time.perf_counter() - self._wall,
+            "cpu_s": time.process_time() - self._cpu,
+        }
+        if self.trace_memory:
+            entry["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        self.timings[self.name] = entry
+        return False
+
+
+class _StageTimer:
+    # Span berurutan: mark(nama) menutup tahap sebelumnya dan membuka tahap berikutnya
+    def __init__(self, timings, trace_memory):
+        self.timings = timings
+        self.trace_memory = trace_memory
+        self._current = None
+
+    def mark(self, name):
+        self.close()
+        self._current = _Span(self.timings, name, self.trace_memory).__enter__()
+
+    def close(self):
+        if self._current is not None:
+            self._current.__exit__(None, None, None)
+            self._current = None
+
+
+class Profiler:
+    """
+    Timing per tahap (wall, CPU, opsional puncak memori tracemalloc).
+    Saat enabled=False, span() dan stages() mengembalikan objek no-op bersama,
+    jadi instrumentasi di hot path hampir tanpa biaya.
+    sink: JsonlSink opsional, setiap record(...) ditulis satu baris.
+    """
+
+    def __init__(self, enabled=False, trace_memory=False, sink=None):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.sink = sink
+        self.last = {}  # run terakhir per nama: {span: {...}}
+        self._lock = threading.Lock()
+
+    def span(self, timings, name):
+        """Context manager yang mengisi timings[name]."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(timings, name, self.trace_memory)
+
+    def stages(self, timings):
+        if not self.enabled:
+            return NULL_SPAN
+        return _StageTimer(timings, self.trace_memory)
+
+    def record(self, run_name, timings, **extra):
+        if not self.enabled or not timings:
+            return
+        with self._lock:
+            self.last[run_name] = dict(timings)
+        if self.sink is not None:
+            self.sink.write({"run": run_name, "time": time.time(), "timings": timings, **extra})
+
+
+class JsonlSink:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, entry):
+        line = json.dumps(entry) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def format_timings(timings):
+    """Teks ringkas untuk panel performa: satu baris per span."""
+    lines = []
+    for name, entry in timings.items():
+        line = f"{name:<16} {entry['wall_s'] * 1000:8.1f} ms  (CPU {entry['cpu_s'] * 1000:.1f} ms)"
+        if "peak_bytes" in entry:
+            line += f"  peak {entry['peak_bytes'] / 1024:.0f} KiB"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+_profiler = None
+
+def get_profiler():
+    # Satu profiler per proses, dikonfigurasi dari environment saat pertama dipakai
+    global _profiler
+    if _profiler is None:
+        mode = os.environ.get(PERF_ENV, "").strip().lower()
+        sink_path = os.environ.get(PERF_SINK_ENV)
+        _profiler = Profiler(
+            enabled=bool(mode and mode != "0") or bool(sink_path),
+            trace_memory=mode == "memory",
+            sink=JsonlSink(sink_path) if sink_path else None,
+        )
+    return _profiler
+
+def configure(enabled=None, trace_memory=None, sink_path=None):
+    profiler = get_profiler()
+    if enabled is not None:
+        profiler.enabled = enabled
+    if trace_memory is not None:
+        profiler.trace_memory = trace_memory
+        if not trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    if sink_path is not None:
+        profiler.sink = JsonlSink(sink_path) if sink_path else None
+    return profiler
@@ -0,0 +1,197 @@
+import json
+import os
+import time
+
+from Bio.Phylo.Newick import Clade, Tree
+
+try:
+    from .phylogenetic import get_cached_tree
+    from .tree_utils import IndexedTree
+except ImportError:
+    from phylogenetic import get_cached_tree
+    from tree_utils import IndexedTree
+
+
+SNAPSHOT_SUFFIX = ".snapshot.json"
+DEFAULT_COMPACT_EVERY = 200  # Jumlah event di journal sebelum dipadatkan menjadi snapshot
+
+
+def _source_fingerprint(file_path, tree_index):
+    st = os.stat(file_path)
+    return [os.path.abspath(file_path), tree_index, st.st_mtime_ns, st.st_size]
+
+
+def tree_to_rows(tree):
+    """Pohon -> list [index parent, nama, branch_length, confidence] (preorder, iteratif)."""
+    rows = []
+    stack = [(tree.root, -1)]
+    while stack:
+        clade, parent = stack.pop()
+        index = len(rows)
+        rows.append([parent, clade.name, clade.branch_length, clade.confidence])
+        for child in reversed(clade.clades):
+            stack.append((child, index))
+    return rows
+
+def rows_to_tree(rows, rooted=False):
+    clades = []
+    for parent, name, branch_length, confidence in rows:
+        clade = Clade(name=name, branch_length=branch_length, confidence=confidence)
+        if parent >= 0:
+            clades[parent].clades.append(clade)
+        clades.append(clade)
+    return Tree(root=clades[0], rooted=rooted)
+
+
+class LineageJournal:
+    """
+    Journal append-only (JSON Lines) untuk setiap langkah evolusi: parent, nama spesies
+    baru, panjang cabang, sequence gen termutasi, dan lingkungan. Saat dibuka, snapshot
+    terakhir (JSON berisi daftar clade) dimuat lalu event sesudahnya diputar ulang di atas pohon
+    ber-index, jadi pohon lineage tidak hilang ketika aplikasi ditutup. Setiap
+    `compact_every` event, pohon ditulis ke snapshot dan journal dikosongkan.
+    Pohon yang sudah dipublikasikan (self.indexed) tidak pernah diubah: record() membuat
+    versi baru (copy-on-write, root baru) sehingga worker yang masih membaca versi lama
+    aman dan cache layout per root (tree_view.TreeView) ikut diperbarui.
+    """
+
+    def __init__(self, path, base_tree_path, tree_index=0, compact_every=DEFAULT_COMPACT_EVERY):
+        self.path = path
+        self.base_tree_path = base_tree_path
+        self.tree_index = tree_index
+        self.compact_every = compact_every
+        self.snapshot_path = path + SNAPSHOT_SUFFIX
+        self.indexed = None
+        self.sequences = {}  # nama spesies baru -> {gene_type: sequence}
+        self.last_seq = 0  # Nomor event terakhir (naik terus, tidak direset saat compaction)
+        self.pending = 0  # Event di journal yang belum masuk snapshot
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.replay()
+
+    @property
+    def tree(self):
+        return self.indexed.tree
+
+    def __len__(self):
+        return self.last_seq
+
+    def _load_snapshot(self):
+        fingerprint = _source_fingerprint(self.base_tree_path, self.tree_index)
+        try:
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            if snapshot.get("base") != fingerprint:
+                print(f"[lineage] Base tree changed, snapshot {self.snapshot_path} ignored.")
+                return None
+            return snapshot, rows_to_tree(snapshot["clades"], snapshot.get("rooted", False))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            print(f"[lineage] Snapshot unreadable, replaying from base tree: {e}")
+            return None
+
+    def replay(self):
+        """Bangun ulang pohon: snapshot (atau pohon dasar) + event journal sesudahnya."""
+        snapshot = self._load_snapshot()
+        # Diputar ulang di pohon privat (boleh diubah di tempat), baru dipasang setelah selesai
+        if snapshot is not None:
+            snapshot, tree = snapshot
+            indexed = IndexedTree(tree, copy=False, read_only=False)  # Pohon baru dari snapshot
+            self.sequences = snapshot.get("sequences", {})
+            self.last_seq = snapshot.get("last_seq", 0)
+        else:
+            indexed = IndexedTree(get_cached_tree(self.base_tree_path, self.tree_index))
+            self.sequences = {}
+            self.last_seq = 0
+        snapshot_seq = self.last_seq
+
+        self.pending = 0
+        if not os.path.exists(self.path):
+            self.indexed = indexed
+            return self
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Baris terakhir yang terpotong (mis. aplikasi mati saat menulis)
+                    print(f"[lineage] Skipping unreadable journal line {line_number} in {self.path}")
+                    continue
+                if event["seq"] <= snapshot_seq:
+                    continue  # Sudah ada di snapshot (compaction terhenti sebelum journal dikosongkan)
+                try:
+                    indexed.add_branch(event["parent"], event["name"], branch_length=event["branch_length"])
+                except ValueError as e:
+                    print(f"[lineage] Skipping journal event {event['seq']}: {e}")
+                    continue
+                self._note(event)
+                self.pending += 1
+        self.indexed = indexed
+        return self
+
+    def _note(self, event):
+        self.sequences[event["name"]] = event.get("sequences", {})
+        self.last_seq = max(self.last_seq, event["seq"])
+
+    def record(self, parent, new_species_name, branch_length, sequences=None, env=None):
+        """Tambahkan satu event: diterapkan ke pohon lalu ditulis ke journal. Return event."""
+        event = {
+            "seq": self.last_seq + 1,
+            "time": time.time(),
+            "parent": parent,
+            "name": new_species_name,
+            "branch_length": branch_length,
+            "sequences": sequences or {},
+            "env": env or {},
+        }
+        # ValueError jika parent tidak ada: tidak ada yang ditulis
+        tree = self.indexed.with_branch(parent, new_species_name, branch_length=branch_length)
+        self.indexed = IndexedTree(tree, copy=False)
+        self._note(event)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+        self.pending += 1
+        if self.compact_every and self.pending >= self.compact_every:
+            self.compact()
+        return event
+
+    def record_result(self, evolution_results, env=None):
+        """Catat hasil run_evolution_simulation (hanya status "evolution_simulated")."""
+        if evolution_results.get("status") != "evolution_simulated":
+            return None
+        sequences = {}
+        for gene_type, fasta_text in (evolution_results.get("new_fasta_sequences") or {}).items():
+            sequences[gene_type] = "".join(fasta_text.splitlines()[1:])
+        return self.record(
+            evolution_results["parent_of_evolution"],
+            evolution_results["new_species_name"],
+            evolution_results.get("branch_length", 0.1),
+            sequences,
+            env,
+        )
+
+    def compact(self):
+        """Tulis pohon saat ini sebagai snapshot, lalu kosongkan journal."""
+        snapshot = {
+            "base": _source_fingerprint(self.base_tree_path, self.tree_index),
+            "last_seq": self.last_seq,
+            "rooted": self.tree.rooted,
+            "clades": tree_to_rows(self.tree),
+            "sequences": self.sequences,
+        }
+        # Pohon dan last_seq dalam satu file yang diganti atomik; jika proses mati sebelum
+        # journal dikosongkan, event dengan seq <= last_seq dilewati saat replay
+        with open(self.snapshot_path + ".tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(self.snapshot_path + ".tmp", self.snapshot_path)
+        open(self.path, "w").close()
+        self.pending = 0
+
+    def reset(self):
+        """Hapus journal dan snapshot, kembali ke pohon dasar."""
+        for file_path in (self.path, self.snapshot_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        return self.replay()
@@ -3,16 +3,13 @@
 import customtkinter as ctk
 from PIL import Image # Required for CTkImage
 import os # For path joining
-import matplotlib as plt
-import threading
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib
-matplotlib.use('TkAgg') 
 
+# matplotlib (dan tree_view) baru diimpor saat pohon pertama kali ditampilkan, lihat _ensure_tree_view
 try:
     import simulation  
     import phylogenetic 
+    from sim_executor import SimulationExecutor
+    import instrumentation
 except ImportError as e:
    
     
@@ -23,7 +20,7 @@ except ImportError as e:
 # Define paths untuk assets #
 project_root_for_assets = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) 
 assets_base_path = os.path.join(project_root_for_assets, "EcoBEE_app","assets", "images")
-data_base_path = os.path.join(project_root_for_assets, "EcoBEE_app","data")
+data_base_path = os.environ.get("ECOBEE_DATA_DIR", os.path.join(project_root_for_assets, "EcoBEE_app","data"))
 filo_tree_path = os.path.join(data_base_path, "BEE_prunedtree_APIS.nwk")
 APP_LOGO_PATH = os.path.join(assets_base_path, "app_logo.png")
 DASHBOARD_ICON_PATH = os.path.join(assets_base_path, "dashboard_icon.png")
@@ -31,6 +28,16 @@ DASHBOARD_ICON_PATH = os.path.join(assets_base_path, "dashboard_icon.png")
 KELUAR_ICON_PATH = os.path.join(assets_base_path, "keluar_icon.png")
 DASHBOARD_ICON_ACTIVE_PATH = os.path.join(assets_base_path, "dashboard_activated_icon.png")
 
+AI_EXPLANATION_CHANNEL = "evolution_explanation"
+SIMULATION_STAGE_LABELS = {
+    "load_tree": "memuat pohon filogeni",
+    "match_species": "mencocokkan spesies",
+    "consensus": "menghitung consensus",
+    "mutation": "mutasi gen",
+    "fitness": "menghitung fitness",
+    "insert_branch": "menambah cabang baru",
+}
+
 
 
 class App(ctk.CTk):
@@ -43,6 +50,7 @@ class App(ctk.CTk):
         # Matplotlib Canvas
         self.tree_figure = None
         self.tree_canvas = None
+        self.tree_view = None
         self.filogeni_plot_frame = None # Will hold the canvas
 
         # Global Theme & Font Settings 
@@ -69,20 +77,16 @@ class App(ctk.CTk):
         self.button_color_perubahan = "#ADD8E6"
         self.text_color_main = "#FFFFFF"
         
-        #Initial Data 
+        #Initial Data (dimuat di background setelah window tampil, lihat _start_loading_data)
         self.initial_species_genes_data = None
-        if simulation:
-            try:
-                
-                self.initial_species_genes_data = simulation.load_genes()
-                
-            except Exception as e:
-                print(f"[App] Error loading initial species gene data: {e}")
-               
-        else:
+        self.lineage = None
+        self.data_loaded = False
+        if not simulation:
             print("[App] Error: gen_loader module not imported. Simulation features will be affected.")
 
         self.filo_tree_path = filo_tree_path
+        self.simulation_executor = SimulationExecutor(dispatch=lambda callback, *args: self.after(0, callback, *args))
+        self.loading_executor = SimulationExecutor(dispatch=lambda callback, *args: self.after(0, callback, *args))
 
         self.configure(fg_color=self.main_bg_color)
 
@@ -197,6 +201,7 @@ class App(ctk.CTk):
 
         self.current_active_button_key = "Dashboard"
         self.show_dashboard_frame()
+        self.after_idle(self._start_loading_data)
 
       
    
@@ -205,6 +210,47 @@ class App(ctk.CTk):
     
 
     
+    def _start_loading_data(self):
+        if not simulation:
+            self.data_loaded = True
+            return
+        self.loading_executor.submit(
+            _load_startup_data,
+            self.filo_tree_path,
+            on_done=self._on_data_loaded,
+            on_error=self._on_data_load_error,
+        )
+
+    def _on_data_loaded(self, startup_data):
+        genes, lineage, errors = startup_data
+        self.data_loaded = True
+        for stage, e in errors.items():
+            print(f"[App] Error during {stage}: {e}")
+        self.initial_species_genes_data = genes
+        self.lineage = lineage
+        if self.filogeni_plot_frame is not None and self.filogeni_plot_frame.winfo_exists():
+            self._display_initial_tree()
+
+    def _on_data_load_error(self, e):
+        self.data_loaded = True
+        print(f"[App] Error loading initial data: {e}")
+        if self.filogeni_plot_frame is not None and self.filogeni_plot_frame.winfo_exists():
+            self._display_initial_tree()
+
+    def _disable_distance_tree(self, reason):
+        # Jarak tidak lengkap (is_complete() False): kembali ke pohon referensi, tampilkan alasannya
+        self.distance_tree_switch.deselect()
+        self.distance_tree_switch.configure(state="disabled")
+        self.distance_tree_status.configure(text=reason)
+        self.distance_tree_status.pack(side="top", pady=(0,10), padx=20, after=self.distance_tree_switch)
+
+    def _display_initial_tree(self):
+        # Lineage dari sesi sebelumnya: snapshot + journal diputar ulang di atas pohon dasar
+        if self.lineage is not None:
+            self.display_phylogenetic_tree(tree_object=self.lineage.tree)
+        else:
+            self.display_phylogenetic_tree(tree_file_path=self.filo_tree_path)
+
     def load_icon(self, path, size):
 
         #condition untuk loading icon
@@ -276,13 +322,18 @@ class App(ctk.CTk):
         filogeni_outer_frame.grid_rowconfigure(1, weight=1)
 
         ctk.CTkLabel(filogeni_outer_frame, text="Filogeni", font=self.font_section_titles).grid(row=0, column=0, pady=(10,5), padx=20, sticky="nw")
+        self.tree_view = None # Frame baru, canvas lama ikut terhapus
         self.filogeni_plot_frame = ctk.CTkFrame(filogeni_outer_frame, fg_color="lightgrey") 
         self.filogeni_plot_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
         self.filogeni_plot_frame.grid_columnconfigure(0, weight=1) 
         self.filogeni_plot_frame.grid_rowconfigure(0, weight=1)
 
         # Load and display tree
-        self.display_phylogenetic_tree(tree_file_path=filo_tree_path)
+        if not self.data_loaded:
+            # Data belum siap: pohon digambar oleh _on_data_loaded
+            ctk.CTkLabel(self.filogeni_plot_frame, text="Memuat pohon filogeni...", font=self.font_regular).grid(row=0, column=0)
+        else:
+            self._display_initial_tree()
 
        
 
@@ -334,7 +385,54 @@ class App(ctk.CTk):
             fg_color="#D8F2FF",
             command=self.handle_start_simulation
         )
-        start_button.pack(side="top", pady=(15,15), padx=20) 
+        start_button.pack(side="top", pady=(15,5), padx=20) 
+
+        cancel_button = ctk.CTkButton(
+            parameter_frame,
+            text="Batal",
+            text_color="#000000",
+            font=self.font_regular_smaller,
+            hover_color="#F2D8D8",
+            fg_color="#F2D8D8",
+            command=self.handle_cancel_simulation
+        )
+        cancel_button.pack(side="top", pady=(0,15), padx=20) 
+
+        # Panel performa: timing per tahap simulasi + redraw pohon (profiler hanya aktif saat panel dinyalakan)
+        self.perf_switch = ctk.CTkSwitch(parameter_frame, text="Panel performa", font=self.font_regular_smaller,
+                                         command=self.toggle_perf_panel)
+        self.perf_switch.pack(side="top", pady=(0,5), padx=20)
+        self.perf_textbox = ctk.CTkTextbox(parameter_frame, height=130, font=ctk.CTkFont(family="Courier", size=11),
+                                           wrap="none", border_width=1)
+        self.perf_textbox.configure(state="disabled")
+        if simulation and instrumentation.get_profiler().enabled:
+            self.perf_switch.select()
+            self.toggle_perf_panel()
+
+        # Tampilkan pohon hasil rekonstruksi (neighbor-joining) dari jarak genetik, termasuk spesies hasil evolusi
+        self.distance_tree_switch = ctk.CTkSwitch(parameter_frame, text="Pohon dari jarak genetik",
+                                                  font=self.font_regular_smaller, command=self._display_initial_tree)
+        self.distance_tree_switch.pack(side="top", pady=(0,10), padx=20)
+        self.distance_tree_status = ctk.CTkLabel(parameter_frame, text="", font=self.font_regular_smaller,
+                                                 text_color="#CC0000", wraplength=300)  # Alasan jika switch dimatikan
+
+        # Zoom ke clade: nama tip dipisah koma (zoom ke common ancestor), kosong = seluruh pohon
+        zoom_frame = ctk.CTkFrame(parameter_frame, fg_color="transparent")
+        zoom_frame.pack(side="top", fill="x", pady=(0,15), padx=20)
+        self.zoom_clade_entry = ctk.CTkEntry(zoom_frame, font=self.font_regular_smaller,
+                                             placeholder_text="Apis_cerana, Apis_florea")
+        self.zoom_clade_entry.pack(side="left", fill="x", expand=True)
+        self.zoom_clade_entry.bind("<Return>", lambda event: self.handle_zoom_clade())
+        ctk.CTkButton(
+            zoom_frame,
+            text="Zoom",
+            width=60,
+            text_color="#000000",
+            font=self.font_regular_smaller,
+            hover_color="#D8F2FF",
+            fg_color="#D8F2FF",
+            command=self.handle_zoom_clade
+        ).pack(side="left", padx=(5,0))
         
 
         #Penjelasan Evolusi Section (Now in Row 1, Column 0, Colspan 2)
@@ -390,48 +488,44 @@ class App(ctk.CTk):
            
             return
 
-        
-        if self.tree_canvas:
-            self.tree_canvas.get_tk_widget().destroy()
-            self.tree_canvas = None
-        if self.tree_figure:
-            
-            self.tree_figure = None
-
-        
-
-
        
         tree_to_draw = None
 
         if tree_object != None:
             tree_to_draw = tree_object
         elif tree_file_path:
-            tree_to_draw = phylogenetic.load_tree(tree_file_path)
+            tree_to_draw = phylogenetic.get_cached_tree(tree_file_path)
+
+        if tree_to_draw and self.distance_tree_switch.get() == 1 and self.initial_species_genes_data:
+            try:
+                tree_to_draw = simulation.build_distance_tree(self.initial_species_genes_data, self.lineage)
+            except ValueError as e:
+                self._disable_distance_tree(f"Pohon jarak genetik tidak tersedia: {e}")
 
         
         if tree_to_draw:
             
-            self.tree_figure = Figure(figsize=(6, 8), dpi=100, facecolor='white') 
-            ax = self.tree_figure.add_subplot(111)
-
-          
-            phylogenetic.draw_tree_on_axes(tree_to_draw, ax, highlight_species_name=species_to_highlight)
-            
-            
-            self.tree_figure.subplots_adjust(left=0.01, right=0.99, top=0.99, bottom=0.01, wspace=0, hspace=0)
-
-
-           
-            self.tree_canvas = FigureCanvasTkAgg(self.tree_figure, master=self.filogeni_plot_frame)
-            self.tree_canvas.draw()
-            canvas_widget = self.tree_canvas.get_tk_widget()
-            canvas_widget.grid(row=0, column=0, sticky="nsew") 
+            if self.tree_view is None:
+                self._ensure_tree_view()
+
+            profiler = instrumentation.get_profiler()
+            timings = {}
+            with profiler.span(timings, "redraw"):
+                self.tree_view.show(tree_to_draw, highlight_species_name=species_to_highlight)
+                if profiler.enabled:
+                    # Gambar sebenarnya terjadi di idle callback canvas: jalankan sekarang agar ikut terukur
+                    self.tree_canvas.get_tk_widget().update_idletasks()
+            if profiler.enabled:
+                profiler.record("display_phylogenetic_tree", timings)
+                self._update_perf_panel()
 
         else:
           
             for widget in self.filogeni_plot_frame.winfo_children(): # Clear previous content
                 widget.destroy()
+            self.tree_view = None
+            self.tree_canvas = None
+            self.tree_figure = None
             error_label = ctk.CTkLabel(self.filogeni_plot_frame, text="Failed to load tree.", font=self.font_regular)
             error_label.pack(padx=10, pady=10, expand=True)
 
@@ -457,6 +551,43 @@ class App(ctk.CTk):
             return False
 
 
+    def toggle_perf_panel(self):
+        enabled = self.perf_switch.get() == 1
+        instrumentation.configure(enabled=enabled)
+        if enabled:
+            self.perf_textbox.pack(side="top", fill="x", padx=15, pady=(0,15), after=self.perf_switch)
+            self._update_perf_panel()
+        else:
+            self.perf_textbox.pack_forget()
+
+    def _update_perf_panel(self):
+        if getattr(self, "perf_textbox", None) is None or not self.perf_textbox.winfo_exists():
+            return
+        sections = []
+        for run_name, timings in instrumentation.get_profiler().last.items():
+            sections.append(f"[{run_name}]\n{instrumentation.format_timings(timings)}")
+        self.perf_textbox.configure(state="normal")
+        self.perf_textbox.delete("0.0", "end")
+        self.perf_textbox.insert("0.0", "\n".join(sections) or "Belum ada data timing.")
+        self.perf_textbox.configure(state="disabled")
+
+    def _ensure_tree_view(self):
+        # Figure & canvas dibuat sekali per frame, setelah itu hanya di-update oleh TreeView
+        import matplotlib
+        matplotlib.use('TkAgg')
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        import tree_view
+
+        for widget in self.filogeni_plot_frame.winfo_children(): # Hapus label error/loading sebelumnya
+            widget.destroy()
+        self.tree_figure = Figure(figsize=(6, 8), dpi=100, facecolor='white') 
+        self.tree_figure.subplots_adjust(left=0.01, right=0.99, top=0.99, bottom=0.01, wspace=0, hspace=0)
+        self.tree_canvas = FigureCanvasTkAgg(self.tree_figure, master=self.filogeni_plot_frame)
+        canvas_widget = self.tree_canvas.get_tk_widget()
+        canvas_widget.grid(row=0, column=0, sticky="nsew") 
+        self.tree_view = tree_view.TreeView(self.tree_figure, self.tree_canvas)
+
     def handle_start_simulation(self):
         
         retrieved_params = {}
@@ -501,26 +632,67 @@ class App(ctk.CTk):
             return
         if not self.initial_species_genes_data:
            
-            self.update_evolution_explanation(error_message="Data gen spesies awal tidak termuat.")
+            if not self.data_loaded:
+                self.update_evolution_explanation(error_message="Data gen spesies masih dimuat, coba lagi sebentar.")
+            else:
+                self.update_evolution_explanation(error_message="Data gen spesies awal tidak termuat.")
             return
         if not os.path.exists(self.filo_tree_path):
           
             self.update_evolution_explanation(error_message=f"File pohon dasar tidak ditemukan.")
             return
 
+        # Jawaban AI dari simulasi sebelumnya tidak boleh menimpa hasil yang baru
+        ai_service = simulation.get_ai_service()
+        if ai_service is not None:
+            ai_service.cancel(AI_EXPLANATION_CHANNEL)
+
         self.update_evolution_explanation(loading=True) 
 
-        try:
-            # Call func dari simulation.py
-            evolution_results = simulation.run_evolution_simulation(
-                retrieved_params,
-                self.filo_tree_path,
-                self.initial_species_genes_data
-            )
+        # Simulasi berjalan di thread background; klik baru membatalkan simulasi sebelumnya
+        self.simulation_executor.submit(
+            simulation.run_evolution_simulation,
+            retrieved_params,
+            self.filo_tree_path,
+            self.initial_species_genes_data,
+            lineage=self.lineage,
+            on_progress=self._on_simulation_progress,
+            on_done=lambda evolution_results: self._apply_simulation_results(evolution_results, retrieved_params),
+            on_error=self._on_simulation_error,
+        )
 
-      
-            
+    def handle_zoom_clade(self):
+        if self.tree_view is None:
+            return
+        names = [name.strip() for name in self.zoom_clade_entry.get().split(",") if name.strip()]
+        if not self.tree_view.zoom(names or None):
+            print(f"[App] Clade not found in the tree: {', '.join(names)}")
+
+    def handle_cancel_simulation(self):
+        ai_service = simulation.get_ai_service() if simulation else None
+        if ai_service is not None:
+            ai_service.cancel(AI_EXPLANATION_CHANNEL)
+        if self.simulation_executor.cancel():
+            self.update_evolution_explanation(error_message="Simulasi dibatalkan.")
+            self.stop_ai_loading_animation(final_text="Simulasi dibatalkan.")
+
+    def _on_simulation_progress(self, stage, step, total):
+        if self._ai_loading_animation_running:
+            return
+        self.ai_explanation_textbox.configure(state="normal")
+        self.ai_explanation_textbox.delete("0.0", "end")
+        self.ai_explanation_textbox.insert("0.0", f"Menyiapkan simulasi ({step}/{total}): {SIMULATION_STAGE_LABELS.get(stage, stage)}...")
+        self.ai_explanation_textbox.configure(state="disabled")
 
+    def _on_simulation_error(self, e):
+        import traceback
+        traceback.print_exception(e)
+        self.update_evolution_explanation(error_message=f"Terjadi kesalahan internal saat simulasi: {e}")
+        self.stop_ai_loading_animation(final_text=f"Terjadi kesalahan: {e}")
+
+    def _apply_simulation_results(self, evolution_results, retrieved_params):
+        # Dipanggil di thread GUI, hanya untuk hasil simulasi terbaru
+        try:
             prompt_data = {
                     "environment_conditions": { 
                         "temperature": evolution_results.get("temperature"),
@@ -536,6 +708,11 @@ class App(ctk.CTk):
                 }
             ai_prompt = simulation.generate_ai_prompt(prompt_data, retrieved_params)
             self.update_evolution_explanation(data=evolution_results, ai_text="Sedang meminta penjelasan AI...") # Set a placeholder for AI text
+            if self.lineage is not None and evolution_results.get("status") == "evolution_simulated":
+                try:
+                    self.lineage.record_result(evolution_results, retrieved_params)
+                except (OSError, ValueError) as e:
+                    print(f"[App] Failed to record evolution in lineage journal: {e}")
             if evolution_results and evolution_results.get("status") != "error" and evolution_results.get("updated_tree_object"):
                 self.display_phylogenetic_tree(
                     tree_object=evolution_results["updated_tree_object"],
@@ -543,21 +720,18 @@ class App(ctk.CTk):
                 )
                 self.start_ai_loading_animation()
                 
-                #threading agar ui tidak freeze saat await response dari api llm
-                def threaded_ai_call():
-                    
-                    
-                    import time
-                    time.sleep(3) 
-                    ai_explanation_text = simulation.get_evolution_explanation_from_ai(ai_prompt)
-                    
-
-                    
-                    self.after(0, self.stop_ai_loading_animation, ai_explanation_text) 
-                                   
-                
-                ai_thread = threading.Thread(target=threaded_ai_call)
-                ai_thread.start()
+                #request async agar ui tidak freeze saat await response dari api llm
+                ai_service = simulation.get_ai_service()
+                if ai_service is None:
+                    self.stop_ai_loading_animation(final_text="AI service not configured: API key missing.")
+                else:
+                    # Klik baru membatalkan request lama, hanya jawaban terbaru yang ditampilkan
+                    ai_service.submit(
+                        ai_prompt,
+                        callback=lambda ai_explanation_text: self.after(0, self.stop_ai_loading_animation, ai_explanation_text),
+                        channel=AI_EXPLANATION_CHANNEL,
+                        cache_key=simulation.get_explanation_cache_key(prompt_data, retrieved_params),
+                    )
 
                 
             elif evolution_results and evolution_results.get("status") == "error":
@@ -699,6 +873,17 @@ class App(ctk.CTk):
     
     
 
+def _load_startup_data(tree_path, progress=None):
+    # Jalan di thread background: data simulasi + import matplotlib/tree_view lebih awal,
+    # agar gambar pohon pertama di thread GUI tidak menunggu import
+    startup_data = simulation.load_startup_data(tree_path, progress=progress)
+    try:
+        import tree_view
+    except ImportError as e:
+        print(f"[App] Error importing tree view: {e}")
+    return startup_data
+
+
 if __name__ == "__main__":
     app = App()
     app.mainloop()
\ No newline at end of file
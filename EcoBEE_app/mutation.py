@@ -0,0 +1,75 @@
+import numpy as np
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+try:
+    from .gene_store import encode_sequence, decode_sequence
+except ImportError:
+    from gene_store import encode_sequence, decode_sequence
+
+
+MAX_RANDOM_CELLS = 1 << 24  # Batas elemen matriks acak per blok mutant
+
+# Lookup substitusi: untuk kode A/C/G/T (0..3) pilih salah satu dari 3 basa lain,
+# untuk karakter lain (mis. N) pilih salah satu dari 4 basa.
+_N_CHOICES = np.full(256, 4, dtype=np.int64)
+_N_CHOICES[:4] = 3
+_SUBSTITUTE = np.tile(np.arange(4, dtype=np.uint8), (256, 1))
+for _code in range(4):
+    _SUBSTITUTE[_code, :3] = [b for b in range(4) if b != _code]
+del _code
+
+
+def make_rng(seed=None):
+    """Generator numpy dari seed (int/SeedSequence), Generator yang sudah ada, atau None (acak)."""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+def n_mutations_for(length, mutation_rate=0.05):
+    return min(length, max(1, int(length * mutation_rate)))
+
+def sample_sites(rng, n_mutants, length, n_sites):
+    """Posisi mutasi (n_mutants x n_sites), tanpa pengulangan di dalam satu mutant."""
+    sites = np.empty((n_mutants, n_sites), dtype=np.int64)
+    block = max(1, MAX_RANDOM_CELLS // max(1, length))
+    for start in range(0, n_mutants, block):
+        stop = min(n_mutants, start + block)
+        keys = rng.random((stop - start, length))
+        sites[start:stop] = np.argpartition(keys, n_sites - 1, axis=1)[:, :n_sites]
+    return sites
+
+def mutate_batch(codes, n_mutants, mutation_rate=0.05, seed=None):
+    """
+    Buat n_mutants mutant sekaligus dari satu sequence (kode gene_store, 1D).
+    Return (mutants [n_mutants x L] uint8, sites [n_mutants x n_sites]).
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    length = len(codes)
+    if length == 0:
+        raise ValueError("Tidak bisa memutasi sequence kosong.")
+    rng = make_rng(seed)
+    n_sites = n_mutations_for(length, mutation_rate)
+
+    sites = sample_sites(rng, n_mutants, length, n_sites)
+    mutants = np.tile(codes, (n_mutants, 1))
+    np.put_along_axis(mutants, sites, random_substitution(rng, codes[sites]), axis=1)
+    return mutants, sites
+
+def random_substitution(rng, original):
+    """Ganti setiap kode di original dengan basa lain yang dipilih acak (lookup table)."""
+    choice = rng.integers(0, _N_CHOICES[original])
+    return _SUBSTITUTE[original, choice]
+
+def point_mutation(rng, population, mutation_rate):
+    """Mutasi tiap posisi tiap individu dengan peluang mutation_rate (population: P x L, diubah in place)."""
+    rows, cols = np.nonzero(rng.random(population.shape) < mutation_rate)
+    population[rows, cols] = random_substitution(rng, population[rows, cols])
+    return population
+
+def mutate_sequence(seq_record, mutation_rate=0.05, seed=None):
+    codes = encode_sequence(seq_record.seq)
+    mutants, _ = mutate_batch(codes, 1, mutation_rate, seed)
+    mutated_seq = decode_sequence(mutants[0])
+    mutated_record = SeqRecord(Seq(mutated_seq), id=seq_record.id + "_mutated", description="Mutated sequence")
+    return mutated_record
@@ -1,53 +1,321 @@
 
+import copy
+import io
+import json
+import os
+import numpy as np
 from Bio import Phylo
 from Bio.Phylo.Newick import Clade
-import matplotlib.pyplot as plt
 
 
-def load_tree(file_path):
-    trees = list(Phylo.parse(file_path, "newick"))
-    return trees[0]  # Ambil pohon pertama
+TREE_INDEX_SUFFIX = ".idx"  # Index offset disimpan di samping file .nwk
+
+_tree_index_memo = {}  # abs path -> (fingerprint, offsets)
+_parsed_tree_cache = {}  # (abs path, tree_index) -> (fingerprint, tree)
+
+
+def _file_fingerprint(file_path):
+    st = os.stat(file_path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _scan_record_offsets(data):
+    """
+    Cari batas setiap record Newick (diakhiri ';') di dalam bytes file.
+    Hasilnya list [start, end) yang sudah dibersihkan dari whitespace.
+    """
+    offsets = []
+    if b"'" not in data and b"[" not in data:
+        # Fast path: tidak ada label berkutip atau komentar, ';' pasti akhir record
+        start = 0
+        end = data.find(b";")
+        while end != -1:
+            offsets.append((start, end + 1))
+            start = end + 1
+            end = data.find(b";", start)
+    else:
+        start = 0
+        in_quote = False
+        comment_depth = 0
+        for i, ch in enumerate(data):
+            if in_quote:
+                if ch == 0x27:  # '
+                    in_quote = False
+            elif comment_depth:
+                if ch == 0x5B:  # [
+                    comment_depth += 1
+                elif ch == 0x5D:  # ]
+                    comment_depth -= 1
+            elif ch == 0x27:
+                in_quote = True
+            elif ch == 0x5B:
+                comment_depth = 1
+            elif ch == 0x3B:  # ;
+                offsets.append((start, i + 1))
+                start = i + 1
+
+    cleaned = []
+    for start, end in offsets:
+        while start < end and data[start:start + 1].isspace():
+            start += 1
+        if end - start > 1:
+            cleaned.append([start, end])
+    return cleaned
+
+
+def build_tree_index(file_path):
+    """
+    Bangun index byte-offset untuk semua pohon di file Newick dan simpan
+    di file_path + TREE_INDEX_SUFFIX. Index lama diabaikan jika mtime/size berubah.
+    """
+    fingerprint = _file_fingerprint(file_path)
+    with open(file_path, "rb") as f:
+        offsets = _scan_record_offsets(f.read())
+
+    try:
+        with open(file_path + TREE_INDEX_SUFFIX, "w") as f:
+            json.dump({"fingerprint": fingerprint, "offsets": offsets}, f)
+    except OSError:
+        pass  # Folder read-only: index cukup disimpan di memori
+
+    _tree_index_memo[os.path.abspath(file_path)] = (fingerprint, offsets)
+    return offsets
+
+
+def get_tree_index(file_path):
+    key = os.path.abspath(file_path)
+    fingerprint = _file_fingerprint(file_path)
+
+    memo = _tree_index_memo.get(key)
+    if memo and memo[0] == fingerprint:
+        return memo[1]
+
+    try:
+        with open(file_path + TREE_INDEX_SUFFIX, "r") as f:
+            stored = json.load(f)
+        if stored.get("fingerprint") == fingerprint:
+            _tree_index_memo[key] = (fingerprint, stored["offsets"])
+            return stored["offsets"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    return build_tree_index(file_path)
+
+
+def count_trees(file_path):
+    return len(get_tree_index(file_path))
+
+
+def _parse_record(f, start, end):
+    f.seek(start)
+    text = f.read(end - start).decode("utf-8")
+    return Phylo.read(io.StringIO(text), "newick")
+
+
+def iter_trees(file_path, start=0, stop=None):
+    """
+    Kembalikan pohon ke-start sampai stop (eksklusif) satu per satu,
+    hanya record yang diminta yang dibaca dan di-parse.
+    """
+    offsets = get_tree_index(file_path)
+    with open(file_path, "rb") as f:
+        for record_start, record_end in offsets[start:stop]:
+            yield _parse_record(f, record_start, record_end)
+
+
+def load_tree(file_path, tree_index=0):
+    offsets = get_tree_index(file_path)
+    if not -len(offsets) <= tree_index < len(offsets):
+        raise IndexError(f"Tree {tree_index} not found in {file_path} ({len(offsets)} trees).")
+    record_start, record_end = offsets[tree_index]
+    with open(file_path, "rb") as f:
+        return _parse_record(f, record_start, record_end)  # Default: pohon pertama
+
+def get_cached_tree(file_path, tree_index=0):
+    """
+    Pohon dasar yang sudah di-parse, disimpan per (path, tree_index) dan
+    di-parse ulang hanya jika mtime/size file berubah. Jangan diubah langsung,
+    gunakan clone_tree untuk simulasi.
+    """
+    key = (os.path.abspath(file_path), tree_index)
+    fingerprint = _file_fingerprint(file_path)
+    cached = _parsed_tree_cache.get(key)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+
+    tree = load_tree(file_path, tree_index)
+    _parsed_tree_cache[key] = (fingerprint, tree)
+    return tree
+
+def clear_tree_cache():
+    _parsed_tree_cache.clear()
+
+def clone_tree(tree):
+    """
+    Clone ringan (O(1)): semua clade dibagi bersama dengan pohon asal.
+    add_new_branch hanya menyalin clade di jalur root -> parent yang diubah,
+    sehingga pohon asal tidak pernah ikut berubah.
+    """
+    return copy.copy(tree)
+
+def load_tree_clone(file_path, tree_index=0):
+    return clone_tree(get_cached_tree(file_path, tree_index))
 
 def save_tree(tree, file_path):
     Phylo.write(tree, file_path, "newick")
 
+def _find_clade_path(tree, clade_name):
+    # Preorder seperti tree.find_clades(), tapi sekaligus mencatat jalur dari root
+    parents = {}
+    stack = [tree.root]
+    while stack:
+        clade = stack.pop()
+        if clade.name == clade_name:
+            path = [clade]
+            while id(path[-1]) in parents:
+                path.append(parents[id(path[-1])])
+            path.reverse()
+            return path
+        for child in reversed(clade.clades):
+            parents[id(child)] = clade
+            stack.append(child)
+    return None
+
+def _replace_path(tree, path, new_clade):
+    # Copy-on-write: salin ancestor di jalur, clade lain tetap dibagi bersama
+    for depth in range(len(path) - 2, -1, -1):
+        parent, old_child = path[depth], path[depth + 1]
+        parent_copy = copy.copy(parent)
+        parent_copy.clades = [new_clade if child is old_child else child for child in parent.clades]
+        new_clade = parent_copy
+    tree.root = new_clade
+    return tree
+
 def add_new_branch(tree, parent_species_name, new_species_name, branch_length=1.0):
     """
     Sisipkan cabang baru di bawah parent_species_name.
     Jika parent adalah terminal node, buat node internal baru.
+    Clade yang sudah ada tidak diubah; hanya tree.root yang diganti.
     """
-    for clade in tree.find_clades():
-        if clade.name == parent_species_name:
-            # Jika parent adalah terminal (daun)
-            if clade.is_terminal():
-                # Simpan nama dan branch_length lama
-                old_name = clade.name
-                old_branch = clade.branch_length
-
-                # Buat clade internal baru
-                new_internal = Clade(branch_length=old_branch)
-                new_internal.clades.append(Clade(name=old_name, branch_length=branch_length))
-                new_internal.clades.append(Clade(name=new_species_name, branch_length=branch_length))
-                clade.name = None
-                clade.clades = new_internal.clades
-                clade.branch_length = new_internal.branch_length
-                return tree
-            else:
-                # Parent adalah internal node, langsung tambahkan anak baru
-                clade.clades.append(Clade(name=new_species_name, branch_length=branch_length))
-                return tree
-
-    raise ValueError(f"Parent species {parent_species_name} not found in tree.")
-
-def draw_tree_on_axes(tree, ax, highlight_species_name=None):
-
-    
-    def get_label_color(label): # This receives a Clade object
-      
-   
-        if label == highlight_species_name:
-            return "red"
-        return "black"
+    path = _find_clade_path(tree, parent_species_name)
+    if path is None:
+        raise ValueError(f"Parent species {parent_species_name} not found in tree.")
+    return add_branch_at_path(tree, path, new_species_name, branch_length)
+
+def add_branch_at_path(tree, path, new_species_name, branch_length=1.0):
+    """add_new_branch dengan jalur root -> parent yang sudah diketahui (mis. dari tree_utils.IndexedTree)."""
+    clade = path[-1]
+    new_clade = copy.copy(clade)
+    # Jika parent adalah terminal (daun)
+    if clade.is_terminal():
+        # Clade lama menjadi node internal dengan dua anak: spesies lama dan baru
+        # (branch_length lama tetap pada node internal)
+        new_clade.name = None
+        new_clade.clades = [
+            Clade(name=clade.name, branch_length=branch_length),
+            Clade(name=new_species_name, branch_length=branch_length),
+        ]
+    else:
+        # Parent adalah internal node, langsung tambahkan anak baru
+        new_clade.clades = clade.clades + [Clade(name=new_species_name, branch_length=branch_length)]
+
+    return _replace_path(tree, path, new_clade)
+
+class TreeLayout:
+    """
+    Posisi semua clade (urutan preorder) seperti tata letak Phylo.draw:
+    x = jarak dari root (branch length), y = baris tip 1..n, node internal di
+    tengah anak pertama dan terakhir.
+    """
+
+    def __init__(self, clades, parents, first_child, last_child, x, y):
+        self.clades = clades
+        self.parents = parents
+        self.first_child = first_child
+        self.last_child = last_child
+        self.x = x
+        self.y = y
+        self._subtree_sizes = None
+
+    def __len__(self):
+        return len(self.clades)
+
+    @property
+    def subtree_sizes(self):
+        """Jumlah clade di subtree tiap clade (termasuk dirinya); subtree i = clades[i:i + ukuran]."""
+        if self._subtree_sizes is None:
+            sizes = np.ones(len(self.clades), dtype=np.int64)
+            parents = self.parents
+            for i in range(len(sizes) - 1, 0, -1):
+                sizes[parents[i]] += sizes[i]
+            self._subtree_sizes = sizes
+        return self._subtree_sizes
+
+    @property
+    def is_terminal(self):
+        return self.first_child < 0
+
+    @property
+    def n_terminals(self):
+        return int(self.is_terminal.sum())
+
+    def segments(self):
+        """Array (n_segmen x 2 x 2): garis horizontal tiap clade + garis vertikal tiap node internal."""
+        x, y, parents = self.x, self.y, self.parents
+        x_start = np.where(parents >= 0, x[np.maximum(parents, 0)], 0.0)
+        horizontal = np.stack([np.stack([x_start, y], axis=1), np.stack([x, y], axis=1)], axis=1)
+        internal = np.flatnonzero(~self.is_terminal)
+        vertical = np.stack([
+            np.stack([x[internal], y[self.first_child[internal]]], axis=1),
+            np.stack([x[internal], y[self.last_child[internal]]], axis=1),
+        ], axis=1)
+        return np.concatenate([horizontal, vertical])
+
+    def labels(self):
+        """List (index, nama) untuk clade yang punya nama."""
+        return [(i, clade.name) for i, clade in enumerate(self.clades) if clade.name]
+
+
+def compute_tree_layout(tree):
+    clades, parents, first_child, last_child = [], [], [], []
+    stack = [(tree.root, -1)]
+    while stack:
+        clade, parent = stack.pop()
+        index = len(clades)
+        clades.append(clade)
+        parents.append(parent)
+        first_child.append(-1)
+        last_child.append(-1)
+        if parent >= 0:
+            # Preorder: anak pertama selalu tepat setelah parent, anak terakhir yang terakhir ditemui
+            if first_child[parent] < 0:
+                first_child[parent] = index
+            last_child[parent] = index
+        for child in reversed(clade.clades):
+            stack.append((child, index))
+
+    n = len(clades)
+    parents = np.array(parents, dtype=np.int64)
+    first_child = np.array(first_child, dtype=np.int64)
+    last_child = np.array(last_child, dtype=np.int64)
+
+    branch_lengths = np.array([c.branch_length or 0 for c in clades], dtype=np.float64)
+    if n > 1 and not branch_lengths[1:].any():
+        branch_lengths[1:] = 1.0  # Tidak ada branch length: anggap panjang 1
+    x = np.empty(n)
+    x[0] = branch_lengths[0]
+    for i in range(1, n):
+        x[i] = x[parents[i]] + branch_lengths[i]
+
+    y = np.zeros(n)
+    is_terminal = first_child < 0
+    y[is_terminal] = np.arange(1, is_terminal.sum() + 1)
+    for i in np.flatnonzero(~is_terminal)[::-1]:
+        y[i] = (y[first_child[i]] + y[last_child[i]]) / 2.0
+
+    return TreeLayout(clades, parents, first_child, last_child, x, y)
+
+def draw_tree_on_axes(tree, ax, highlight_species_name=None, zoom_clade=None):
 
     if not tree: # Handle case ketika tree object = None
         
@@ -61,21 +329,14 @@ def draw_tree_on_axes(tree, ax, highlight_species_name=None):
             ax.spines['bottom'].set_visible(False)
             ax.spines['left'].set_visible(False)
         return ax.figure if ax else None
-    # Bersihkan axes
-    ax.clear()
-
-    # Draw the tree on the provided axes
-    Phylo.draw(tree, axes=ax, label_func=lambda x: x.name if x.name else "", 
-               label_colors=get_label_color, do_show=False, branch_labels=None)
-
-
-    ax.set_xlabel("") # Clear default x-axis label 
-    ax.set_ylabel("") # Clear default y-axis label 
-    ax.set_xticks([]) # Hide x-axis ticks
-    ax.set_yticks([]) # Hide y-axis ticks
-    ax.spines['top'].set_visible(False) # Hide spines 
-    ax.spines['right'].set_visible(False)
-    ax.spines['bottom'].set_visible(False)
-    ax.spines['left'].set_visible(False)
+
+    # Renderer diimpor di sini agar modul ini tetap bisa dipakai tanpa matplotlib (batch/GA)
+    try:
+        from .tree_renderer import render_tree
+    except ImportError:
+        from tree_renderer import render_tree
+
+    # Cabang sebagai LineCollection, label yang bertumpuk di-cull (lihat tree_renderer.py)
+    render_tree(ax, tree, highlight_species_name=highlight_species_name, zoom_clade=zoom_clade)
 
     return ax.figure # Return figure tree
@@ -0,0 +1,320 @@
+"""
+Monte Carlo replicate: jalankan run_evolution_simulation berkali-kali untuk SATU
+lingkungan dengan seed berbeda, lalu kumpulkan distribusi induk pemenang, sebaran
+fitness, panjang cabang dan gen yang ditarget. Statistik dikirim bertahap setiap
+chunk selesai; berhenti lebih awal jika frekuensi induk sudah konvergen.
+
+    python replicates.py --env temperature=45 humidity=10 flowers=5 --replicates 5000 --seed 1
+    python replicates.py --env temperature=45 humidity=10 flowers=5 --tolerance 0.005 --stream progres.jsonl
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+try:
+    from . import simulation
+    from .batch_runner import ENV_PARAMETERS
+    from .distance import MAX_ALIGNED_P, correct_distances
+    from .tree_utils import get_indexed_tree
+except ImportError:
+    import simulation
+    from batch_runner import ENV_PARAMETERS
+    from distance import MAX_ALIGNED_P, correct_distances
+    from tree_utils import get_indexed_tree
+
+
+DEFAULT_REPLICATES = 1000
+DEFAULT_CHUNK_SIZE = 50
+DEFAULT_TOLERANCE = 0.01  # Stop jika standard error frekuensi induk dan fitness rata-rata < toleransi
+DEFAULT_MIN_REPLICATES = 200
+FITNESS_BINS = 20
+# Panjang cabang = jarak Jukes-Cantor mutant -> induk; p-distance di atas MAX_ALIGNED_P
+# tidak dipakai, jadi maksimumnya JC(MAX_ALIGNED_P) ~0.82, atau NEW_BRANCH_LENGTH (fallback)
+BRANCH_LENGTH_RANGE = (0.0, float(max(correct_distances(MAX_ALIGNED_P, "jc69"), simulation.NEW_BRANCH_LENGTH)))
+
+
+class RunningStats:
+    """Mean/varians streaming (Welford) + min/max."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def as_dict(self):
+        if not self.n:
+            return {"n": 0}
+        return {"n": self.n, "mean": self.mean, "std": self.std, "min": self.min, "max": self.max}
+
+
+class Histogram:
+    """Histogram bin tetap; nilai di luar [low, high] masuk bin pertama/terakhir."""
+
+    def __init__(self, low, high, bins):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def add(self, value):
+        index = int(np.searchsorted(self.edges, value, side="right")) - 1
+        self.counts[min(max(index, 0), len(self.counts) - 1)] += 1
+
+    def as_dict(self):
+        return {"edges": [float(e) for e in self.edges], "counts": self.counts.tolist()}
+
+
+class ReplicateSummary:
+    """Agregat semua replicate yang sudah selesai (ditambah berurutan menurut index)."""
+
+    def __init__(self):
+        self.n = 0
+        self.status_counts = Counter()
+        self.parent_counts = Counter()
+        self.gene_target_counts = Counter()
+        self.parent_fitness = RunningStats()
+        self.branch_length = RunningStats()
+        self.fitness_histogram = Histogram(0.0, 1.0, FITNESS_BINS)
+        self.branch_length_histogram = Histogram(*BRANCH_LENGTH_RANGE, FITNESS_BINS)
+
+    def add(self, row):
+        self.n += 1
+        self.status_counts[row["status"]] += 1
+        for gene_type in row["mutated_genes_list"] or []:
+            self.gene_target_counts[gene_type] += 1
+        winner = row["parent_of_evolution"] or row["matching_species"]
+        if winner:
+            self.parent_counts[winner] += 1
+        if row["parent_fitness"] is not None:
+            self.parent_fitness.add(row["parent_fitness"])
+            self.fitness_histogram.add(row["parent_fitness"])
+        if row["branch_length"] is not None:
+            self.branch_length.add(row["branch_length"])
+            self.branch_length_histogram.add(row["branch_length"])
+
+    def parent_frequencies(self):
+        return {name: count / self.n for name, count in self.parent_counts.most_common()} if self.n else {}
+
+    def max_standard_error(self):
+        """
+        Standard error terbesar di antara frekuensi induk (binomial) dan rata-rata fitness
+        induk; inf jika belum ada data.
+        """
+        if not self.n:
+            return math.inf
+        errors = [math.sqrt(p * (1 - p) / self.n) for p in self.parent_frequencies().values()]
+        if self.parent_fitness.n > 1:
+            errors.append(self.parent_fitness.std / math.sqrt(self.parent_fitness.n))
+        return max(errors, default=0.0)
+
+    def as_dict(self):
+        return {
+            "replicates": self.n,
+            "status_counts": dict(self.status_counts),
+            "parent_counts": dict(self.parent_counts.most_common()),
+            "parent_frequencies": self.parent_frequencies(),
+            "gene_target_frequencies": {g: c / self.n for g, c in self.gene_target_counts.most_common()} if self.n else {},
+            "parent_fitness": dict(self.parent_fitness.as_dict(), histogram=self.fitness_histogram.as_dict()),
+            "branch_length": dict(self.branch_length.as_dict(), histogram=self.branch_length_histogram.as_dict()),
+            "max_standard_error": self.max_standard_error(),
+        }
+
+
+_worker_genes = None
+_worker_tree_path = None
+
+def _init_worker(tree_path):
+    # Sekali per worker: gen dari cache .npy (memory-map, halaman dibagi antar proses lewat
+    # page cache OS) dan pohon ber-index. Task hanya berisi (index, seed).
+    global _worker_genes, _worker_tree_path
+    _worker_genes = simulation.load_genes()
+    _worker_tree_path = tree_path
+    get_indexed_tree(tree_path)
+
+def _summarize(index, seed, results):
+    return {
+        "index": index,
+        "seed": seed,
+        "status": results.get("status"),
+        "matching_species": results.get("matching_species"),
+        "parent_of_evolution": results.get("parent_of_evolution"),
+        "mutated_genes_list": results.get("mutated_genes_list", []),
+        "parent_fitness": results.get("parent_fitness"),
+        "branch_length": results.get("branch_length"),
+    }
+
+def run_replicate_chunk(env, chunk):
+    """chunk: list (index, seed) -> list ringkasan kecil (bukan pohon/sequence) per replicate."""
+    rows = []
+    for index, seed in chunk:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = simulation.run_evolution_simulation(env, _worker_tree_path, _worker_genes, seed=seed)
+        rows.append(_summarize(index, seed, results))
+    return rows
+
+
+def replicate_seed(seed, index):
+    # Sama seperti batch_runner: seed per replicate dari (seed, index), tidak bergantung urutan worker
+    if seed is None:
+        return None
+    return int(np.random.SeedSequence([seed, index]).generate_state(1)[0])
+
+def _chunks(n_replicates, chunk_size, seed):
+    for start in range(0, n_replicates, chunk_size):
+        yield start, [(index, replicate_seed(seed, index)) for index in range(start, min(start + chunk_size, n_replicates))]
+
+
+def iter_replicates(env, n_replicates=DEFAULT_REPLICATES, seed=None, processes=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                    tolerance=DEFAULT_TOLERANCE, min_replicates=DEFAULT_MIN_REPLICATES, tree_path=None):
+    """
+    Generator snapshot statistik (dict, lihat ReplicateSummary.as_dict) setelah setiap chunk.
+    Chunk digabung menurut urutan index, jadi dengan seed yang sama hasil (termasuk titik
+    early stop) tidak bergantung jumlah proses. Setiap snapshot berisi "converged"; yang
+    terakhir (semua replicate selesai atau konvergen) juga "stopped_early", dan tidak diulang.
+    """
+    tree_path = tree_path or simulation.TREE_FILE
+    processes = processes or os.cpu_count() or 1
+    summary = ReplicateSummary()
+    completed = {}  # start chunk -> rows, menunggu chunk sebelumnya
+    next_start = 0
+    converged = False
+    finished = False
+
+    def drain():
+        nonlocal next_start, converged, finished
+        while next_start in completed and not converged:
+            rows = completed.pop(next_start)
+            for row in rows:
+                summary.add(row)
+            next_start += len(rows)
+            converged = summary.n >= min_replicates and summary.max_standard_error() < tolerance
+            snapshot = summary.as_dict()
+            snapshot["converged"] = converged
+            if converged or summary.n >= n_replicates:
+                finished = True
+                snapshot["stopped_early"] = converged and summary.n < n_replicates
+            yield snapshot
+
+    if processes <= 1:
+        _init_worker(tree_path)
+        for start, chunk in _chunks(n_replicates, chunk_size, seed):
+            completed[start] = run_replicate_chunk(env, chunk)
+            yield from drain()
+            if converged:
+                break
+    else:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(tree_path,)) as executor:
+            chunks = _chunks(n_replicates, chunk_size, seed)
+            pending = {}
+            try:
+                while True:
+                    # Batasi chunk yang berjalan agar early stop tidak menunggu ribuan task
+                    while len(pending) < processes * 2:
+                        start, chunk = next(chunks, (None, None))
+                        if chunk is None:
+                            break
+                        pending[executor.submit(run_replicate_chunk, env, chunk)] = start
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        completed[pending.pop(future)] = future.result()
+                    yield from drain()
+                    if converged:
+                        break
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    if not finished:  # Tidak ada chunk sama sekali (n_replicates=0)
+        final = summary.as_dict()
+        final["converged"] = converged
+        final["stopped_early"] = False
+        yield final
+
+def run_replicates(env, n_replicates=DEFAULT_REPLICATES, on_update=None, **kwargs):
+    """Jalankan semua replicate; on_update(snapshot) dipanggil setiap chunk. Return snapshot terakhir."""
+    snapshot = None
+    for snapshot in iter_replicates(env, n_replicates, **kwargs):
+        if on_update is not None:
+            on_update(snapshot)
+    return snapshot
+
+
+def parse_env(items):
+    env = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        if key not in ENV_PARAMETERS or not value:
+            raise argparse.ArgumentTypeError(f"Expected one of {ENV_PARAMETERS} as name=value, got '{item}'")
+        env[key] = float(value)
+    missing = [p for p in ENV_PARAMETERS if p not in env]
+    if missing:
+        raise argparse.ArgumentTypeError(f"Missing environment parameters: {', '.join(missing)}")
+    return env
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoBEE Monte Carlo replicate runner")
+    parser.add_argument("--env", nargs="+", required=True, help="temperature=.. humidity=.. flowers=..")
+    parser.add_argument("--replicates", type=int, default=DEFAULT_REPLICATES)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-replicates", type=int, default=DEFAULT_MIN_REPLICATES)
+    parser.add_argument("--tree", default=simulation.TREE_FILE)
+    parser.add_argument("--stream", help="Tulis setiap snapshot ke file JSON Lines")
+    parser.add_argument("--out", help="Tulis ringkasan akhir ke file JSON")
+    args = parser.parse_args(argv)
+    try:
+        env = parse_env(args.env)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    stream = open(args.stream, "w") if args.stream else None
+    def on_update(snapshot):
+        top = next(iter(snapshot["parent_frequencies"].items()), ("-", 0.0))
+        print(f"[replicates] {snapshot['replicates']}/{args.replicates}  top parent {top[0]} ({top[1]:.3f})"
+              f"  max SE {snapshot['max_standard_error']:.4f}", file=sys.stderr)
+        if stream is not None:
+            stream.write(json.dumps(snapshot) + "\n")
+            stream.flush()
+    try:
+        final = run_replicates(env, args.replicates, on_update=on_update, seed=args.seed, processes=args.processes,
+                               chunk_size=args.chunk_size, tolerance=args.tolerance,
+                               min_replicates=args.min_replicates, tree_path=args.tree)
+    finally:
+        if stream is not None:
+            stream.close()
+
+    text = json.dumps(final, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+ENV_PARAMETERS = ["temperature", "humidity", "flowers"]
+MAX_QUERY_CELLS = 1 << 24  # Batas elemen query x spesies x parameter per blok
+
+
+class ThresholdIndex:
+    """
+    threshold.json yang dikompilasi menjadi array batas bawah/atas (spesies x parameter),
+    sehingga pencocokan lingkungan bisa dijalankan untuk banyak query sekaligus.
+    """
+
+    def __init__(self, thresholds, parameters=None):
+        self.parameters = list(parameters or ENV_PARAMETERS)
+        self.species = list(thresholds)
+        bounds = np.array([[thresholds[s][p] for p in self.parameters] for s in self.species], dtype=np.float64)
+        bounds = bounds.reshape(len(self.species), len(self.parameters), 2)
+        self.lower = bounds[:, :, 0]
+        self.upper = bounds[:, :, 1]
+
+    def as_queries(self, env):
+        """dict {parameter: skalar/array} atau array (Q x P) -> array float (Q x P)."""
+        if isinstance(env, dict):
+            columns = np.broadcast_arrays(*(np.asarray(env[p], dtype=np.float64) for p in self.parameters))
+            return np.stack([np.ravel(c) for c in columns], axis=1)
+        return np.atleast_2d(np.asarray(env, dtype=np.float64))
+
+    def _blocks(self, queries):
+        block = max(1, MAX_QUERY_CELLS // max(1, len(self.species) * len(self.parameters)))
+        for start in range(0, len(queries), block):
+            chunk = queries[start:start + block, None, :]
+            yield start, (self.lower <= chunk) & (chunk <= self.upper)  # (q x S x P)
+
+    def match(self, env):
+        """Index spesies pertama (urutan threshold.json) yang cocok semua parameter, -1 jika tidak ada."""
+        queries = self.as_queries(env)
+        matches = np.full(len(queries), -1, dtype=np.int64)
+        if not self.species:
+            return matches
+        for start, within in self._blocks(queries):
+            all_ok = within.all(axis=2)
+            found = all_ok.any(axis=1)
+            matches[start:start + len(all_ok)] = np.where(found, all_ok.argmax(axis=1), -1)
+        return matches
+
+    def targets(self, env):
+        """
+        Return (best_species [Q], out_of_range [Q x P]): spesies dengan parameter cocok
+        terbanyak (seri -> yang pertama) dan parameter mana yang di luar rentangnya.
+        """
+        queries = self.as_queries(env)
+        best = np.empty(len(queries), dtype=np.int64)
+        out_of_range = np.empty(queries.shape, dtype=bool)
+        for start, within in self._blocks(queries):
+            stop = start + len(within)
+            best[start:stop] = within.sum(axis=2).argmax(axis=1)
+            out_of_range[start:stop] = ~within[np.arange(len(within)), best[start:stop]]
+        return best, out_of_range
+
+    def matching_species(self, env):
+        return [self.species[i] if i >= 0 else None for i in self.match(env)]
+
+    def mutation_targets(self, env, gene_parameters):
+        """List gen target per query; gene_parameters: {gene_type: parameter}."""
+        parameter_genes = {}  # Beberapa gen boleh berbagi satu parameter (katalog dari manifest)
+        for gene_type, parameter in gene_parameters.items():
+            parameter_genes.setdefault(parameter, []).append(gene_type)
+        genes = [parameter_genes.get(p, []) for p in self.parameters]
+        if not self.species:
+            return [[] for _ in range(len(self.as_queries(env)))]
+        _, out_of_range = self.targets(env)
+        return [[g for j in np.flatnonzero(row) for g in genes[j]] for row in out_of_range]
@@ -0,0 +1,103 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SimulationCancelled(Exception):
+    pass
+
+
+class _Job:
+    def __init__(self, job_id):
+        self.id = job_id
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.delivered = False  # on_done/on_error sudah dijalankan di thread GUI
+
+    def progress_hook(self, report):
+        # Dipanggil pipeline di setiap tahap: cek pembatalan lalu laporkan tahap
+        def progress(stage, step=None, total=None):
+            if self.cancel_event.is_set():
+                raise SimulationCancelled(stage)
+            if report is not None:
+                report(self.id, stage, step, total)
+        return progress
+
+
+class SimulationExecutor:
+    """
+    Menjalankan job simulasi di thread pool di luar event loop Tk.
+    Semua callback dikirim lewat `dispatch` (mis. lambda fn, *args: app.after(0, fn, *args))
+    dan hanya untuk job terbaru; job lama dibatalkan saat job baru masuk.
+    """
+
+    def __init__(self, dispatch, max_workers=1):
+        self.dispatch = dispatch
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="simulation")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._latest = None
+
+    def is_latest(self, job_id):
+        with self._lock:
+            return self._latest is not None and self._latest.id == job_id
+
+    def _deliver(self, job_id, callback, *args, finished_job=None):
+        def _apply():
+            # Cek lagi di thread GUI: job bisa saja tergantikan setelah callback dijadwalkan
+            if not self.is_latest(job_id):
+                return
+            if callback is not None:
+                callback(*args)
+            if finished_job is not None:
+                # Job selesai: cancel() berikutnya tidak boleh menimpa hasilnya
+                finished_job.delivered = True
+                with self._lock:
+                    if self._latest is finished_job:
+                        self._latest = None
+        if self.is_latest(job_id):
+            self.dispatch(_apply)
+
+    def submit(self, func, *args, on_progress=None, on_done=None, on_error=None, **kwargs):
+        """
+        Jalankan func(*args, progress=..., **kwargs) di background. Return id job.
+        on_progress(stage, step, total), on_done(result), on_error(exception).
+        """
+        job = _Job(next(self._ids))
+        with self._lock:
+            previous, self._latest = self._latest, job
+        if previous is not None:
+            previous.cancel_event.set()
+
+        def report(job_id, stage, step, total):
+            self._deliver(job_id, on_progress, stage, step, total)
+
+        def run():
+            try:
+                result = func(*args, progress=job.progress_hook(report), **kwargs)
+            except SimulationCancelled:
+                return
+            except Exception as e:
+                self._deliver(job.id, on_error, e, finished_job=job)
+                return
+            if job.cancel_event.is_set():
+                return
+            self._deliver(job.id, on_done, result, finished_job=job)
+
+        job.future = self._pool.submit(run)
+        return job.id
+
+    def cancel(self):
+        """Batalkan job terbaru (dan dengan begitu semua job). True jika ada job yang belum selesai."""
+        with self._lock:
+            job, self._latest = self._latest, None
+        if job is None:
+            return False
+        job.cancel_event.set()
+        job.future.cancel()
+        # Future yang sudah selesai tetapi hasilnya belum dijalankan di thread GUI tetap dibatalkan
+        return not job.delivered
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,85 +1,143 @@
 
 import os
 import json 
-import random
-import google.generativeai as genai
+import sqlite3
 from dotenv import load_dotenv
 from Bio.Seq import Seq
-from Bio import SeqIO
 from Bio.SeqRecord import SeqRecord
-from collections import Counter
 
 #DIR
 project_root =  os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(project_root, "data")
+DATA_DIR = os.environ.get("ECOBEE_DATA_DIR", os.path.join(project_root, "data"))  # mis. dataset dari synthetic_data.py
 FASTA_DIR = os.path.join(DATA_DIR, "gen_fasta")
 THRESHOLD_FILE = os.path.join(DATA_DIR, "threshold.json")
+TREE_FILE = os.path.join(DATA_DIR, "BEE_prunedtree_APIS.nwk")
+GENE_CACHE_DIR = os.environ.get("ECOBEE_GENE_CACHE", os.path.join(DATA_DIR, ".gene_cache"))
+AI_CACHE_FILE = os.environ.get("ECOBEE_AI_CACHE", os.path.join(DATA_DIR, "ai_explanations.sqlite"))
+LINEAGE_JOURNAL_FILE = os.environ.get("ECOBEE_LINEAGE_JOURNAL", os.path.join(DATA_DIR, "lineage.jsonl"))
+GENE_MANIFEST_FILE = os.path.join(DATA_DIR, "gene_manifest.json")  # Katalog gen + locus genome (lihat gen_loader.py)
+NEW_BRANCH_LENGTH = 0.1  # Dipakai jika jarak mutant ke induk tidak bisa dihitung
+DISTANCE_TREE_METHOD = "nj"  # "nj" atau "upgma" (lihat distance.py)
+AI_CACHE_ENV_BUCKETS = None  # mis. {"temperature": 2, "humidity": 5, "flowers": 50} agar lingkungan mirip berbagi cache
 
-GENE_TYPES = ["Hsp90", "AQP", "OR"]  # Suhu, Kelembaban, Bunga
+DEFAULT_GENE_PARAMETERS = {"Hsp90": "temperature", "AQP": "humidity", "OR": "flowers"}  # Suhu, Kelembaban, Bunga
 
 load_dotenv()
 api_key_variable = os.environ.get("GEMINI_API_KEY")
+_ai_service = None
+_lineage = None
+_lineage_distances = None  # (DistanceMatrix dasar, salinan + spesies lineage)
 
-with open(THRESHOLD_FILE, "r") as f:
-    thresholds = json.load(f) 
+_thresholds = None  # threshold.json baru dibaca saat pertama dipakai (lihat get_thresholds)
+_threshold_index = None
 
 
 
 try:
     
     
-    from .phylogenetic import load_tree, save_tree, add_new_branch
+    from .phylogenetic import load_tree, clone_tree, save_tree
+    from .tree_utils import get_indexed_tree
+    from .lineage_journal import LineageJournal
+    from .gen_loader import discover_gene_types, gene_parameters, load_gene_store, read_gene_manifest
+    from .instrumentation import NULL_SPAN, get_profiler
+    from .distance import distances_to_store, get_distance_matrix
+    from .consensus import get_gene_profile
+    from .fitness import fitness_matrix
+    from .mutation import make_rng, mutate_sequence
+    from .rule_based import ThresholdIndex
+    from .ai_cache import ExplanationCache, explanation_cache_key
     
 except ImportError:
    
-    from phylogenetic import load_tree, save_tree, add_new_branch # save_tree might be for utility, not direct UI call
-    
+    from phylogenetic import load_tree, clone_tree, save_tree # save_tree might be for utility, not direct UI call
+    from tree_utils import get_indexed_tree
+    from lineage_journal import LineageJournal
+    from gen_loader import discover_gene_types, gene_parameters, load_gene_store, read_gene_manifest
+    from instrumentation import NULL_SPAN, get_profiler
+    from distance import distances_to_store, get_distance_matrix
+    from consensus import get_gene_profile
+    from fitness import fitness_matrix
+    from mutation import make_rng, mutate_sequence
+    from rule_based import ThresholdIndex
+    from ai_cache import ExplanationCache, explanation_cache_key
+
+
+# Katalog gen dari manifest/folder gen_fasta, bukan konstanta (gen tanpa parameter
+# lingkungan tetap dimuat, hanya tidak pernah menjadi target mutasi)
+_gene_manifest = read_gene_manifest(GENE_MANIFEST_FILE)
+GENE_PARAMETERS = gene_parameters(_gene_manifest, DEFAULT_GENE_PARAMETERS)
+GENE_TYPES = discover_gene_types(FASTA_DIR, _gene_manifest, known=GENE_PARAMETERS) or list(GENE_PARAMETERS)
+
 
 #Helper function
 def get_average_sequence(species_genes_data, gene_type):
-  
-    seqs = []
-    if species_genes_data:
-        for species_name, genes_dict in species_genes_data.items():
-            if gene_type in genes_dict and hasattr(genes_dict[gene_type], 'seq'):
-                seqs.append(str(genes_dict[gene_type].seq))
-            
+    """
+    Consensus (basa terbanyak per posisi) dari semua sequence gene_type.
+    Profile-nya di-cache di consensus.py, jadi run berikutnya tidak menghitung ulang.
+    """
+    profile = get_gene_profile(species_genes_data, gene_type)
 
-
-    if not seqs:
+    if profile is None:
        
         return SeqRecord(Seq(""), id=f"{gene_type}_consensus_empty", description="No sequences available")
 
-    min_len = min(len(s) for s in seqs)
-    if min_len == 0:
+    if profile.length == 0:
        
         return SeqRecord(Seq(""), id=f"{gene_type}_consensus_zerolen", description="Zero length sequences")
-        
-    seqs = [s[:min_len] for s in seqs]
-
-    consensus_char_list = []
-    for i in range(min_len):
-        bases_at_position_i = [s[i] for s in seqs]
-        if bases_at_position_i:
-            most_common_base = Counter(bases_at_position_i).most_common(1)[0][0]
-            consensus_char_list.append(most_common_base)
-        else: 
-            consensus_char_list.append("N") 
-
-    consensus_seq_str = "".join(consensus_char_list)
+
+    consensus_seq_str = profile.consensus_sequence()
     return SeqRecord(Seq(consensus_seq_str), id=f"{gene_type}_consensus", description="Consensus sequence")
 
 #Main Simulation Function 
-def run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes_data):
-    
-
-    current_tree = load_tree(filo_tree_path)
+SIMULATION_STAGES = ["load_tree", "match_species", "consensus", "mutation", "fitness", "insert_branch"]
+
+def _stage_reporter(progress, stage_timer=NULL_SPAN):
+    if progress is None:
+        return stage_timer.mark
+    total = len(SIMULATION_STAGES)
+    def report_stage(stage):
+        stage_timer.mark(stage)
+        progress(stage, SIMULATION_STAGES.index(stage) + 1, total)
+    return report_stage
+
+def run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes_data, seed=None, progress=None,
+                             lineage=None):
+    """
+    Satu langkah evolusi untuk input_env_params. seed (int atau numpy Generator)
+    membuat hasil mutasi bisa direproduksi; None berarti acak.
+    progress(stage, step, total) dipanggil di awal setiap tahap (lihat SIMULATION_STAGES)
+    dan boleh raise untuk membatalkan simulasi.
+    lineage: LineageJournal opsional; cabang baru ditambahkan ke pohon lineage (bukan
+    pohon dasar), tapi baru tercatat setelah lineage.record_result(...) dipanggil.
+    Jika profiler aktif (lihat instrumentation.py), hasil berisi "timings" per tahap.
+    """
+    profiler = get_profiler()
+    timings = {}
+    stage_timer = profiler.stages(timings)
+    try:
+        results = _run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes_data,
+                                            make_rng(seed), _stage_reporter(progress, stage_timer), lineage)
+    finally:
+        stage_timer.close()
+    if profiler.enabled:
+        results["timings"] = timings
+        profiler.record("run_evolution_simulation", timings, status=results.get("status"),
+                        environment=input_env_params)
+    return results
+
+def _run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes_data, rng, report_stage, lineage):
+    report_stage("load_tree")
+    # Pohon dasar dari cache + index nama (dibangun sekali); pohon dasar tidak ikut termutasi
+    base_tree = lineage.indexed if lineage is not None else get_indexed_tree(filo_tree_path)
+    current_tree = clone_tree(base_tree.tree)
     if not current_tree:
         return {"status": "error", "message": f"Failed to load base tree from {filo_tree_path}."}
     if not all_species_genes_data:
          return {"status": "error", "message": "Species gene data not provided or is empty."}
 
   
+    report_stage("match_species")
     matching_species = find_matching_species(input_env_params) # from rule_based.py
     if matching_species:
         
@@ -109,13 +167,18 @@ def run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes
   
     mutated_gene_seq_records = {} 
     new_fasta_strings = {}     
-    for gene_type in targeted_genes:
-        parent_seq_for_mutation = get_average_sequence(all_species_genes_data, gene_type)
+    report_stage("consensus")
+    parent_seqs_for_mutation = {
+        gene_type: get_average_sequence(all_species_genes_data, gene_type) for gene_type in targeted_genes
+    }
+
+    report_stage("mutation")
+    for gene_type, parent_seq_for_mutation in parent_seqs_for_mutation.items():
         if not parent_seq_for_mutation.seq: 
            
             continue
         
-        mutated_record = mutate_sequence(parent_seq_for_mutation) # from mutation.py
+        mutated_record = mutate_sequence(parent_seq_for_mutation, seed=rng) # from mutation.py
         mutated_gene_seq_records[gene_type] = mutated_record
         new_fasta_strings[gene_type] = f">{mutated_record.id}\n{str(mutated_record.seq)}"
        
@@ -132,10 +195,14 @@ def run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes
         }
 
 
+    report_stage("fitness")
     fitness_scores_for_each_mutated_gene = {}
+    fitness_length_mismatches = {} # Spesies yang tidak bisa dibandingkan karena panjang sequence berbeda
     for gene_type, m_seq_rec in mutated_gene_seq_records.items():
-        scores = compute_fitness(m_seq_rec, all_species_genes_data) # from fitness.py
-        fitness_scores_for_each_mutated_gene[gene_type] = scores
+        fitness = fitness_matrix([m_seq_rec], all_species_genes_data, gene_type) # from fitness.py
+        fitness_scores_for_each_mutated_gene[gene_type] = fitness.as_dict()
+        if fitness.length_mismatches:
+            fitness_length_mismatches[gene_type] = fitness.length_mismatches
 
     species_overall_fitness = {}
     for species_name in all_species_genes_data.keys():
@@ -159,20 +226,19 @@ def run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes
        
 
   
-    new_species_name = f"Evolved_{parent_species_for_evolution.replace('Apis_', '')}_{len(current_tree.get_terminals()) + 1}"
+    new_species_name = f"Evolved_{parent_species_for_evolution.replace('Apis_', '')}_{base_tree.n_terminals + 1}"
     
     
 
  
-    if parent_species_for_evolution and not parent_species_for_evolution.lower().startswith("apis_"):
-        
-        species_part = parent_species_for_evolution.lower()
-        parent_species_for_evolution = f"Apis_{species_part}"
-        
-    elif parent_species_for_evolution and parent_species_for_evolution.lower().startswith("apis_"):
-       
-        species_part = parent_species_for_evolution.split('_', 1)[1].lower()
-        parent_species_for_evolution = f"Apis_{species_part}" 
+    # Jarak (Jukes-Cantor) mutant -> induk menjadi panjang cabang spesies baru; locus yang
+    # tidak sejajar memakai jarak k-mer, NEW_BRANCH_LENGTH hanya jika tidak ada jarak sama sekali
+    parent_distance = distances_to_store(all_species_genes_data, mutated_gene_seq_records).get(parent_species_for_evolution)
+    new_branch_length = parent_distance if parent_distance is not None else NEW_BRANCH_LENGTH
+    parent_fitness = species_overall_fitness.get(parent_species_for_evolution)
+
+    if parent_species_for_evolution:
+        parent_species_for_evolution = tree_species_name(parent_species_for_evolution)
 
 
     if parent_species_for_evolution:
@@ -184,8 +250,9 @@ def run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes
 
     
     
+    report_stage("insert_branch")
     try:
-        updated_tree = add_new_branch(current_tree, parent_species_for_evolution, new_species_name, branch_length=0.1) # from tree_utils.py
+        updated_tree = base_tree.with_branch(parent_species_for_evolution, new_species_name, branch_length=new_branch_length) # from tree_utils.py
     except ValueError as e: 
        
         return {
@@ -207,130 +274,141 @@ def run_evolution_simulation(input_env_params, filo_tree_path, all_species_genes
         "new_fasta_sequences": new_fasta_strings,
         "new_species_name": new_species_name,
         "updated_tree_object": updated_tree,
+        "branch_length": new_branch_length,
+        "parent_fitness": parent_fitness,
+        "species_fitness": species_overall_fitness,
+        "fitness_length_mismatches": fitness_length_mismatches,
     }
 
 #Additional Functions
-def hamming_distance(seq1, seq2):
-   
-    if len(seq1) != len(seq2):
-        raise ValueError("Sequences panjang harus sama untuk Hamming distance.")
-    return sum(ch1 != ch2 for ch1, ch2 in zip(seq1, seq2))
-
-def compute_fitness(mutated_seq_record, species_genes):
-   
-    fitness_scores = {}
-    for species, genes in species_genes.items():
-        # genes is dict: gene_type -> SeqRecord
-        try:
-            dist = hamming_distance(str(mutated_seq_record.seq), str(genes[mutated_seq_record.id.split('_')[0]].seq))
-            fitness = 1 - dist / len(mutated_seq_record.seq)
-            fitness_scores[species] = fitness
-        except Exception:
-           
-            continue
-    return fitness_scores
-
-def load_genes():
-   
-    genes = {}
-    for gene_type in GENE_TYPES:
-        folder = os.path.join(FASTA_DIR, gene_type)
-        if not os.path.exists(folder):
-            continue
-        for fasta_file in os.listdir(folder):
-            if not (fasta_file.endswith(".fasta") or fasta_file.endswith(".fna")):
-                continue
-            
-            path = os.path.join(folder, fasta_file)
-            
-            # Misal filename: Apis_mellifera.fasta
-            species_name = fasta_file.replace(".fasta", "").replace(".fna", "")
-            
-            record = SeqIO.read(path, "fasta")
-            
-            if species_name not in genes:
-                genes[species_name] = {}
-            
-            genes[species_name][gene_type] = record
-            
-    return genes
-
-
+def load_genes(use_cache=True):
+    """
+    Baca semua FASTA per gene type (file .fna/.fasta/.fa, boleh .gz dan multi-record,
+    arsip *_datasets.zip, atau locus dari genome di GENE_MANIFEST_FILE) dan kembalikan
+    GeneStore (dict-like {species: {gene_type: SeqRecord}}).
+    use_cache: simpan/muat matriks 2-bit di GENE_CACHE_DIR (lihat gen_loader.py).
+    """
+    # Simpan sebagai matriks 2-bit per gen, akses genes[species][gene_type] tetap sama
+    return load_gene_store(FASTA_DIR, GENE_TYPES, GENE_CACHE_DIR if use_cache else None, GENE_MANIFEST_FILE)
+
+
+
+def get_thresholds():
+    global _thresholds
+    if _thresholds is None:
+        with open(THRESHOLD_FILE, "r") as f:
+            _thresholds = json.load(f)
+    return _thresholds
+
+def __getattr__(name):
+    # simulation.thresholds tetap bisa dipakai, tapi file baru dibaca saat diakses
+    if name == "thresholds":
+        return get_thresholds()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_threshold_index():
+    # threshold.json dikompilasi sekali menjadi array batas (lihat rule_based.py)
+    global _threshold_index
+    if _threshold_index is None:
+        _threshold_index = ThresholdIndex(get_thresholds())
+    return _threshold_index
 
 def find_matching_species(input_env):
-   
-    for species, thr in thresholds.items():
-        temp_ok = thr["temperature"][0] <= input_env["temperature"] <= thr["temperature"][1]
-        hum_ok = thr["humidity"][0] <= input_env["humidity"] <= thr["humidity"][1]
-        flow_ok = thr["flowers"][0] <= input_env["flowers"] <= thr["flowers"][1]
-        if temp_ok and hum_ok and flow_ok:
-            return species
-    return None
+    """Spesies pertama di threshold.json yang semua parameternya cocok, atau None."""
+    return get_threshold_index().matching_species(input_env)[0]
 
 def get_mutation_targets(input_env):
-   
-    # Cari species yang paling "dekat" dengan input_env, hitung berapa parameter yang cocok
-    best_species = None
-    best_score = -1  # jumlah parameter cocok maksimal adalah 3
-
-    for species, thr in thresholds.items():
-        score = 0
-        if thr["temperature"][0] <= input_env["temperature"] <= thr["temperature"][1]:
-            score += 1
-        if thr["humidity"][0] <= input_env["humidity"] <= thr["humidity"][1]:
-            score += 1
-        if thr["flowers"][0] <= input_env["flowers"] <= thr["flowers"][1]:
-            score += 1
-
-        if score > best_score:
-            best_score = score
-            best_species = species
-
-    targets = []
-
-   
-    if best_species is not None:
-        thr = thresholds[best_species]
-        if not (thr["temperature"][0] <= input_env["temperature"] <= thr["temperature"][1]):
-            targets.append("Hsp90")
-        if not (thr["humidity"][0] <= input_env["humidity"] <= thr["humidity"][1]):
-            targets.append("AQP")
-        if not (thr["flowers"][0] <= input_env["flowers"] <= thr["flowers"][1]):
-            targets.append("OR")
-
-    return targets
-
-def mutate_sequence(seq_record, mutation_rate=0.05):
-   
-    bases = ["A", "T", "C", "G"]
-    seq_str = str(seq_record.seq)
-    seq_list = list(seq_str)
-    n_mutations = max(1, int(len(seq_list) * mutation_rate))
-
-    for _ in range(n_mutations):
-        idx = random.randint(0, len(seq_list) - 1)
-        current_base = seq_list[idx]
-        possible_bases = [b for b in bases if b != current_base]
-        seq_list[idx] = random.choice(possible_bases)
-
-    mutated_seq = "".join(seq_list)
-    mutated_record = SeqRecord(Seq(mutated_seq), id=seq_record.id + "_mutated", description="Mutated sequence")
-    return mutated_record
+    """
+    Cari species yang paling "dekat" dengan input_env (parameter cocok terbanyak),
+    lalu gen untuk parameter yang masih di luar rentangnya menjadi target mutasi.
+    """
+    if not get_thresholds():
+        return []
+    return get_threshold_index().mutation_targets(input_env, GENE_PARAMETERS)[0]
+
+STARTUP_STAGES = ["load_genes", "load_lineage"]
+
+def load_startup_data(tree_path=TREE_FILE, progress=None):
+    """
+    Data awal dashboard (gen spesies + lineage), untuk dijalankan di background
+    saat UI sudah tampil. progress(stage, step, total) seperti run_evolution_simulation.
+    Return (genes, lineage, errors); bagian yang gagal bernilai None.
+    """
+    results, errors = {}, {}
+    loaders = {"load_genes": load_genes, "load_lineage": lambda: get_lineage(tree_path)}
+    for step, stage in enumerate(STARTUP_STAGES, 1):
+        if progress is not None:
+            progress(stage, step, len(STARTUP_STAGES))
+        try:
+            results[stage] = loaders[stage]()
+        except Exception as e:
+            errors[stage] = e
+    return results.get("load_genes"), results.get("load_lineage"), errors
+
+def get_lineage(tree_path=TREE_FILE):
+    # Journal lineage dibuka (dan diputar ulang) sekali per proses
+    global _lineage
+    if _lineage is None:
+        _lineage = LineageJournal(LINEAGE_JOURNAL_FILE, tree_path)
+    return _lineage
+
+def tree_species_name(species_name):
+    # Nama spesies di data gen (mis. "Cerana") -> nama di pohon ("Apis_cerana")
+    if species_name.lower().startswith("apis_"):
+        return f"Apis_{species_name.split('_', 1)[1].lower()}"
+    return f"Apis_{species_name.lower()}"
+
+def build_distance_tree(all_species_genes_data, lineage=None, method=DISTANCE_TREE_METHOD):
+    """
+    Pohon hasil rekonstruksi (NJ/UPGMA) dari jarak genetik semua spesies, termasuk
+    spesies hasil evolusi di lineage. Matriks dasar di-cache; spesies lineage
+    ditambahkan satu per satu (satu baris baru per spesies). Locus yang tidak sejajar
+    memakai jarak k-mer (lihat distance.kmer_p_distance); ValueError jika tetap ada
+    pasangan spesies tanpa jarak yang bisa dipakai, karena pohonnya tidak bermakna.
+    """
+    global _lineage_distances
+    base = get_distance_matrix(all_species_genes_data)
+    evolved = lineage.sequences if lineage is not None else {}
+    if _lineage_distances is None or _lineage_distances[0] is not base or \
+            any(name not in evolved for name in _lineage_distances[1].species[len(base):]):
+        _lineage_distances = (base, base.copy(reserve=len(evolved) + 1))  # Lineage direset: mulai lagi dari matriks dasar
+    matrix = _lineage_distances[1]
+    for name, sequences in evolved.items():
+        if sequences and name not in matrix:
+            matrix.add(name, sequences)
+    if not matrix.is_complete():
+        raise ValueError("Genetic distances are not comparable for every species pair.")
+    names = [tree_species_name(name) for name in base.species] + matrix.species[len(base):]
+    return matrix.to_tree(method, names)
+
+def get_ai_service():
+    # Satu ExplanationService per proses (backend/model dipakai ulang antar request)
+    global _ai_service
+    if _ai_service is None:
+        # ai_service (asyncio, urllib) baru diimpor saat AI pertama kali dibutuhkan
+        try:
+            from .ai_service import create_default_service
+        except ImportError:
+            from ai_service import create_default_service
+        _ai_service = create_default_service(api_key_variable)
+        if _ai_service is not None:
+            try:
+                _ai_service.cache = ExplanationCache(AI_CACHE_FILE)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[simulation] AI explanation cache disabled: {e}")
+    return _ai_service
+
+def get_explanation_cache_key(prompt_data, received_params):
+    return explanation_cache_key(prompt_data, received_params, AI_CACHE_ENV_BUCKETS)
 
 def get_evolution_explanation_from_ai(prompt_data):
-    if not api_key_variable:
+    ai_service = get_ai_service()
+    if ai_service is None:
         return "AI service not configured: API key missing."
 
   
     prompt = prompt_data
-    
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash-preview-05-20') # Or the specific model you intend to use
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-     
-        return f"Error getting explanation from AI: {e}"
+    return ai_service.explain_blocking(prompt)
     
 
 def generate_ai_prompt(prompt_data, received_params):
@@ -0,0 +1,105 @@
+"""
+Benchmark cold start: import main_app di interpreter baru, dan (jika ada display)
+App() sampai window pertama tergambar serta sampai data background selesai dimuat.
+Gagal (exit code 1) jika median melewati budget atau modul berat ikut terimpor saat start.
+
+    python startup_benchmark.py
+    python startup_benchmark.py --repeat 10 --import-budget-ms 400 --paint-budget-ms 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+IMPORT_BUDGET_MS = 450
+FIRST_PAINT_BUDGET_MS = 2500
+# Modul yang tidak boleh terimpor sebelum benar-benar dipakai
+LAZY_MODULES = ["matplotlib", "google.generativeai", "Bio.SeqIO", "asyncio"]
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main_app
+elapsed = time.perf_counter() - start
+print(json.dumps({"import_ms": elapsed * 1000, "eager": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+_PAINT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import main_app
+app = main_app.App()
+app.update()
+first_paint = time.perf_counter() - start
+deadline = time.perf_counter() + 60
+while not app.data_loaded and time.perf_counter() < deadline:
+    app.update()
+    time.sleep(0.005)
+data_ready = time.perf_counter() - start
+app.simulation_executor.shutdown()
+app.loading_executor.shutdown()
+app.destroy()
+print(json.dumps({"first_paint_ms": first_paint * 1000, "data_ready_ms": data_ready * 1000}))
+"""
+
+
+def _run(script):
+    completed = subprocess.run([sys.executable, "-c", script], cwd=APP_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def has_display():
+    return sys.platform in ("win32", "darwin") or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+def measure_startup(repeat=5, paint=True):
+    """Median (ms) dari `repeat` cold start, masing-masing di proses Python baru."""
+    runs = [_run(_IMPORT_SCRIPT) for _ in range(repeat)]
+    result = {
+        "import_ms": statistics.median(r["import_ms"] for r in runs),
+        "eager_modules": sorted({m for r in runs for m in r["eager"]}),
+    }
+    if paint and has_display():
+        paint_runs = [_run(_PAINT_SCRIPT) for _ in range(repeat)]
+        result["first_paint_ms"] = statistics.median(r["first_paint_ms"] for r in paint_runs)
+        result["data_ready_ms"] = statistics.median(r["data_ready_ms"] for r in paint_runs)
+    return result
+
+def check_budget(result, import_budget_ms=IMPORT_BUDGET_MS, paint_budget_ms=FIRST_PAINT_BUDGET_MS):
+    """List pelanggaran budget (kosong = lolos)."""
+    failures = []
+    if result["import_ms"] > import_budget_ms:
+        failures.append(f"import main_app {result['import_ms']:.0f} ms > budget {import_budget_ms} ms")
+    if result["eager_modules"]:
+        failures.append(f"modules imported at startup: {', '.join(result['eager_modules'])}")
+    if "first_paint_ms" in result and result["first_paint_ms"] > paint_budget_ms:
+        failures.append(f"first paint {result['first_paint_ms']:.0f} ms > budget {paint_budget_ms} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoBEE startup-time budget")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--paint-budget-ms", type=float, default=FIRST_PAINT_BUDGET_MS)
+    parser.add_argument("--no-paint", action="store_true", help="Lewati pengukuran window (mis. tanpa display)")
+    args = parser.parse_args(argv)
+
+    result = measure_startup(args.repeat, paint=not args.no_paint)
+    print(json.dumps(result, indent=2))
+    if not args.no_paint and "first_paint_ms" not in result:
+        print("[startup_benchmark] No display available, first paint not measured.", file=sys.stderr)
+
+    failures = check_budget(result, args.import_budget_ms, args.paint_budget_ms)
+    for failure in failures:
+        print(f"[startup_benchmark] FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Generator dataset sintetis untuk load-test, dengan layout yang sama seperti data/:
+
+    <root>/gen_fasta/<gen>/<Spesies>.fna
+    <root>/threshold.json
+    <root>/BEE_prunedtree_APIS.nwk      (beberapa pohon, satu per baris)
+    <root>/gene_manifest.json           (katalog gen -> parameter lingkungan)
+
+Sequence dan rentang threshold diturunkan sepanjang pohon pertama (substitusi dan
+random walk sebanding panjang cabang), jadi spesies yang berdekatan di pohon juga
+mirip secara genetik dan ekologis. Pohon berikutnya adalah variasi pohon pertama
+(sebagian split dan panjang cabang diacak ulang). Semua ditulis sambil berjalan:
+memori hanya sebesar jalur root -> daun saat ini, bukan seluruh dataset.
+
+    python synthetic_data.py data_100k --species 100000 --trees 20
+    python synthetic_data.py data_small --species 200 --fasta-species 50 --locus-length Hsp90=2000,AQP=800,OR=1200
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+try:
+    from .simulation import DEFAULT_GENE_PARAMETERS
+except ImportError:
+    from simulation import DEFAULT_GENE_PARAMETERS
+
+
+TREE_FILE_NAME = "BEE_prunedtree_APIS.nwk"
+THRESHOLD_FILE_NAME = "threshold.json"
+GENE_MANIFEST_NAME = "gene_manifest.json"
+DEFAULT_LOCUS_LENGTH = 3000
+DEFAULT_SUBSTITUTION_RATE = 0.05  # Peluang substitusi per situs per satuan panjang cabang
+DEFAULT_BRANCH_LENGTHS = (0.05, 1.0)
+# Domain tiap parameter lingkungan; lebar rentang threshold = trait_width * lebar domain
+DEFAULT_TRAIT_RANGES = {"temperature": (0.0, 50.0), "humidity": (10.0, 100.0), "flowers": (50.0, 2000.0)}
+DEFAULT_TRAIT_WIDTH = 0.35
+DEFAULT_TRAIT_DRIFT = 0.1  # Simpangan random walk per sqrt(panjang cabang), relatif terhadap domain
+DEFAULT_TOPOLOGY_NOISE = 0.05  # Peluang sebuah split diacak ulang di pohon ke-2 dst.
+DEFAULT_BRANCH_NOISE = 0.2
+
+_BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(*values):
+    # Hash integer deterministik (splitmix64): split dan panjang cabang tiap node hanya
+    # bergantung pada (seed, interval daun), sehingga semua pohon bisa ditulis secara streaming
+    h = 0x9E3779B97F4A7C15
+    for value in values:
+        h = (h ^ (value & _MASK64)) * 0xBF58476D1CE4E5B9 & _MASK64
+        h = (h ^ (h >> 27)) * 0x94D049BB133111EB & _MASK64
+        h ^= h >> 31
+    return h
+
+def _unit(*values):
+    return _mix(*values) / 2.0 ** 64
+
+
+def species_name(index):
+    return f"Apis_sp{index}"
+
+
+def iter_topology(n_species, seed=0, tree_index=0, topology_noise=DEFAULT_TOPOLOGY_NOISE,
+                  branch_lengths=DEFAULT_BRANCH_LENGTHS, branch_noise=DEFAULT_BRANCH_NOISE):
+    """
+    Event DFS ("enter"/"exit", lo, hi, branch_length) untuk pohon biner acak atas daun
+    0..n_species-1. Node = interval daun [lo, hi); daun menghasilkan "enter" saja.
+    Root memiliki branch_length None. Split dipilih uniform, jadi kedalaman ~O(log n).
+    """
+    low, high = branch_lengths
+    stack = [(0, n_species, None)]
+    while stack:
+        lo, hi, branch_length = stack.pop()
+        if lo < 0:
+            yield "exit", -lo - 1, hi, branch_length
+            continue
+        yield "enter", lo, hi, branch_length
+        if hi - lo == 1:
+            continue
+        split = _mix(seed, lo, hi, 0)
+        if tree_index and _unit(seed, lo, hi, tree_index, 1) < topology_noise:
+            split = _mix(seed, lo, hi, tree_index, 2)
+        mid = lo + 1 + split % (hi - lo - 1)
+        stack.append((-lo - 1, hi, branch_length))
+        for child_lo, child_hi in ((mid, hi), (lo, mid)):
+            child_length = low + (high - low) * _unit(seed, child_lo, child_hi, 3)
+            if tree_index:
+                child_length *= 1.0 + branch_noise * (2.0 * _unit(seed, child_lo, child_hi, tree_index, 4) - 1.0)
+            stack.append((child_lo, child_hi, child_length))
+
+
+def write_newick(f, events):
+    """Tulis event iter_topology sebagai satu record Newick (diakhiri ';')."""
+    need_comma = False
+    for kind, lo, hi, branch_length in events:
+        length = "" if branch_length is None else f":{branch_length:.5f}"
+        if kind == "enter":
+            if need_comma:
+                f.write(",")
+            if hi - lo == 1:
+                f.write(species_name(lo) + length)
+                need_comma = True
+            else:
+                f.write("(")
+                need_comma = False
+        else:
+            f.write(")" + length)
+            need_comma = True
+    f.write(";\n")
+
+
+def _parse_locus_lengths(locus_length, gene_types):
+    if isinstance(locus_length, dict):
+        return {gene_type: int(locus_length.get(gene_type, DEFAULT_LOCUS_LENGTH)) for gene_type in gene_types}
+    return {gene_type: int(locus_length) for gene_type in gene_types}
+
+def _has_fasta(index, n_species, n_fasta):
+    # n_fasta spesies tersebar merata di sepanjang urutan daun
+    return (index + 1) * n_fasta // n_species != index * n_fasta // n_species
+
+
+def generate_dataset(root, n_species, n_trees=1, n_fasta=None, locus_length=DEFAULT_LOCUS_LENGTH, seed=0,
+                     gene_types=None, trait_ranges=None, trait_width=DEFAULT_TRAIT_WIDTH,
+                     trait_drift=DEFAULT_TRAIT_DRIFT, substitution_rate=DEFAULT_SUBSTITUTION_RATE,
+                     branch_lengths=DEFAULT_BRANCH_LENGTHS, topology_noise=DEFAULT_TOPOLOGY_NOISE,
+                     branch_noise=DEFAULT_BRANCH_NOISE):
+    """
+    Tulis dataset sintetis ke root. Semua n_species muncul di pohon dan threshold.json;
+    n_fasta di antaranya (default semua) mendapat file FASTA per gen. locus_length
+    berupa int atau dict {gen: panjang}. Return dict path dan jumlah yang ditulis.
+    """
+    if n_species < 2:
+        raise ValueError("n_species must be at least 2.")
+    gene_types = list(gene_types or DEFAULT_GENE_PARAMETERS)
+    n_fasta = n_species if n_fasta is None else min(n_fasta, n_species)
+    lengths = _parse_locus_lengths(locus_length, gene_types)
+    trait_ranges = trait_ranges or {parameter: DEFAULT_TRAIT_RANGES[parameter]
+                                    for parameter in dict.fromkeys(DEFAULT_GENE_PARAMETERS.values())}
+    traits = list(trait_ranges)
+    trait_low = np.array([trait_ranges[t][0] for t in traits], dtype=float)
+    trait_high = np.array([trait_ranges[t][1] for t in traits], dtype=float)
+    trait_span = trait_high - trait_low
+
+    fasta_dir = os.path.join(root, "gen_fasta")
+    for gene_type in gene_types:
+        os.makedirs(os.path.join(fasta_dir, gene_type), exist_ok=True)
+    tree_path = os.path.join(root, TREE_FILE_NAME)
+    threshold_path = os.path.join(root, THRESHOLD_FILE_NAME)
+    manifest_path = os.path.join(root, GENE_MANIFEST_NAME)
+    with open(manifest_path, "w") as f:
+        json.dump({"genes": {gene_type: {"parameter": DEFAULT_GENE_PARAMETERS.get(gene_type)}
+                             for gene_type in gene_types}, "genomes": []}, f, indent=2)
+
+    rng = np.random.default_rng(seed)
+    root_state = (
+        {gene_type: rng.integers(0, 4, size=length, dtype=np.uint8) for gene_type, length in lengths.items()},
+        trait_low + trait_span * rng.random(len(traits)),
+    )
+
+    def evolve(state, branch_length):
+        codes, trait_values = state
+        p = min(1.0, substitution_rate * branch_length)
+        child_codes = {}
+        for gene_type, parent_codes in codes.items():
+            child = parent_codes.copy()
+            n_sites = rng.binomial(len(child), p)
+            child[rng.integers(0, len(child), size=n_sites)] = rng.integers(0, 4, size=n_sites, dtype=np.uint8)
+            child_codes[gene_type] = child
+        drift = rng.normal(0.0, trait_drift * math.sqrt(branch_length), size=len(traits)) * trait_span
+        return child_codes, np.clip(trait_values + drift, trait_low, trait_high)
+
+    def write_species(index, state, thresholds_file, first):
+        name = species_name(index)
+        codes, centre = state
+        half = trait_width * trait_span / 2.0
+        ranges = {t: [round(float(max(lo, c - h))), round(float(min(hi, c + h)))]
+                  for t, c, h, lo, hi in zip(traits, centre, half, trait_low, trait_high)}
+        thresholds_file.write(("" if first else ",\n") + f"  {json.dumps(name)}: {json.dumps(ranges)}")
+        if not _has_fasta(index, n_species, n_fasta):
+            return False
+        for gene_type, gene_codes in codes.items():
+            with open(os.path.join(fasta_dir, gene_type, f"{name}.fna"), "w") as f:
+                f.write(f">{name}_{gene_type} {gene_type} [organism={name}]\n")
+                f.write(_BASES[gene_codes].tobytes().decode("ascii") + "\n")
+        return True
+
+    n_written = 0
+    with open(tree_path, "w") as tree_file, open(threshold_path, "w") as thresholds_file:
+        thresholds_file.write("{\n")
+        path = []  # State (sequence + trait) dari root sampai node saat ini
+
+        def simulate(events):
+            nonlocal n_written
+            for kind, lo, hi, branch_length in events:
+                if kind == "enter":
+                    state = root_state if branch_length is None else evolve(path[-1], branch_length)
+                    if hi - lo == 1:
+                        n_written += write_species(lo, state, thresholds_file, lo == 0)
+                    else:
+                        path.append(state)
+                else:
+                    path.pop()
+                yield kind, lo, hi, branch_length
+
+        topology = dict(seed=seed, topology_noise=topology_noise,
+                        branch_lengths=branch_lengths, branch_noise=branch_noise)
+        write_newick(tree_file, simulate(iter_topology(n_species, tree_index=0, **topology)))
+        for tree_index in range(1, n_trees):
+            write_newick(tree_file, iter_topology(n_species, tree_index=tree_index, **topology))
+        thresholds_file.write("\n}\n")
+
+    return {
+        "root": root, "fasta_dir": fasta_dir, "tree_path": tree_path, "threshold_path": threshold_path,
+        "manifest_path": manifest_path,
+        "n_species": n_species, "n_fasta": n_written, "n_trees": n_trees, "locus_lengths": lengths,
+    }
+
+
+def _parse_locus_argument(text):
+    if "=" not in text:
+        return int(text)
+    return {gene_type.strip(): int(length) for gene_type, length in
+            (item.split("=", 1) for item in text.split(",") if item.strip())}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic EcoBEE dataset")
+    parser.add_argument("root", help="Folder tujuan (layout sama seperti data/)")
+    parser.add_argument("--species", type=int, default=1000)
+    parser.add_argument("--fasta-species", type=int, help="Jumlah spesies yang punya FASTA (default semua)")
+    parser.add_argument("--trees", type=int, default=1)
+    parser.add_argument("--locus-length", type=_parse_locus_argument, default=DEFAULT_LOCUS_LENGTH,
+                        help="Panjang tiap gen, atau per gen: Hsp90=2000,AQP=800,OR=1200")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--substitution-rate", type=float, default=DEFAULT_SUBSTITUTION_RATE)
+    parser.add_argument("--topology-noise", type=float, default=DEFAULT_TOPOLOGY_NOISE)
+    args = parser.parse_args(argv)
+
+    summary = generate_dataset(args.root, args.species, n_trees=args.trees, n_fasta=args.fasta_species,
+                               locus_length=args.locus_length, seed=args.seed,
+                               substitution_rate=args.substitution_rate, topology_noise=args.topology_noise)
+    print(json.dumps(summary, indent=2))
+    print(f"[synthetic_data] Use it with ECOBEE_DATA_DIR={os.path.abspath(args.root)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import math
+import time
+
+import matplotlib
+import numpy as np
+from matplotlib.collections import LineCollection
+
+try:
+    from .phylogenetic import compute_tree_layout
+except ImportError:
+    from phylogenetic import compute_tree_layout
+
+
+LABEL_COLOR = "black"
+HIGHLIGHT_COLOR = "red"
+LABEL_SPACING = 1.2  # Jarak minimum antar label, dalam kelipatan tinggi font
+
+
+def style_tree_axes(ax):
+    ax.set_xlabel("")
+    ax.set_ylabel("")
+    ax.set_xticks([])
+    ax.set_yticks([])
+    for side in ("top", "right", "bottom", "left"):
+        ax.spines[side].set_visible(False)
+
+def find_clade_index(layout, name):
+    for i, clade in enumerate(layout.clades):
+        if clade.name == name:
+            return i
+    return None
+
+def mrca_index(layout, indices):
+    """Index common ancestor terdekat dari clade-clade di indices (preorder: ancestor selalu < index)."""
+    indices = list(indices)
+    if not indices:
+        return None
+    ancestors = set()
+    i = indices[0]
+    while i >= 0:
+        ancestors.add(i)
+        i = layout.parents[i]
+    mrca = indices[0]
+    for i in indices[1:]:
+        while i not in ancestors:
+            i = layout.parents[i]
+        mrca = min(mrca, i)  # Ancestor yang lebih tinggi punya index lebih kecil
+    return mrca
+
+def resolve_clade_index(layout, clade):
+    """
+    Index clade untuk zoom: nama clade, objek Clade, atau kumpulan nama tip (di-zoom ke
+    MRCA-nya; node internal di Newick umumnya tidak bernama). None jika tidak ditemukan.
+    """
+    if clade is None:
+        return None
+    if isinstance(clade, str):
+        return find_clade_index(layout, clade)
+    if hasattr(clade, "clades"):
+        return next((i for i, c in enumerate(layout.clades) if c is clade), None)
+    names = set(clade)
+    indices = [i for i, c in enumerate(layout.clades) if c.name in names and not c.clades]
+    if {layout.clades[i].name for i in indices} != names:
+        return None  # Ada nama tip yang tidak ada di pohon
+    return mrca_index(layout, indices)
+
+def subtree_slice(layout, index):
+    # Preorder: subtree clade `index` adalah potongan kontigu [index, index + ukuran subtree)
+    return slice(index, index + int(layout.subtree_sizes[index]))
+
+def clade_limits(layout, index=None):
+    """(xlim, ylim) untuk seluruh pohon atau subtree clade `index`, dengan margin seperti Phylo.draw."""
+    if index is None:
+        x_min, x_max, y_min, y_max = 0.0, float(layout.x.max()), 1.0, float(layout.y.max())
+    else:
+        part = subtree_slice(layout, index)
+        x_min, x_max = float(layout.x[part].min()), float(layout.x[part].max())
+        y_min, y_max = float(layout.y[part].min()), float(layout.y[part].max())
+    width = (x_max - x_min) or 1.0
+    return (x_min - 0.05 * width, x_max + 0.25 * width), (y_max + 0.8, y_min - 0.8)
+
+def label_indices(layout, ax, highlight_index=None, fontsize=None):
+    """
+    Index clade yang labelnya digambar: hanya yang ada di rentang y terlihat, dan
+    label yang akan bertumpuk (jarak < tinggi font) dibuang. Highlight selalu tampil.
+    """
+    fontsize = fontsize or matplotlib.rcParams["font.size"]
+    y_bottom, y_top = ax.get_ylim()
+    y_low, y_high = min(y_bottom, y_top), max(y_bottom, y_top)
+    height_px = max(ax.get_window_extent().height, 1.0)
+    font_px = fontsize * ax.figure.dpi / 72.0
+    min_gap = LABEL_SPACING * font_px * (y_high - y_low) / height_px  # dalam satuan data
+
+    named = np.array([bool(c.name) for c in layout.clades])
+    visible = np.flatnonzero(named & (layout.y >= y_low) & (layout.y <= y_high))
+    if min_gap <= 1.0 and len(visible) <= height_px:
+        return list(visible)  # Semua label muat (satu baris per tip)
+
+    order = visible[np.argsort(layout.y[visible], kind="stable")]
+    chosen = []
+    blocked_y = layout.y[highlight_index] if highlight_index is not None else None
+    last_y = -math.inf
+    for i in order:
+        y = layout.y[i]
+        if y - last_y < min_gap:
+            continue
+        if blocked_y is not None and abs(y - blocked_y) < min_gap and i != highlight_index:
+            continue
+        chosen.append(i)
+        last_y = y
+    if highlight_index is not None and highlight_index not in chosen and named[highlight_index]:
+        chosen.append(highlight_index)
+    return chosen
+
+def draw_labels(ax, layout, indices, highlight_index=None, fontsize=None, animated=False):
+    texts = {}
+    for i in indices:
+        name = layout.clades[i].name
+        texts[name] = ax.text(layout.x[i], layout.y[i], f" {name}", va="center", fontsize=fontsize,
+                              color=HIGHLIGHT_COLOR if i == highlight_index else LABEL_COLOR,
+                              animated=animated)
+    return texts
+
+def render_tree(ax, tree=None, highlight_species_name=None, zoom_clade=None, highlight_path=False,
+                fontsize=None, layout=None):
+    """
+    Gambar pohon di ax: semua cabang dalam satu LineCollection (+ satu lagi untuk
+    jalur root -> highlight jika highlight_path), label di-cull sesuai ruang.
+    zoom_clade: clade yang di-zoom (lihat resolve_clade_index). Return layout yang dipakai.
+    """
+    layout = layout or compute_tree_layout(tree)
+    highlight_index = find_clade_index(layout, highlight_species_name) if highlight_species_name else None
+    zoom_index = resolve_clade_index(layout, zoom_clade)
+
+    ax.clear()
+    segments = layout.segments()
+    linewidth = matplotlib.rcParams["lines.linewidth"]
+    ax.add_collection(LineCollection(segments, colors=LABEL_COLOR, linewidths=linewidth))
+    if highlight_path and highlight_index is not None:
+        path = []
+        i = highlight_index
+        while i >= 0:
+            path.append(i)  # Segmen horizontal clade i ada di index i
+            i = layout.parents[i]
+        ax.add_collection(LineCollection(segments[path], colors=HIGHLIGHT_COLOR, linewidths=linewidth * 1.5))
+
+    xlim, ylim = clade_limits(layout, zoom_index)
+    ax.set_xlim(*xlim)
+    ax.set_ylim(*ylim)
+    draw_labels(ax, layout, label_indices(layout, ax, highlight_index, fontsize), highlight_index, fontsize)
+    style_tree_axes(ax)
+    return layout
+
+def zoom_to_clade(ax, tree, clade, highlight_species_name=None, layout=None):
+    return render_tree(ax, tree, highlight_species_name, zoom_clade=clade, layout=layout)
+
+
+def random_tree(n_tips, seed=None):
+    """Pohon acak (bercabang dua) dengan n_tips daun, untuk benchmark renderer."""
+    from Bio.Phylo.Newick import Clade, Tree
+
+    rng = np.random.default_rng(seed)
+    nodes = [Clade(name=f"Tip_{i}", branch_length=float(rng.exponential(1.0))) for i in range(n_tips)]
+    while len(nodes) > 1:
+        # Gabungkan dua node acak sampai tersisa root
+        i, j = sorted(rng.choice(len(nodes), size=2, replace=False))
+        right, left = nodes.pop(j), nodes.pop(i)
+        nodes.append(Clade(branch_length=float(rng.exponential(1.0)), clades=[left, right]))
+    nodes[0].branch_length = 0.0
+    return Tree(root=nodes[0], rooted=True)
+
+def benchmark_render(n_tips=10000, seed=0, repeat=3):
+    """Waktu (detik) layout dan render penuh di backend Agg untuk pohon acak n_tips."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    tree = random_tree(n_tips, seed)
+    figure = Figure(figsize=(6, 8), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    name = tree.root.clades[0].name or tree.get_terminals()[0].name
+
+    timings = {"layout": [], "render": [], "highlight": []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        layout = compute_tree_layout(tree)
+        timings["layout"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        render_tree(ax, layout=layout)
+        canvas.draw()
+        timings["render"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        render_tree(ax, layout=layout, highlight_species_name=name, highlight_path=True)
+        canvas.draw()
+        timings["highlight"].append(time.perf_counter() - start)
+    return {stage: min(values) for stage, values in timings.items()}
+
+
+if __name__ == "__main__":
+    import sys
+    for n in [int(v) for v in sys.argv[1:]] or [100, 1000, 10000]:
+        print(n, benchmark_render(n))
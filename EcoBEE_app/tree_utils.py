@@ -0,0 +1,197 @@
+import copy
+import os
+
+from Bio.Phylo.Newick import Clade
+
+try:
+    from .phylogenetic import add_branch_at_path, get_cached_tree
+except ImportError:
+    from phylogenetic import add_branch_at_path, get_cached_tree
+
+
+_indexed_base_trees = {}  # (abs path, tree_index) -> IndexedTree read-only dari pohon di cache
+
+
+class IndexedTree:
+    """
+    Pohon Bio.Phylo dengan index nama -> clade, peta parent, dan jumlah terminal/clade
+    yang diperbarui setiap cabang ditambah atau dihapus, jadi lookup dan langkah
+    evolusi tidak perlu menelusuri seluruh pohon.
+
+    copy=True (default): clade disalin saat membangun index sehingga add_branch dan
+    remove_branch boleh mengubah pohon di tempat tanpa mengganggu pohon asal.
+    copy=False: pohon asal dipakai langsung dan hanya boleh dibaca; gunakan
+    with_branch (copy-on-write) untuk membuat versi baru. read_only=False hanya untuk
+    pohon yang tidak dibagi dengan siapa pun (mis. baru di-parse).
+    """
+
+    def __init__(self, tree, copy=True, read_only=None):
+        self.read_only = (not copy) if read_only is None else read_only
+        self.tree = _copy_structure(tree) if copy else tree
+        self.by_name = {}  # nama -> clade (kemunculan pertama secara preorder)
+        self.parents = {}  # id(clade) -> clade parent
+        self.n_clades = 0
+        self.n_terminals = 0
+        stack = [self.tree.root]
+        while stack:
+            clade = stack.pop()
+            self.n_clades += 1
+            if not clade.clades:
+                self.n_terminals += 1
+            if clade.name:
+                self.by_name.setdefault(clade.name, clade)
+            for child in reversed(clade.clades):
+                self.parents[id(child)] = clade
+                stack.append(child)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def __len__(self):
+        return self.n_clades
+
+    def find(self, name):
+        return self.by_name.get(name)
+
+    def parent_of(self, clade):
+        return self.parents.get(id(clade))
+
+    def path_to(self, name):
+        """Jalur root -> clade bernama `name` (O(kedalaman)), None jika tidak ada."""
+        clade = self.by_name.get(name)
+        if clade is None:
+            return None
+        path = [clade]
+        while id(path[-1]) in self.parents:
+            path.append(self.parents[id(path[-1])])
+        path.reverse()
+        return path
+
+    def with_branch(self, parent_species_name, new_species_name, branch_length=1.0):
+        """
+        Seperti phylogenetic.add_new_branch pada clone pohon ini: return pohon baru
+        (copy-on-write), pohon dan index ini tidak berubah.
+        """
+        path = self.path_to(parent_species_name)
+        if path is None:
+            raise ValueError(f"Parent species {parent_species_name} not found in tree.")
+        return add_branch_at_path(copy.copy(self.tree), path, new_species_name, branch_length)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("IndexedTree is read-only (copy=False); use with_branch instead.")
+
+    def _register(self, clade, parent):
+        self.parents[id(clade)] = parent
+        if clade.name:
+            self.by_name.setdefault(clade.name, clade)
+
+    def add_branch(self, parent_species_name, new_species_name, branch_length=1.0):
+        """
+        Tambah cabang di tempat dengan aturan yang sama seperti add_new_branch:
+        parent terminal menjadi node internal dengan dua anak (spesies lama dan baru).
+        Return clade baru.
+        """
+        self._check_writable()
+        clade = self.by_name.get(parent_species_name)
+        if clade is None:
+            raise ValueError(f"Parent species {parent_species_name} not found in tree.")
+
+        new_clade = Clade(name=new_species_name, branch_length=branch_length)
+        if not clade.clades:
+            old_tip = Clade(name=clade.name, branch_length=branch_length)
+            if old_tip.name and self.by_name.get(old_tip.name) is clade:
+                self.by_name[old_tip.name] = old_tip
+            clade.name = None
+            clade.clades = [old_tip, new_clade]
+            self._register(old_tip, clade)
+            self.n_clades += 1
+        else:
+            clade.clades.append(new_clade)
+        self._register(new_clade, clade)
+        self.n_clades += 1
+        self.n_terminals += 1
+        return new_clade
+
+    def remove_branch(self, species_name):
+        """
+        Hapus terminal species_name. Node internal tanpa nama yang tinggal punya satu
+        anak digabung dengan anak itu (kebalikan dari add_branch pada parent terminal).
+        """
+        self._check_writable()
+        clade = self.by_name.get(species_name)
+        if clade is None:
+            raise ValueError(f"Species {species_name} not found in tree.")
+        if clade.clades:
+            raise ValueError(f"Species {species_name} is not a terminal node.")
+        parent = self.parents.get(id(clade))
+        if parent is None:
+            raise ValueError("Cannot remove the root of the tree.")
+
+        parent.clades = [child for child in parent.clades if child is not clade]
+        del self.by_name[species_name]
+        del self.parents[id(clade)]
+        self.n_clades -= 1
+        self.n_terminals -= 1
+
+        if not parent.clades:
+            self.n_terminals += 1  # Parent sekarang daun
+        elif len(parent.clades) == 1 and parent.name is None:
+            child = parent.clades[0]
+            parent.name = child.name
+            parent.clades = child.clades
+            for grandchild in parent.clades:
+                self.parents[id(grandchild)] = parent
+            del self.parents[id(child)]
+            if child.name and self.by_name.get(child.name) is child:
+                self.by_name[child.name] = parent
+            self.n_clades -= 1
+
+    def check_invariants(self):
+        """Telusuri ulang seluruh pohon dan cocokkan dengan index; raise AssertionError jika tidak konsisten."""
+        n_clades = n_terminals = 0
+        seen_parents = {}
+        first_by_name = {}
+        stack = [self.tree.root]
+        while stack:
+            clade = stack.pop()
+            n_clades += 1
+            if not clade.clades:
+                n_terminals += 1
+            if clade.name:
+                first_by_name.setdefault(clade.name, clade)
+            for child in clade.clades:
+                seen_parents[id(child)] = clade
+                stack.append(child)
+        assert n_clades == self.n_clades, f"clade count {self.n_clades} != {n_clades}"
+        assert n_terminals == self.n_terminals, f"terminal count {self.n_terminals} != {n_terminals}"
+        assert seen_parents.keys() == self.parents.keys(), "parent map does not match tree"
+        for key, parent in seen_parents.items():
+            assert self.parents[key] is parent, "stale parent in parent map"
+        assert first_by_name.keys() == self.by_name.keys(), "name index does not match tree"
+        for name, clade in self.by_name.items():
+            assert clade.name == name and (clade is self.tree.root or id(clade) in seen_parents), \
+                f"name index entry {name} is stale"
+
+
+def _copy_structure(tree):
+    # Salin semua clade (iteratif, aman untuk pohon dalam); atribut lain dangkal
+    new_tree = copy.copy(tree)
+    new_tree.root = copy.copy(tree.root)
+    stack = [new_tree.root]
+    while stack:
+        clade = stack.pop()
+        clade.clades = [copy.copy(child) for child in clade.clades]
+        stack.extend(clade.clades)
+    return new_tree
+
+
+def get_indexed_tree(file_path, tree_index=0):
+    """IndexedTree read-only untuk pohon dasar dari cache (index dibangun sekali per versi file)."""
+    key = (os.path.abspath(file_path), tree_index)
+    tree = get_cached_tree(file_path, tree_index)
+    indexed = _indexed_base_trees.get(key)
+    if indexed is None or indexed.tree is not tree:
+        indexed = IndexedTree(tree, copy=False)
+        _indexed_base_trees[key] = indexed
+    return indexed
@@ -0,0 +1,168 @@
+import weakref
+
+import matplotlib
+from matplotlib.collections import LineCollection
+
+try:
+    from .phylogenetic import compute_tree_layout
+    from .tree_renderer import (HIGHLIGHT_COLOR, LABEL_COLOR, clade_limits, find_clade_index, label_indices,
+                                resolve_clade_index, style_tree_axes)
+except ImportError:
+    from phylogenetic import compute_tree_layout
+    from tree_renderer import (HIGHLIGHT_COLOR, LABEL_COLOR, clade_limits, find_clade_index, label_indices,
+                               resolve_clade_index, style_tree_axes)
+
+
+class TreeView:
+    """
+    Satu figure + canvas untuk pohon filogeni yang dipakai ulang sepanjang sesi.
+    Layout di-cache per versi pohon (objek root; add_new_branch, IndexedTree.with_branch dan
+    LineageJournal.record selalu membuat root baru),
+    cabang digambar sebagai satu LineCollection, dan label hanya diperbarui yang berubah.
+    Label yang akan bertumpuk di-cull (tree_renderer.label_indices), jadi pohon besar
+    tetap murah. Ganti highlight memakai blitting: hanya label yang digambar ulang.
+    zoom() membatasi tampilan ke satu clade dan tetap berlaku untuk versi pohon berikutnya.
+    """
+
+    def __init__(self, figure, canvas):
+        self.figure = figure
+        self.canvas = canvas
+        self.ax = figure.add_subplot(111)
+        style_tree_axes(self.ax)
+        self.branches = LineCollection([], colors=LABEL_COLOR, linewidths=matplotlib.rcParams["lines.linewidth"])
+        self.ax.add_collection(self.branches)
+        self.labels = {}  # nama -> Text (animated, digambar lewat blit)
+        self.message = None
+        self._layouts = weakref.WeakKeyDictionary()  # root clade -> TreeLayout
+        self._root = None
+        self._highlight = None
+        self._tree = None
+        self._zoom = None  # Clade yang di-zoom (lihat tree_renderer.resolve_clade_index)
+        self._background = None
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("resize_event", self._on_resize)
+
+    def layout_for(self, tree):
+        layout = self._layouts.get(tree.root)
+        if layout is None:
+            layout = compute_tree_layout(tree)
+            self._layouts[tree.root] = layout
+        return layout
+
+    def show(self, tree, highlight_species_name=None):
+        if tree is None:
+            self.show_message("Error: Tree data tidak tersedia")
+            return
+        if (tree.root is not self._root or self.message is not None
+                or (highlight_species_name and highlight_species_name not in self.labels
+                    and find_clade_index(self.layout_for(tree), highlight_species_name) is not None)):
+            # Pohon baru, atau label highlight sedang di-cull: pilih ulang label
+            self._set_tree(tree, highlight_species_name)
+            self._set_highlight(highlight_species_name)
+            self.canvas.draw_idle()
+        elif highlight_species_name != self._highlight:
+            self._set_highlight(highlight_species_name)
+            self._blit_labels()
+
+    def zoom(self, clade=None):
+        """
+        Zoom ke clade: nama, objek Clade, atau nama-nama tip (zoom ke MRCA-nya);
+        None kembali ke seluruh pohon. Return False jika clade tidak ada di pohon.
+        """
+        if self._tree is None:
+            return False
+        layout = self.layout_for(self._tree)
+        index = resolve_clade_index(layout, clade)
+        if clade is not None and index is None:
+            return False
+        self._zoom = clade
+        self._set_limits(layout, index)
+        # Rentang y berubah: label yang muat dipilih ulang
+        highlight = self._highlight
+        self._set_tree(self._tree, highlight)
+        self._set_highlight(highlight)
+        self.canvas.draw_idle()
+        return True
+
+    def _set_limits(self, layout, index=None):
+        xlim, ylim = clade_limits(layout, index)
+        self.ax.set_xlim(*xlim)
+        self.ax.set_ylim(*ylim)
+
+    def show_message(self, text):
+        self._clear_labels()
+        self.branches.set_segments([])
+        self._root = None
+        self._tree = None
+        if self.message is None:
+            self.message = self.ax.text(0.5, 0.5, text, ha='center', va='center', fontsize=10,
+                                        color='red', transform=self.ax.transAxes)
+        else:
+            self.message.set_text(text)
+        self.canvas.draw_idle()
+
+    def _clear_labels(self):
+        for text in self.labels.values():
+            text.remove()
+        self.labels = {}
+        self._highlight = None
+
+    def _set_tree(self, tree, highlight_species_name=None):
+        if self.message is not None:
+            self.message.remove()
+            self.message = None
+        layout = self.layout_for(tree)
+        if tree.root is not self._root:
+            self.branches.set_segments(layout.segments())
+            self._set_limits(layout, resolve_clade_index(layout, self._zoom))
+
+        # Diff label dengan tampilan sebelumnya: hapus yang hilang, geser yang pindah, tambah yang baru
+        highlight_index = find_clade_index(layout, highlight_species_name) if highlight_species_name else None
+        new_positions = {}
+        for i in label_indices(layout, self.ax, highlight_index):
+            new_positions.setdefault(layout.clades[i].name, (layout.x[i], layout.y[i]))
+        for name in list(self.labels):
+            if name not in new_positions:
+                self.labels.pop(name).remove()
+        for name, position in new_positions.items():
+            text = self.labels.get(name)
+            if text is None:
+                self.labels[name] = self.ax.text(position[0], position[1], f" {name}", va="center",
+                                                 color=LABEL_COLOR, animated=True)
+            elif text.get_position() != position:
+                text.set_position(position)
+        self._root = tree.root
+        self._tree = tree
+
+    def _set_highlight(self, name):
+        previous = self.labels.get(self._highlight)
+        if previous is not None:
+            previous.set_color(LABEL_COLOR)
+        current = self.labels.get(name)
+        if current is not None:
+            current.set_color(HIGHLIGHT_COLOR)
+        self._highlight = name
+
+    def _on_resize(self, event):
+        # Ruang vertikal berubah: jumlah label yang muat ikut berubah
+        if self._tree is not None and self.message is None:
+            highlight = self._highlight
+            self._set_tree(self._tree, highlight)
+            self._set_highlight(highlight)
+
+    def _on_draw(self, event):
+        # Setelah draw penuh: simpan background (cabang saja) lalu gambar label di atasnya
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_labels()
+
+    def _draw_labels(self):
+        for text in self.labels.values():
+            self.ax.draw_artist(text)
+        self.canvas.blit(self.figure.bbox)
+
+    def _blit_labels(self):
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_labels()